@@ -1,12 +1,15 @@
 """Telegram bot command and message handlers."""
 
-import html
+import asyncio
 import logging
-import os
+import operator
+import re
 import tempfile
+from html import escape as _escape
 from pathlib import Path
 
-from telegram import Update
+from telegram import Bot, Update
+from telegram.error import TelegramError
 from telegram.ext import (
     CallbackQueryHandler,
     CommandHandler,
@@ -16,24 +19,91 @@ from telegram.ext import (
     filters,
 )
 
-from src.bot.keyboards import get_history_keyboard, get_pdf_keyboard
-from src.bot.middleware import require_auth
+from src.bot.keyboards import HISTORY_PAGE_SIZE, get_history_keyboard, get_pdf_keyboard
+from src.bot.middleware import get_cached_auth, invalidate_auth, require_auth
 from src.db import repository as repo
 from src.services.audio import AudioProcessor
+from src.services.downloads import DownloadJob
 
 logger = logging.getLogger(__name__)
 
-
-def _escape_html(text: str) -> str:
-    """Escape HTML special characters for Telegram HTML parse mode."""
-    return html.escape(text)
-
 # Conversation states
 AWAITING_PASSWORD = 0
 
+# Filters are immutable combinator trees; build them once per process
+_TEXT_NONCMD = filters.TEXT & ~filters.COMMAND
+_MEDIA_FILTER = (
+    filters.AUDIO | filters.VOICE | filters.VIDEO | filters.VIDEO_NOTE | filters.Document.ALL
+)
+
+# Callback data is ASCII-only; compile once and skip Unicode-aware matching
+_PDF_PAT = re.compile(r"^pdf:", re.ASCII)
+_HIST_PAT = re.compile(r"^(?:history|hpage):", re.ASCII)
+
 # Cost per second (deferred mode)
 SPEECHKIT_COST_PER_SEC = 0.002542
 
+# Shared objects every handler needs, fetched from bot_data in one call
+_DEPS_GETTER = operator.itemgetter("settings", "db_session_factory")
+
+
+def get_deps(context: ContextTypes.DEFAULT_TYPE) -> tuple:
+    """Return ``(settings, db_session_factory)`` from ``context.bot_data``."""
+    return _DEPS_GETTER(context.bot_data)
+
+
+# ── Static replies ────────────────────────────────────────
+
+_START_AUTHORIZED = (
+    "✅ Вы уже авторизованы! Отправьте аудио или видеофайл для транскрибации.\n"
+    "Используйте /help для справки."
+)
+
+_START_ASK_PASSWORD = (
+    "👋 Добро пожаловать в Transcribe Bot!\n\n"
+    "🔒 Для доступа введите пароль:"
+)
+
+_WRONG_PASSWORD_MSG = "❌ Неверный пароль. Попробуйте ещё раз:"
+
+_AUTH_SUCCESS_MSG = (
+    "✅ Добро пожаловать! Вы авторизованы.\n\n"
+    "📎 Отправьте аудио или видеофайл для транскрибации.\n"
+    "Используйте /help для получения справки."
+)
+
+_HELP_TEXT = (
+    "📖 <b>Transcribe Bot — Справка</b>\n\n"
+    "<b>Как использовать:</b>\n"
+    "1. Отправьте аудио или видеофайл боту\n"
+    "2. Дождитесь транскрибации и анализа\n"
+    "3. Получите результат с возможностью скачать PDF\n\n"
+    "<b>Поддерживаемые форматы:</b>\n"
+    "🎵 Аудио: OGG, MP3, WAV, FLAC, M4A\n"
+    "🎬 Видео: MP4, AVI, MOV, MKV, WEBM\n\n"
+    "💡 <i>Для файлов &gt; 20 МБ отправляйте как документ</i>\n\n"
+    "<b>Команды:</b>\n"
+    "/start — авторизация\n"
+    "/help — эта справка\n"
+    "/history — история транскрибаций\n"
+    "/cost — стоимость последней транскрибации\n"
+    "/logout — выход из системы\n\n"
+    "<b>Ограничения:</b>\n"
+    "• Макс. длительность: 4 часа\n"
+    "• Макс. размер файла: 2 ГБ (лимит Telegram)\n"
+    "• Язык: только русский"
+)
+
+_LOGOUT_MSG = (
+    "👋 Вы вышли из системы.\n"
+    "Для повторного входа отправьте /start"
+)
+
+_UNKNOWN_MSG = (
+    "🤔 Отправьте аудио или видеофайл для транскрибации "
+    "или используйте /help для справки."
+)
+
 
 # ── /start and password ──────────────────────────────────
 
@@ -44,22 +114,14 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         return ConversationHandler.END
 
     chat_id = update.effective_chat.id
-    session_factory = context.bot_data["db_session_factory"]
-
-    async with session_factory() as session:
-        authorized = await repo.is_user_authorized(session, chat_id)
+    _, session_factory = get_deps(context)
+    authorized = await get_cached_auth(chat_id, session_factory)
 
     if authorized:
-        await update.effective_chat.send_message(
-            "✅ Вы уже авторизованы! Отправьте аудио или видеофайл для транскрибации.\n"
-            "Используйте /help для справки."
-        )
+        await update.effective_chat.send_message(_START_AUTHORIZED)
         return ConversationHandler.END
 
-    await update.effective_chat.send_message(
-        "👋 Добро пожаловать в Transcribe Bot!\n\n"
-        "🔒 Для доступа введите пароль:"
-    )
+    await update.effective_chat.send_message(_START_ASK_PASSWORD)
     return AWAITING_PASSWORD
 
 
@@ -70,33 +132,36 @@ async def password_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
     chat_id = update.effective_chat.id
     password_input = update.message.text.strip()
-    settings = context.bot_data["settings"]
-    session_factory = context.bot_data["db_session_factory"]
-
-    if password_input != settings.bot_access_password:
-        await update.effective_chat.send_message(
-            "❌ Неверный пароль. Попробуйте ещё раз:"
+    settings, session_factory = get_deps(context)
+
+    # Encode the expected password once per process, not per attempt
+    expected = context.bot_data.get("_pw_bytes")
+    if expected is None:
+        expected = context.bot_data["_pw_bytes"] = settings.bot_access_password.encode()
+
+    # begin() commits on exit; no connection is taken for a wrong password
+    async with session_factory.begin() as session:
+        result = await repo.verify_password_and_authorize(
+            session,
+            chat_id,
+            password_input,
+            expected,
+            max_users=settings.max_users,
         )
-        return AWAITING_PASSWORD
 
-    async with session_factory() as session:
-        success, msg = await repo.authorize_user(
-            session, chat_id, max_users=settings.max_users
-        )
-        await session.commit()
+    if result is repo.AuthResult.WRONG_PASSWORD:
+        await update.effective_chat.send_message(_WRONG_PASSWORD_MSG)
+        return AWAITING_PASSWORD
 
-    if not success:
+    if result is repo.AuthResult.LIMIT_REACHED:
         await update.effective_chat.send_message(
             "😔 К сожалению, достигнут лимит пользователей "
             f"({settings.max_users}). Обратитесь к администратору."
         )
         return ConversationHandler.END
 
-    await update.effective_chat.send_message(
-        "✅ Добро пожаловать! Вы авторизованы.\n\n"
-        "📎 Отправьте аудио или видеофайл для транскрибации.\n"
-        "Используйте /help для получения справки."
-    )
+    invalidate_auth(chat_id)
+    await update.effective_chat.send_message(_AUTH_SUCCESS_MSG)
     return ConversationHandler.END
 
 
@@ -105,29 +170,39 @@ async def password_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 @require_auth
 async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle /help command — show usage instructions."""
-    await update.effective_chat.send_message(
-        "📖 <b>Transcribe Bot — Справка</b>\n\n"
-        "<b>Как использовать:</b>\n"
-        "1. Отправьте аудио или видеофайл боту\n"
-        "2. Дождитесь транскрибации и анализа\n"
-        "3. Получите результат с возможностью скачать PDF\n\n"
-        "<b>Поддерживаемые форматы:</b>\n"
-        "🎵 Аудио: OGG, MP3, WAV, FLAC, M4A\n"
-        "🎬 Видео: MP4, AVI, MOV, MKV, WEBM\n\n"
-        "💡 <i>Для файлов &gt; 20 МБ отправляйте как документ</i>\n\n"
-        "<b>Команды:</b>\n"
-        "/start — авторизация\n"
-        "/help — эта справка\n"
-        "/history — история транскрибаций\n"
-        "/cost — стоимость последней транскрибации\n"
-        "/logout — выход из системы\n\n"
-        "<b>Ограничения:</b>\n"
-        "• Макс. длительность: 4 часа\n"
-        "• Макс. размер файла: 2 ГБ (лимит Telegram)\n"
-        "• Язык: только русский",
-        parse_mode="HTML",
-    )
+    """Handle /help command — show usage instructions.
+
+    Copies the pre-published help message when one exists so Telegram does
+    not re-parse the HTML body; falls back to sending the text directly.
+    """
+    source = context.bot_data.get("help_message")
+    if source is not None:
+        from_chat_id, message_id = source
+        try:
+            await context.bot.copy_message(
+                chat_id=update.effective_chat.id,
+                from_chat_id=from_chat_id,
+                message_id=message_id,
+            )
+            return
+        except TelegramError as e:
+            logger.warning("copy_message for /help failed, sending text: %s", e)
+
+    await update.effective_chat.send_message(_HELP_TEXT, parse_mode="HTML")
+
+
+async def publish_help_message(bot: Bot, chat_id: int) -> tuple[int, int] | None:
+    """Send the help text to a service chat once for later ``copy_message``.
+
+    Returns:
+        ``(chat_id, message_id)`` of the published message, or None on failure.
+    """
+    try:
+        message = await bot.send_message(chat_id, _HELP_TEXT, parse_mode="HTML")
+    except TelegramError as e:
+        logger.warning("Could not publish help message to chat %d: %s", chat_id, e)
+        return None
+    return chat_id, message.message_id
 
 
 # ── /history ──────────────────────────────────────────────
@@ -137,18 +212,26 @@ async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def history_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /history command — show transcription history."""
     chat_id = update.effective_chat.id
-    session_factory = context.bot_data["db_session_factory"]
+    _, session_factory = get_deps(context)
 
     async with session_factory() as session:
-        transcriptions = await repo.get_user_transcriptions(session, chat_id, limit=50)
+        page_items, has_next = await repo.get_history_page_projection(
+            session, chat_id, limit=HISTORY_PAGE_SIZE
+        )
+        # A single page already tells the total; count only when there is more
+        total = (
+            await repo.count_user_transcriptions(session, chat_id)
+            if has_next
+            else len(page_items)
+        )
 
-    if not transcriptions:
+    if not page_items:
         await update.effective_chat.send_message("📭 У вас пока нет транскрибаций.")
         return
 
-    keyboard = get_history_keyboard(transcriptions, page=0)
+    keyboard = get_history_keyboard(page_items, page=0, has_next=has_next)
     await update.effective_chat.send_message(
-        f"📋 <b>История транскрибаций</b> ({len(transcriptions)} шт.)",
+        f"📋 <b>История транскрибаций</b> ({total} шт.)",
         reply_markup=keyboard,
         parse_mode="HTML",
     )
@@ -165,7 +248,7 @@ async def history_callback_handler(
     data = query.data
     if data.startswith("history:"):
         transcription_id = int(data.split(":")[1])
-        session_factory = context.bot_data["db_session_factory"]
+        _, session_factory = get_deps(context)
 
         async with session_factory() as session:
             t = await repo.get_transcription_by_id(session, transcription_id)
@@ -174,13 +257,13 @@ async def history_callback_handler(
             await query.edit_message_text("❌ Транскрибация не найдена.")
             return
 
-        name = _escape_html(t.file_name)
+        name = _escape(t.file_name)
         text = f"📝 <b>{name}</b>\n\n"
         if t.transcription_text:
-            trans_text = _escape_html(t.transcription_text[:3500])
+            trans_text = _escape(t.transcription_text[:3500])
             text += f"<b>Транскрибация:</b>\n{trans_text}\n\n"
         if t.analysis_text:
-            analysis = _escape_html(t.analysis_text[:3500])
+            analysis = _escape(t.analysis_text[:3500])
             text += f"<b>Анализ:</b>\n{analysis}"
 
         keyboard = get_pdf_keyboard(t.id)
@@ -189,12 +272,17 @@ async def history_callback_handler(
     elif data.startswith("hpage:"):
         page = int(data.split(":")[1])
         chat_id = update.effective_chat.id
-        session_factory = context.bot_data["db_session_factory"]
+        _, session_factory = get_deps(context)
 
         async with session_factory() as session:
-            transcriptions = await repo.get_user_transcriptions(session, chat_id, limit=50)
+            page_items, has_next = await repo.get_history_page_projection(
+                session,
+                chat_id,
+                offset=page * HISTORY_PAGE_SIZE,
+                limit=HISTORY_PAGE_SIZE,
+            )
 
-        keyboard = get_history_keyboard(transcriptions, page=page)
+        keyboard = get_history_keyboard(page_items, page=page, has_next=has_next)
         await query.edit_message_reply_markup(reply_markup=keyboard)
 
 
@@ -205,16 +293,13 @@ async def history_callback_handler(
 async def logout_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /logout command — deauthorize user."""
     chat_id = update.effective_chat.id
-    session_factory = context.bot_data["db_session_factory"]
+    _, session_factory = get_deps(context)
 
-    async with session_factory() as session:
+    async with session_factory.begin() as session:
         await repo.deauthorize_user(session, chat_id)
-        await session.commit()
+    invalidate_auth(chat_id)
 
-    await update.effective_chat.send_message(
-        "👋 Вы вышли из системы.\n"
-        "Для повторного входа отправьте /start"
-    )
+    await update.effective_chat.send_message(_LOGOUT_MSG)
 
 
 # ── /cost ─────────────────────────────────────────────────
@@ -224,22 +309,22 @@ async def logout_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def cost_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /cost command — show cost of last transcription."""
     chat_id = update.effective_chat.id
-    session_factory = context.bot_data["db_session_factory"]
+    _, session_factory = get_deps(context)
 
     async with session_factory() as session:
-        transcriptions = await repo.get_user_transcriptions(session, chat_id, limit=1)
+        latest = await repo.get_latest_transcription_summary(session, chat_id)
 
-    if not transcriptions:
+    if latest is None:
         await update.effective_chat.send_message("📭 У вас нет транскрибаций для расчёта.")
         return
 
-    t = transcriptions[0]
-    duration = t.duration_seconds or 0
+    file_name, duration = latest
+    duration = duration or 0
     speechkit_cost = duration * SPEECHKIT_COST_PER_SEC
     gpt_cost_estimate = 2.0  # rough estimate
     total = speechkit_cost + gpt_cost_estimate
 
-    name = _escape_html(t.file_name)
+    name = _escape(file_name)
     await update.effective_chat.send_message(
         f"💰 <b>Стоимость последней транскрибации</b>\n\n"
         f"Файл: {name}\n"
@@ -296,39 +381,25 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await message.reply_text("❌ Файл слишком большой. Максимальный размер — 2 ГБ.")
         return
 
-    # Download file
-    await message.reply_text("⏳ Файл получен, начинаю обработку...")
-
-    tmp_dir = context.bot_data["settings"].tmp_dir
-    os.makedirs(tmp_dir, exist_ok=True)
-    local_path = os.path.join(tmp_dir, f"{update.effective_chat.id}_{file_name}")
+    # Hand the download to background workers so this update returns at once
+    download_queue = context.bot_data.get("download_queue")
+    if not download_queue:
+        await message.reply_text("⚠️ Система обработки временно недоступна.")
+        return
 
+    job = DownloadJob(
+        chat_id=update.effective_chat.id,
+        message=message,
+        file_obj=file_obj,
+        file_name=file_name,
+    )
     try:
-        tg_file = await file_obj.get_file()
-        await tg_file.download_to_drive(local_path)
-    except Exception as e:
-        logger.error("Failed to download file: %s", e)
-        await message.reply_text("❌ Не удалось скачать файл. Попробуйте ещё раз.")
+        download_queue.submit(job)
+    except asyncio.QueueFull:
+        await message.reply_text("⏳ Сейчас слишком много файлов в обработке. Попробуйте позже.")
         return
 
-    # Enqueue for processing
-    task_queue = context.bot_data.get("task_queue")
-    if task_queue:
-        from src.services.queue import ProcessingTask
-
-        task = ProcessingTask(
-            chat_id=update.effective_chat.id,
-            file_path=local_path,
-            file_name=file_name,
-            message_id=message.message_id,
-        )
-        position = await task_queue.enqueue(task)
-        if position > 1:
-            await message.reply_text(
-                f"📋 Ваш файл добавлен в очередь. Позиция: {position}"
-            )
-    else:
-        await message.reply_text("⚠️ Система обработки временно недоступна.")
+    await message.reply_text("⏳ Файл получен, начинаю обработку...")
 
 
 # ── PDF callback ──────────────────────────────────────────
@@ -347,7 +418,7 @@ async def pdf_callback_handler(
         return
 
     transcription_id = int(data.split(":")[1])
-    session_factory = context.bot_data["db_session_factory"]
+    _, session_factory = get_deps(context)
 
     async with session_factory() as session:
         t = await repo.get_transcription_by_id(session, transcription_id)
@@ -362,24 +433,28 @@ async def pdf_callback_handler(
         await query.message.reply_text("⚠️ Генерация PDF временно недоступна.")
         return
 
+    pdf_path = None
     try:
-        pdf_path = pdf_generator.generate(
+        # ReportLab rendering is CPU-bound; keep it off the event loop
+        pdf_path = await asyncio.to_thread(
+            pdf_generator.generate,
             file_name=t.file_name,
             transcription_text=t.transcription_text or "",
             analysis_text=t.analysis_text or "",
             created_at=t.created_at,
         )
-        with open(pdf_path, "rb") as pdf_file:
-            await query.message.reply_document(
-                document=pdf_file,
-                filename=f"transcription_{t.id}.pdf",
-                caption="📄 Транскрибация и анализ",
-            )
-        # Clean up
-        os.remove(pdf_path)
+        await query.message.reply_document(
+            document=Path(pdf_path),
+            filename=f"transcription_{t.id}.pdf",
+            caption="📄 Транскрибация и анализ",
+        )
     except Exception as e:
         logger.error("Failed to generate PDF: %s", e)
         await query.message.reply_text("❌ Ошибка при генерации PDF. Попробуйте позже.")
+    finally:
+        # Clean up, whether or not the document was sent
+        if pdf_path is not None:
+            await asyncio.to_thread(Path(pdf_path).unlink, missing_ok=True)
 
 
 # ── Unknown messages ──────────────────────────────────────
@@ -388,10 +463,7 @@ async def pdf_callback_handler(
 @require_auth
 async def unknown_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle unrecognized messages from authorized users."""
-    await update.effective_chat.send_message(
-        "🤔 Отправьте аудио или видеофайл для транскрибации "
-        "или используйте /help для справки."
-    )
+    await update.effective_chat.send_message(_UNKNOWN_MSG)
 
 
 # ── Register handlers ────────────────────────────────────
@@ -403,7 +475,7 @@ def get_conversation_handler() -> ConversationHandler:
         entry_points=[CommandHandler("start", start_handler)],
         states={
             AWAITING_PASSWORD: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, password_handler),
+                MessageHandler(_TEXT_NONCMD, password_handler),
             ],
         },
         fallbacks=[
@@ -428,17 +500,11 @@ def register_handlers(application) -> None:
     application.add_handler(CommandHandler("cost", cost_handler))
 
     # Callback queries
-    application.add_handler(CallbackQueryHandler(pdf_callback_handler, pattern=r"^pdf:"))
-    application.add_handler(CallbackQueryHandler(history_callback_handler, pattern=r"^(history|hpage):"))
+    application.add_handler(CallbackQueryHandler(pdf_callback_handler, pattern=_PDF_PAT))
+    application.add_handler(CallbackQueryHandler(history_callback_handler, pattern=_HIST_PAT))
 
     # File handlers
-    application.add_handler(MessageHandler(
-        filters.AUDIO | filters.VOICE | filters.VIDEO | filters.VIDEO_NOTE | filters.Document.ALL,
-        file_handler,
-    ))
+    application.add_handler(MessageHandler(_MEDIA_FILTER, file_handler))
 
     # Unknown text messages
-    application.add_handler(MessageHandler(
-        filters.TEXT & ~filters.COMMAND,
-        unknown_handler,
-    ))
+    application.add_handler(MessageHandler(_TEXT_NONCMD, unknown_handler))
@@ -2,6 +2,8 @@
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+HISTORY_PAGE_SIZE = 5
+
 
 def get_pdf_keyboard(transcription_id: int) -> InlineKeyboardMarkup:
     """Build an inline keyboard with a 'Download PDF' button.
@@ -15,36 +17,31 @@ def get_pdf_keyboard(transcription_id: int) -> InlineKeyboardMarkup:
 
 
 def get_history_keyboard(
-    transcriptions: list,
+    page_items: list,
     page: int = 0,
-    page_size: int = 5,
+    has_next: bool = False,
 ) -> InlineKeyboardMarkup:
     """Build an inline keyboard for transcription history navigation.
 
     Args:
-        transcriptions: List of Transcription model instances.
+        page_items: ``(id, file_name, created_at)`` rows for the current page.
         page: Current page number (0-indexed).
-        page_size: Number of items per page.
+        has_next: Whether a next page exists.
     """
-    buttons = []
-    start = page * page_size
-    end = start + page_size
-    page_items = transcriptions[start:end]
-
-    for t in page_items:
-        label = t.file_name[:30]
-        date_str = t.created_at.strftime("%d.%m %H:%M") if t.created_at else ""
-        preview = ""
-        if t.transcription_text:
-            preview = t.transcription_text[:40].replace("\n", " ") + "…"
-        btn_text = f"📝 {date_str} | {label}"
-        buttons.append([InlineKeyboardButton(btn_text, callback_data=f"history:{t.id}")])
+    buttons = [
+        [InlineKeyboardButton(
+            "📝 " + (t.created_at.strftime("%d.%m %H:%M") if t.created_at else "")
+            + " | " + t.file_name[:30],
+            callback_data="history:" + str(t.id),
+        )]
+        for t in page_items
+    ]
 
     # Pagination buttons
     nav = []
     if page > 0:
         nav.append(InlineKeyboardButton("⬅️ Назад", callback_data=f"hpage:{page - 1}"))
-    if end < len(transcriptions):
+    if has_next:
         nav.append(InlineKeyboardButton("Вперёд ➡️", callback_data=f"hpage:{page + 1}"))
     if nav:
         buttons.append(nav)
@@ -3,6 +3,7 @@
 import functools
 import logging
 
+from cachetools import TTLCache
 from telegram import Update
 from telegram.ext import ContextTypes
 
@@ -10,12 +11,42 @@ from src.db.repository import is_user_authorized
 
 logger = logging.getLogger(__name__)
 
+# Process-local cache of auth status keyed by chat_id.
+# Auth changes rarely, so a short TTL bounds staleness across processes.
+_AUTH_CACHE: TTLCache[int, bool] = TTLCache(maxsize=10_000, ttl=300)
+# Bumped by every invalidation; a DB read started before one is not cached
+_auth_generation = 0
+
+
+def invalidate_auth(chat_id: int) -> None:
+    """Drop the cached auth status for a chat (call after auth changes)."""
+    global _auth_generation
+    _auth_generation += 1
+    _AUTH_CACHE.pop(chat_id, None)
+
+
+async def get_cached_auth(chat_id: int, session_factory) -> bool:
+    """Return the user's auth status, querying the DB only on cache miss.
+
+    A result read while the status was being changed is returned but not
+    cached, so an in-flight read cannot undo ``invalidate_auth``.
+    """
+    authorized = _AUTH_CACHE.get(chat_id)
+    if authorized is None:
+        generation = _auth_generation
+        async with session_factory() as session:
+            authorized = await is_user_authorized(session, chat_id)
+        if generation == _auth_generation:
+            _AUTH_CACHE[chat_id] = authorized
+    return authorized
+
 
 def require_auth(func):
     """Decorator that checks if the user is authorized before executing the handler.
 
     If the user is not authorized, sends a message asking them to authorize.
     Requires ``db_session_factory`` to be stored in ``context.bot_data``.
+    Auth status is cached in-process; the DB is queried only on cache miss.
     """
 
     @functools.wraps(func)
@@ -33,8 +64,7 @@ def require_auth(func):
             )
             return
 
-        async with session_factory() as session:
-            authorized = await is_user_authorized(session, chat_id)
+        authorized = await get_cached_auth(chat_id, session_factory)
 
         if not authorized:
             await update.effective_chat.send_message(
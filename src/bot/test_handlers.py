@@ -1,45 +1,85 @@
 """Unit tests for Telegram bot handlers."""
 
+import asyncio
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from telegram.error import TelegramError
 from telegram.ext import ConversationHandler
 
 from src.bot.handlers import (
     AWAITING_PASSWORD,
     SPEECHKIT_COST_PER_SEC,
+    _HELP_TEXT,
+    _HIST_PAT,
+    _PDF_PAT,
+    cost_handler,
+    file_handler,
+    help_handler,
+    history_handler,
+    logout_handler,
+    pdf_callback_handler,
     start_handler,
     password_handler,
     get_conversation_handler,
     register_handlers,
 )
+from src.bot.middleware import _AUTH_CACHE
+
+
+@pytest.fixture(autouse=True)
+def _clear_auth_cache():
+    """Keep the process-local auth cache isolated between tests."""
+    _AUTH_CACHE.clear()
+    yield
+    _AUTH_CACHE.clear()
+
+
+@dataclass
+class FakeChat:
+    """Minimal stand-in for ``telegram.Chat``."""
+    id: int
+    send_message: AsyncMock = field(default_factory=AsyncMock)
+
+
+@dataclass
+class FakeMessage:
+    """Minimal stand-in for ``telegram.Message``."""
+    text: str = ""
+    message_id: int = 42
+    reply_text: AsyncMock = field(default_factory=AsyncMock)
+    audio: object = None
+    voice: object = None
+    video: object = None
+    video_note: object = None
+    document: object = None
+
+
+@dataclass
+class FakeUpdate:
+    """Minimal stand-in for ``telegram.Update``."""
+    effective_chat: FakeChat | None
+    message: FakeMessage | None = None
+    callback_query: object = None
 
 
 def _make_update(chat_id=12345, text=None):
-    """Create a mock Telegram Update."""
-    update = MagicMock()
-    update.effective_chat = MagicMock()
-    update.effective_chat.id = chat_id
-    update.effective_chat.send_message = AsyncMock()
-    update.message = MagicMock()
-    update.message.text = text or ""
-    update.message.reply_text = AsyncMock()
-    update.message.message_id = 42
-    update.message.audio = None
-    update.message.voice = None
-    update.message.video = None
-    update.message.video_note = None
-    update.message.document = None
-    return update
+    """Create a fake Telegram Update."""
+    return FakeUpdate(
+        effective_chat=FakeChat(id=chat_id),
+        message=FakeMessage(text=text or ""),
+    )
 
 
 def _make_context(is_authorized=False, password="test_password", max_users=20):
-    """Create a mock context with all required bot_data."""
-    ctx = MagicMock()
-
-    settings = MagicMock()
-    settings.bot_access_password = password
-    settings.max_users = max_users
-    settings.tmp_dir = "/tmp/test"
+    """Create a fake context with all required bot_data."""
+    settings = SimpleNamespace(
+        bot_access_password=password,
+        max_users=max_users,
+        tmp_dir="/tmp/test",
+    )
 
     factory = MagicMock()
     session = AsyncMock()
@@ -47,11 +87,15 @@ def _make_context(is_authorized=False, password="test_password", max_users=20):
     cm.__aenter__ = AsyncMock(return_value=session)
     cm.__aexit__ = AsyncMock(return_value=False)
     factory.return_value = cm
+    factory.begin.return_value = cm
 
-    ctx.bot_data = {
-        "settings": settings,
-        "db_session_factory": factory,
-    }
+    ctx = SimpleNamespace(
+        bot=SimpleNamespace(copy_message=AsyncMock()),
+        bot_data={
+            "settings": settings,
+            "db_session_factory": factory,
+        },
+    )
 
     return ctx, session
 
@@ -60,8 +104,7 @@ class TestStartHandler:
     @pytest.mark.asyncio
     async def test_no_effective_chat(self):
         """Should return END if no effective_chat."""
-        update = MagicMock()
-        update.effective_chat = None
+        update = FakeUpdate(effective_chat=None)
         ctx, _ = _make_context()
 
         result = await start_handler(update, ctx)
@@ -73,7 +116,7 @@ class TestStartHandler:
         update = _make_update()
         ctx, session = _make_context()
 
-        with patch("src.bot.handlers.repo.is_user_authorized", new_callable=AsyncMock, return_value=True):
+        with patch("src.bot.middleware.is_user_authorized", new_callable=AsyncMock, return_value=True):
             result = await start_handler(update, ctx)
 
         assert result == ConversationHandler.END
@@ -87,7 +130,7 @@ class TestStartHandler:
         update = _make_update()
         ctx, session = _make_context()
 
-        with patch("src.bot.handlers.repo.is_user_authorized", new_callable=AsyncMock, return_value=False):
+        with patch("src.bot.middleware.is_user_authorized", new_callable=AsyncMock, return_value=False):
             result = await start_handler(update, ctx)
 
         assert result == AWAITING_PASSWORD
@@ -95,14 +138,24 @@ class TestStartHandler:
         msg = update.effective_chat.send_message.call_args[0][0]
         assert "пароль" in msg.lower()
 
+    @pytest.mark.asyncio
+    async def test_cached_auth_skips_db(self):
+        """Warm auth cache should answer /start without opening a session."""
+        update = _make_update()
+        ctx, session = _make_context()
+        _AUTH_CACHE[12345] = True
+
+        result = await start_handler(update, ctx)
+
+        assert result == ConversationHandler.END
+        ctx.bot_data["db_session_factory"].assert_not_called()
+
 
 class TestPasswordHandler:
     @pytest.mark.asyncio
     async def test_no_message(self):
         """Should return END if no message."""
-        update = MagicMock()
-        update.message = None
-        update.effective_chat = MagicMock()
+        update = FakeUpdate(effective_chat=FakeChat(id=12345), message=None)
         ctx, _ = _make_context()
 
         result = await password_handler(update, ctx)
@@ -160,6 +213,293 @@ class TestPasswordHandler:
 
         assert result == ConversationHandler.END
 
+    @pytest.mark.asyncio
+    async def test_expected_password_encoded_once(self):
+        """The encoded password should be cached in bot_data after first use."""
+        update = _make_update(text="wrong")
+        ctx, _ = _make_context(password="test_password")
+
+        await password_handler(update, ctx)
+
+        assert ctx.bot_data["_pw_bytes"] == b"test_password"
+
+
+class TestHelpHandler:
+    @pytest.mark.asyncio
+    async def test_sends_help_text(self):
+        """Authorized user should receive the static help text."""
+        update = _make_update()
+        ctx, _ = _make_context()
+        _AUTH_CACHE[12345] = True
+
+        await help_handler(update, ctx)
+
+        update.effective_chat.send_message.assert_called_once_with(
+            _HELP_TEXT, parse_mode="HTML"
+        )
+
+    @pytest.mark.asyncio
+    async def test_copies_published_message(self):
+        """A pre-published help message should be copied instead of re-sent."""
+        update = _make_update()
+        ctx, _ = _make_context()
+        ctx.bot.copy_message = AsyncMock()
+        ctx.bot_data["help_message"] = (-100, 7)
+        _AUTH_CACHE[12345] = True
+
+        await help_handler(update, ctx)
+
+        ctx.bot.copy_message.assert_called_once_with(
+            chat_id=12345, from_chat_id=-100, message_id=7
+        )
+        update.effective_chat.send_message.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_copy_failure_falls_back_to_text(self):
+        update = _make_update()
+        ctx, _ = _make_context()
+        ctx.bot.copy_message = AsyncMock(side_effect=TelegramError("gone"))
+        ctx.bot_data["help_message"] = (-100, 7)
+        _AUTH_CACHE[12345] = True
+
+        await help_handler(update, ctx)
+
+        update.effective_chat.send_message.assert_called_once_with(
+            _HELP_TEXT, parse_mode="HTML"
+        )
+
+
+class TestHistoryHandler:
+    @pytest.mark.asyncio
+    async def test_single_page_skips_count(self):
+        update = _make_update()
+        ctx, _ = _make_context()
+        _AUTH_CACHE[12345] = True
+        rows = [SimpleNamespace(id=1, file_name="a.ogg", created_at=None)]
+
+        with (
+            patch(
+                "src.bot.handlers.repo.get_history_page_projection",
+                new_callable=AsyncMock,
+                return_value=(rows, False),
+            ),
+            patch(
+                "src.bot.handlers.repo.count_user_transcriptions", new_callable=AsyncMock
+            ) as mock_count,
+            patch("src.bot.handlers.get_history_keyboard"),
+        ):
+            await history_handler(update, ctx)
+
+        mock_count.assert_not_called()
+        assert "(1 шт.)" in update.effective_chat.send_message.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_more_pages_counts_total(self):
+        update = _make_update()
+        ctx, _ = _make_context()
+        _AUTH_CACHE[12345] = True
+        rows = [SimpleNamespace(id=i, file_name="a.ogg", created_at=None) for i in range(5)]
+
+        with (
+            patch(
+                "src.bot.handlers.repo.get_history_page_projection",
+                new_callable=AsyncMock,
+                return_value=(rows, True),
+            ),
+            patch(
+                "src.bot.handlers.repo.count_user_transcriptions",
+                new_callable=AsyncMock,
+                return_value=12,
+            ),
+            patch("src.bot.handlers.get_history_keyboard"),
+        ):
+            await history_handler(update, ctx)
+
+        assert "(12 шт.)" in update.effective_chat.send_message.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_empty_history(self):
+        update = _make_update()
+        ctx, _ = _make_context()
+        _AUTH_CACHE[12345] = True
+
+        with patch(
+            "src.bot.handlers.repo.get_history_page_projection",
+            new_callable=AsyncMock,
+            return_value=([], False),
+        ):
+            await history_handler(update, ctx)
+
+        assert "нет транскрибаций" in update.effective_chat.send_message.call_args[0][0]
+
+
+class TestLogoutHandler:
+    @pytest.mark.asyncio
+    async def test_deauthorizes_in_one_transaction(self):
+        update = _make_update()
+        ctx, session = _make_context()
+        _AUTH_CACHE[12345] = True
+
+        with patch(
+            "src.bot.handlers.repo.deauthorize_user", new_callable=AsyncMock
+        ) as mock_deauth:
+            await logout_handler(update, ctx)
+
+        ctx.bot_data["db_session_factory"].begin.assert_called_once()
+        mock_deauth.assert_awaited_once_with(session, 12345)
+        assert 12345 not in _AUTH_CACHE
+
+
+class TestCostHandler:
+    @pytest.mark.asyncio
+    async def test_reports_latest_cost(self):
+        update = _make_update()
+        ctx, _ = _make_context()
+        _AUTH_CACHE[12345] = True
+
+        with patch(
+            "src.bot.handlers.repo.get_latest_transcription_summary",
+            new_callable=AsyncMock,
+            return_value=("a<b>.ogg", 600.0),
+        ):
+            await cost_handler(update, ctx)
+
+        msg = update.effective_chat.send_message.call_args[0][0]
+        assert "a&lt;b&gt;.ogg" in msg
+        assert "10.0 мин" in msg
+
+    @pytest.mark.asyncio
+    async def test_no_transcriptions(self):
+        update = _make_update()
+        ctx, _ = _make_context()
+        _AUTH_CACHE[12345] = True
+
+        with patch(
+            "src.bot.handlers.repo.get_latest_transcription_summary",
+            new_callable=AsyncMock,
+            return_value=None,
+        ):
+            await cost_handler(update, ctx)
+
+        msg = update.effective_chat.send_message.call_args[0][0]
+        assert "нет транскрибаций" in msg
+
+
+class TestFileHandler:
+    def _document_update(self, file_name):
+        update = _make_update()
+        update.message.document = SimpleNamespace(file_name=file_name, file_size=1024)
+        return update
+
+    @pytest.mark.asyncio
+    async def test_unsupported_document_rejected(self):
+        update = self._document_update("notes.txt")
+        ctx, _ = _make_context()
+        ctx.bot_data["download_queue"] = MagicMock()
+        _AUTH_CACHE[12345] = True
+
+        await file_handler(update, ctx)
+
+        ctx.bot_data["download_queue"].submit.assert_not_called()
+        msg = update.message.reply_text.call_args[0][0]
+        assert "Неподдерживаемый формат" in msg
+
+    @pytest.mark.asyncio
+    async def test_extension_only_name_rejected(self):
+        """A dot-file like ".ogg" has no extension, as AudioProcessor sees it."""
+        update = self._document_update(".ogg")
+        ctx, _ = _make_context()
+        ctx.bot_data["download_queue"] = MagicMock()
+        _AUTH_CACHE[12345] = True
+
+        await file_handler(update, ctx)
+
+        ctx.bot_data["download_queue"].submit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_supported_document_submitted(self):
+        update = self._document_update("Interview.MP3")
+        ctx, _ = _make_context()
+        ctx.bot_data["download_queue"] = MagicMock()
+        _AUTH_CACHE[12345] = True
+
+        await file_handler(update, ctx)
+
+        job = ctx.bot_data["download_queue"].submit.call_args[0][0]
+        assert job.chat_id == 12345
+        assert job.file_name == "Interview.MP3"
+
+    @pytest.mark.asyncio
+    async def test_full_download_queue(self):
+        update = self._document_update("a.ogg")
+        ctx, _ = _make_context()
+        ctx.bot_data["download_queue"] = MagicMock()
+        ctx.bot_data["download_queue"].submit.side_effect = asyncio.QueueFull
+        _AUTH_CACHE[12345] = True
+
+        await file_handler(update, ctx)
+
+        msg = update.message.reply_text.call_args[0][0]
+        assert "Попробуйте позже" in msg
+
+
+class TestPdfCallbackHandler:
+    @pytest.mark.asyncio
+    async def test_sends_pdf_by_path_and_cleans_up(self, tmp_path):
+        """PDF should be uploaded from its path and removed afterwards."""
+        pdf_file = tmp_path / "out.pdf"
+        pdf_file.write_bytes(b"%PDF-1.4")
+
+        update = _make_update()
+        update.callback_query = SimpleNamespace(
+            data="pdf:7",
+            answer=AsyncMock(),
+            message=SimpleNamespace(reply_document=AsyncMock(), reply_text=AsyncMock()),
+        )
+        ctx, _ = _make_context()
+        ctx.bot_data["pdf_generator"] = MagicMock()
+        ctx.bot_data["pdf_generator"].generate.return_value = str(pdf_file)
+        _AUTH_CACHE[12345] = True
+
+        t = SimpleNamespace(
+            id=7, file_name="a.ogg", transcription_text="text", analysis_text="", created_at=None
+        )
+        with patch("src.bot.handlers.repo.get_transcription_by_id", new_callable=AsyncMock, return_value=t):
+            await pdf_callback_handler(update, ctx)
+
+        kwargs = update.callback_query.message.reply_document.call_args.kwargs
+        assert kwargs["document"] == pdf_file
+        assert kwargs["filename"] == "transcription_7.pdf"
+        assert not pdf_file.exists()
+
+    @pytest.mark.asyncio
+    async def test_failed_send_still_cleans_up(self, tmp_path):
+        """PDF should be removed even when uploading it fails."""
+        pdf_file = tmp_path / "out.pdf"
+        pdf_file.write_bytes(b"%PDF-1.4")
+
+        update = _make_update()
+        update.callback_query = SimpleNamespace(
+            data="pdf:7",
+            answer=AsyncMock(),
+            message=SimpleNamespace(
+                reply_document=AsyncMock(side_effect=Exception("Forbidden: bot was blocked")),
+                reply_text=AsyncMock(),
+            ),
+        )
+        ctx, _ = _make_context()
+        ctx.bot_data["pdf_generator"] = MagicMock()
+        ctx.bot_data["pdf_generator"].generate.return_value = str(pdf_file)
+        _AUTH_CACHE[12345] = True
+
+        t = SimpleNamespace(
+            id=7, file_name="a.ogg", transcription_text="text", analysis_text="", created_at=None
+        )
+        with patch("src.bot.handlers.repo.get_transcription_by_id", new_callable=AsyncMock, return_value=t):
+            await pdf_callback_handler(update, ctx)
+
+        assert not pdf_file.exists()
+
 
 class TestConversationHandler:
     def test_conversation_handler_created(self):
@@ -181,6 +521,14 @@ class TestRegisterHandlers:
         # At least: conversation, help, history, logout, cost, pdf callback, history callback, file, unknown
         assert app.add_handler.call_count >= 7
 
+    def test_callback_patterns(self):
+        """Compiled callback patterns should match only their own prefixes."""
+        assert _PDF_PAT.match("pdf:7")
+        assert not _PDF_PAT.match("history:7")
+        assert _HIST_PAT.match("history:7")
+        assert _HIST_PAT.match("hpage:2")
+        assert not _HIST_PAT.match("pdf:7")
+
 
 class TestCostConstants:
     def test_speechkit_cost_per_sec(self):
@@ -0,0 +1,46 @@
+"""Unit tests for inline keyboard builders."""
+
+from collections import namedtuple
+from datetime import datetime
+
+from src.bot.keyboards import get_history_keyboard, get_pdf_keyboard
+
+_Row = namedtuple("_Row", ["id", "file_name", "created_at"])
+
+
+def _rows(n):
+    return [_Row(i, f"file_{i}.ogg", datetime(2025, 1, 15, 12, i)) for i in range(n)]
+
+
+class TestPdfKeyboard:
+    def test_callback_data(self):
+        keyboard = get_pdf_keyboard(42)
+        assert keyboard.inline_keyboard[0][0].callback_data == "pdf:42"
+
+
+class TestHistoryKeyboard:
+    def test_item_buttons(self):
+        keyboard = get_history_keyboard(_rows(2))
+        first = keyboard.inline_keyboard[0][0]
+        assert first.callback_data == "history:0"
+        assert first.text == "📝 15.01 12:00 | file_0.ogg"
+        assert len(keyboard.inline_keyboard) == 2
+
+    def test_next_only_on_first_page(self):
+        keyboard = get_history_keyboard(_rows(5), page=0, has_next=True)
+        nav = keyboard.inline_keyboard[-1]
+        assert [b.callback_data for b in nav] == ["hpage:1"]
+
+    def test_back_and_next(self):
+        keyboard = get_history_keyboard(_rows(5), page=1, has_next=True)
+        nav = keyboard.inline_keyboard[-1]
+        assert [b.callback_data for b in nav] == ["hpage:0", "hpage:2"]
+
+    def test_last_page_has_no_next(self):
+        keyboard = get_history_keyboard(_rows(2), page=2, has_next=False)
+        nav = keyboard.inline_keyboard[-1]
+        assert [b.callback_data for b in nav] == ["hpage:1"]
+
+    def test_missing_created_at(self):
+        keyboard = get_history_keyboard([_Row(1, "a.ogg", None)])
+        assert keyboard.inline_keyboard[0][0].text == "📝  | a.ogg"
@@ -1,28 +1,33 @@
 """Unit tests for authorization middleware."""
 
+from types import SimpleNamespace
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from src.bot.middleware import _AUTH_CACHE, get_cached_auth, invalidate_auth, require_auth
+
 
-from src.bot.middleware import require_auth
+@pytest.fixture(autouse=True)
+def _clear_auth_cache():
+    """Keep the process-local auth cache isolated between tests."""
+    _AUTH_CACHE.clear()
+    yield
+    _AUTH_CACHE.clear()
 
 
 @pytest.fixture
 def update():
-    """Create a mock Telegram Update."""
-    upd = MagicMock()
-    upd.effective_chat = MagicMock()
-    upd.effective_chat.id = 12345
-    upd.effective_chat.send_message = AsyncMock()
-    return upd
+    """Create a fake Telegram Update."""
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=12345, send_message=AsyncMock()),
+    )
 
 
 @pytest.fixture
 def context():
-    """Create a mock context with db_session_factory."""
-    ctx = MagicMock()
-    ctx.bot_data = {}
-    return ctx
+    """Create a fake context with an empty bot_data."""
+    return SimpleNamespace(bot_data={})
 
 
 def _make_session_factory(is_authorized: bool):
@@ -46,12 +51,7 @@ class TestRequireAuth:
         handler = AsyncMock(return_value="handler_result")
         decorated = require_auth(handler)
 
-        factory = MagicMock()
-        session = AsyncMock()
-        cm = AsyncMock()
-        cm.__aenter__ = AsyncMock(return_value=session)
-        cm.__aexit__ = AsyncMock(return_value=False)
-        factory.return_value = cm
+        factory, _, _ = _make_session_factory(True)
         context.bot_data["db_session_factory"] = factory
 
         with patch("src.bot.middleware.is_user_authorized", new_callable=AsyncMock, return_value=True):
@@ -66,12 +66,7 @@ class TestRequireAuth:
         handler = AsyncMock()
         decorated = require_auth(handler)
 
-        factory = MagicMock()
-        session = AsyncMock()
-        cm = AsyncMock()
-        cm.__aenter__ = AsyncMock(return_value=session)
-        cm.__aexit__ = AsyncMock(return_value=False)
-        factory.return_value = cm
+        factory, _, _ = _make_session_factory(True)
         context.bot_data["db_session_factory"] = factory
 
         with patch("src.bot.middleware.is_user_authorized", new_callable=AsyncMock, return_value=False):
@@ -88,8 +83,7 @@ class TestRequireAuth:
         handler = AsyncMock()
         decorated = require_auth(handler)
 
-        update = MagicMock()
-        update.effective_chat = None
+        update = SimpleNamespace(effective_chat=None)
 
         result = await decorated(update, context)
         handler.assert_not_called()
@@ -117,3 +111,69 @@ class TestRequireAuth:
 
         decorated = require_auth(my_handler)
         assert decorated.__name__ == "my_handler"
+
+
+class TestAuthCache:
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_db(self, update, context):
+        """Second update from the same chat should not open a DB session."""
+        handler = AsyncMock()
+        decorated = require_auth(handler)
+
+        factory, _, _ = _make_session_factory(True)
+        context.bot_data["db_session_factory"] = factory
+
+        with patch("src.bot.middleware.is_user_authorized", new_callable=AsyncMock, return_value=True) as mock_check:
+            await decorated(update, context)
+            await decorated(update, context)
+
+        assert mock_check.await_count == 1
+        assert factory.call_count == 1
+        assert handler.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_forces_db_check(self, update, context):
+        """invalidate_auth should drop the cached status."""
+        handler = AsyncMock()
+        decorated = require_auth(handler)
+
+        factory, _, _ = _make_session_factory(True)
+        context.bot_data["db_session_factory"] = factory
+
+        with patch("src.bot.middleware.is_user_authorized", new_callable=AsyncMock, return_value=True):
+            await decorated(update, context)
+
+        invalidate_auth(12345)
+
+        with patch("src.bot.middleware.is_user_authorized", new_callable=AsyncMock, return_value=False):
+            await decorated(update, context)
+
+        assert handler.await_count == 1
+        msg = update.effective_chat.send_message.call_args[0][0]
+        assert "авторизуйтесь" in msg
+
+    @pytest.mark.asyncio
+    async def test_read_in_flight_during_invalidation_not_cached(self):
+        """A status read before a logout commits must not be cached afterwards."""
+        factory, _, _ = _make_session_factory(True)
+
+        async def stale_read(session, chat_id):
+            invalidate_auth(chat_id)  # logout commits while the read is in flight
+            return True
+
+        with patch("src.bot.middleware.is_user_authorized", side_effect=stale_read):
+            assert await get_cached_auth(12345, factory) is True
+
+        assert 12345 not in _AUTH_CACHE
+
+    @pytest.mark.asyncio
+    async def test_no_session_factory_errors_even_when_cached(self, update, context):
+        """A missing session factory is reported regardless of cache state."""
+        handler = AsyncMock()
+        decorated = require_auth(handler)
+        _AUTH_CACHE[12345] = True
+
+        await decorated(update, context)
+
+        handler.assert_not_called()
+        assert "⚠️" in update.effective_chat.send_message.call_args[0][0]
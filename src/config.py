@@ -1,5 +1,6 @@
 """Application configuration — loads and validates environment variables."""
 
+from functools import lru_cache
 from pathlib import Path
 
 from pydantic import field_validator
@@ -18,6 +19,9 @@ class Settings(BaseSettings):
     # ── Telegram ──────────────────────────────────────────────
     telegram_bot_token: str
 
+    # Chat the bot posts /help into once at startup to serve it via copy_message
+    help_source_chat_id: int | None = None
+
     # ── Access control ────────────────────────────────────────
     bot_access_password: str = "changeme"
     max_users: int = 20
@@ -25,6 +29,8 @@ class Settings(BaseSettings):
     # ── Yandex Cloud common ───────────────────────────────────
     yc_folder_id: str
     yc_service_account_key_file: str
+    # Optional file to persist the IAM token across restarts
+    yc_iam_token_cache_file: str | None = None
 
     # ── Yandex Object Storage (S3) ────────────────────────────
     yc_s3_bucket: str = "transcribe-bot-audio"
@@ -41,11 +47,20 @@ class Settings(BaseSettings):
 
     # ── PostgreSQL ────────────────────────────────────────────
     database_url: str
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_statement_cache_size: int = 1024
+    db_prepared_statement_cache_size: int = 256
+    db_disable_jit: bool = True
 
     # ── Processing ────────────────────────────────────────────
     max_file_duration_seconds: int = 14400  # 4 hours
     max_file_size_bytes: int = 1_073_741_824  # 1 GB
     queue_workers: int = 3
+    download_workers: int = 3
+    download_queue_max: int = 50
     tmp_dir: str = "/tmp/transcribe"
 
     @field_validator("yandexgpt_model_uri", mode="before")
@@ -73,6 +88,7 @@ class Settings(BaseSettings):
         return v
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Create and return a Settings instance."""
+    """Return the process-wide Settings instance, parsed on first call."""
     return Settings()
@@ -0,0 +1,33 @@
+"""Shared fixtures for database tests."""
+
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.db.models import Base
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def engine():
+    """Create the in-memory SQLite schema once per test session."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def async_session(engine):
+    """Yield a session whose work is rolled back after each test."""
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        session = AsyncSession(
+            bind=conn,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+            await trans.rollback()
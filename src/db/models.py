@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Float, ForeignKey, String, Text, func
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, ForeignKey, Index, String, Text, desc, func
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -28,6 +28,11 @@ class User(Base):
         order_by="desc(Transcription.created_at)",
     )
 
+    __table_args__ = (
+        # Backs the early-stopping user-limit probe in authorize_user
+        Index("ix_users_authorized_true", "id", postgresql_where=is_authorized.is_(True)),
+    )
+
     def __repr__(self) -> str:
         return f"<User(id={self.id}, chat_id={self.chat_id}, authorized={self.is_authorized})>"
 
@@ -49,13 +54,65 @@ class Transcription(Base):
 
     user: Mapped["User"] = relationship(back_populates="transcriptions")
 
+    __table_args__ = (
+        # Per-user history is read newest first with LIMIT; no sort needed
+        Index("ix_tx_user_created", "user_id", desc("created_at")),
+    )
+
     def __repr__(self) -> str:
         return f"<Transcription(id={self.id}, file={self.file_name}, user_id={self.user_id})>"
 
 
-def create_db_engine(database_url: str):
-    """Create an async database engine."""
-    return create_async_engine(database_url, echo=False)
+def create_db_engine(
+    database_url: str,
+    pool_size: int = 20,
+    max_overflow: int = 10,
+    pool_timeout: int = 30,
+    pool_recycle: int = 1800,
+    statement_cache_size: int = 1024,
+    prepared_statement_cache_size: int = 256,
+    disable_jit: bool = True,
+    query_cache_size: int = 1200,
+):
+    """Create an async database engine.
+
+    Server databases get a LIFO queue pool so a small set of warm
+    connections serves steady-state load while overflow ones idle out.
+    For asyncpg, prepared-statement caches are sized explicitly so the
+    repeated repository queries skip parse/plan, and JIT can be turned off
+    since it only adds latency to these short OLTP queries.
+    SQLite (tests, local runs) keeps SQLAlchemy's default pool.
+
+    ``query_cache_size`` raises the compiled-SQL cache above the default
+    500 entries so every repository statement (and its per-dialect
+    variants) stays compiled; it applies to ``text()`` and ad-hoc queries
+    as well.
+    """
+    if database_url.startswith("sqlite"):
+        return create_async_engine(database_url, echo=False, query_cache_size=query_cache_size)
+
+    connect_args = {}
+    if database_url.startswith("postgresql+asyncpg"):
+        connect_args = {
+            "statement_cache_size": statement_cache_size,
+            "prepared_statement_cache_size": prepared_statement_cache_size,
+        }
+        if disable_jit:
+            connect_args["server_settings"] = {"jit": "off"}
+
+    return create_async_engine(
+        database_url,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+        query_cache_size=query_cache_size,
+        use_insertmanyvalues=True,
+        connect_args=connect_args,
+    )
 
 
 def create_session_factory(engine):
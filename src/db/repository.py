@@ -1,10 +1,24 @@
 """Database repository — CRUD operations for users and transcriptions."""
 
-from sqlalchemy import func, select
+import enum
+import hmac
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from sqlalchemy import Row, func, insert, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, selectinload
 
 from src.db.models import Transcription, User
 
+# Dialects whose INSERT supports ON CONFLICT ... RETURNING
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+# PostgreSQL advisory lock key that serializes user-limit checks
+_USER_LIMIT_LOCK_KEY = 0x7573_6572  # "user"
+
 
 async def get_or_create_user(session: AsyncSession, chat_id: int) -> User:
     """Get an existing user or create a new one (unauthorized by default)."""
@@ -24,43 +38,183 @@ async def authorize_user(session: AsyncSession, chat_id: int, max_users: int = 2
     Checks:
     - If user is already authorized → success.
     - If max user limit is reached → failure.
+
+    On PostgreSQL and SQLite the user is created-or-authorized with a single
+    ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``; the limit is checked
+    afterwards and the change is undone if it overshot.
+
+    Concurrent authorizations are serialized until the transaction ends:
+    by a transaction-level advisory lock on PostgreSQL, and by SQLite's
+    single-writer lock. Without that, two uncommitted upserts could each
+    miss the other's row in the limit check.
     """
-    user = await get_or_create_user(session, chat_id)
+    insert = _upsert_insert(session)
+    await _lock_user_limit(session)
 
-    if user.is_authorized:
+    stmt = (
+        insert(User)
+        .values(chat_id=chat_id, is_authorized=True)
+        .on_conflict_do_update(
+            index_elements=[User.chat_id],
+            set_={"is_authorized": True},
+            where=User.is_authorized.is_(False),
+        )
+        .returning(User)
+    )
+    # populate_existing refreshes a User already loaded in this session
+    result = await session.execute(stmt, execution_options={"populate_existing": True})
+    if result.scalar_one_or_none() is None:
+        # Conflict row was already authorized, so the WHERE skipped the update
         return True, "already_authorized"
 
-    count = await get_authorized_user_count(session)
-    if count >= max_users:
+    if await _user_limit_reached(session, max_users + 1):
+        await session.execute(
+            update(User).where(User.chat_id == chat_id).values(is_authorized=False)
+        )
         return False, "user_limit_reached"
 
-    user.is_authorized = True
-    await session.flush()
     return True, "authorized"
 
 
+async def authorize_users_bulk(
+    session: AsyncSession, chat_ids: list[int], max_users: int = 20
+) -> tuple[list[int], list[int]]:
+    """Authorize many users at once, up to the user limit (admin bulk grant).
+
+    Already-authorized users keep their slot. New users are granted in the
+    given order while free slots remain, all with one multi-row upsert.
+
+    Returns:
+        Tuple of (authorized chat IDs, chat IDs skipped due to the limit).
+    """
+    chat_ids = list(dict.fromkeys(chat_ids))
+    if not chat_ids:
+        return [], []
+
+    insert = _upsert_insert(session)
+    await _lock_user_limit(session)
+
+    already = set(
+        (
+            await session.scalars(
+                select(User.chat_id).where(
+                    User.chat_id.in_(chat_ids), User.is_authorized.is_(True)
+                )
+            )
+        ).all()
+    )
+    pending = [c for c in chat_ids if c not in already]
+    free = max(max_users - await get_authorized_user_count(session), 0)
+    granted, skipped = pending[:free], pending[free:]
+
+    if granted:
+        stmt = insert(User).values(
+            [{"chat_id": c, "is_authorized": True} for c in granted]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.chat_id], set_={"is_authorized": True}
+        ).returning(User)
+        await session.execute(stmt, execution_options={"populate_existing": True})
+
+    already.update(granted)
+    return [c for c in chat_ids if c in already], skipped
+
+
+def _upsert_insert(session: AsyncSession):
+    """Return the session dialect's ``insert`` with ON CONFLICT support.
+
+    Raises:
+        NotImplementedError: If the dialect is neither PostgreSQL nor SQLite.
+    """
+    dialect = session.get_bind().dialect.name
+    try:
+        return _UPSERT_INSERTS[dialect]
+    except KeyError:
+        raise NotImplementedError(f"Unsupported database dialect: {dialect}") from None
+
+
+async def _lock_user_limit(session: AsyncSession) -> None:
+    """On PostgreSQL, hold the user-limit lock until the transaction ends."""
+    if session.get_bind().dialect.name == "postgresql":
+        await session.execute(select(func.pg_advisory_xact_lock(_USER_LIMIT_LOCK_KEY)))
+
+
+async def _user_limit_reached(session: AsyncSession, max_users: int) -> bool:
+    """Return True if at least ``max_users`` users are already authorized.
+
+    Probes for the ``max_users``-th authorized row instead of counting all
+    of them, so the scan over the partial index stops early.
+    """
+    stmt = (
+        select(literal(1))
+        .select_from(User)
+        .where(User.is_authorized.is_(True))
+        .offset(max_users - 1)
+        .limit(1)
+    )
+    result = await session.execute(stmt)
+    return result.scalar() is not None
+
+
+class AuthResult(enum.Enum):
+    """Outcome of a password-based authorization attempt."""
+
+    WRONG_PASSWORD = "wrong_password"
+    LIMIT_REACHED = "user_limit_reached"
+    AUTHORIZED = "authorized"
+
+
+async def verify_password_and_authorize(
+    session: AsyncSession,
+    chat_id: int,
+    password: str,
+    expected: str | bytes,
+    max_users: int = 20,
+) -> AuthResult:
+    """Check the password and, if it matches, authorize the user.
+
+    The comparison is constant-time. A wrong password returns before any
+    statement is issued, so inside a lazily-connected ``session.begin()``
+    block it costs no DB round-trip.
+
+    Args:
+        expected: The access password, ideally pre-encoded to UTF-8 bytes.
+    """
+    if isinstance(expected, str):
+        expected = expected.encode()
+    if not hmac.compare_digest(password.encode(), expected):
+        return AuthResult.WRONG_PASSWORD
+
+    success, _ = await authorize_user(session, chat_id, max_users=max_users)
+    return AuthResult.AUTHORIZED if success else AuthResult.LIMIT_REACHED
+
+
 async def deauthorize_user(session: AsyncSession, chat_id: int) -> bool:
-    """Deauthorize a user. Returns True if user existed and was deauthorized."""
-    stmt = select(User).where(User.chat_id == chat_id)
+    """Deauthorize a user. Returns True if user existed and was deauthorized.
+
+    A single ``UPDATE ... RETURNING``; callers drop the user's cached auth
+    status (``middleware.invalidate_auth``) after committing.
+    """
+    stmt = (
+        update(User)
+        .where(User.chat_id == chat_id)
+        .values(is_authorized=False)
+        .returning(User.id)
+    )
     result = await session.execute(stmt)
-    user = result.scalar_one_or_none()
-    if user is None:
-        return False
-    user.is_authorized = False
-    await session.flush()
-    return True
+    return result.scalar_one_or_none() is not None
 
 
 async def is_user_authorized(session: AsyncSession, chat_id: int) -> bool:
     """Check if a user is authorized."""
-    stmt = select(User.is_authorized).where(User.chat_id == chat_id)
-    result = await session.execute(stmt)
-    authorized = result.scalar_one_or_none()
+    authorized = await session.scalar(
+        select(User.is_authorized).where(User.chat_id == chat_id)
+    )
     return authorized is True
 
 
 async def get_authorized_user_count(session: AsyncSession) -> int:
-    """Get the number of currently authorized users."""
+    """Get the number of currently authorized users (for reporting, not the auth path)."""
     stmt = select(func.count()).select_from(User).where(User.is_authorized == True)  # noqa: E712
     result = await session.execute(stmt)
     return result.scalar_one()
@@ -75,8 +229,47 @@ async def save_transcription(
     transcription_text: str | None = None,
     analysis_text: str | None = None,
     cost_rubles: float | None = None,
+) -> Row:
+    """Save a new transcription record.
+
+    A Core ``INSERT ... RETURNING``: no ORM instance, identity-map entry or
+    attribute history is created for a row that is written once.
+
+    Returns:
+        Row with the new record's ``id`` and ``created_at``.
+    """
+    stmt = (
+        insert(Transcription)
+        .values(
+            user_id=user_id,
+            file_name=file_name,
+            file_type=file_type,
+            duration_seconds=duration_seconds,
+            transcription_text=transcription_text,
+            analysis_text=analysis_text,
+            cost_rubles=cost_rubles,
+        )
+        .returning(Transcription.id, Transcription.created_at)
+    )
+    result = await session.execute(stmt)
+    return result.one()
+
+
+async def save_transcription_orm(
+    session: AsyncSession,
+    user_id: int,
+    file_name: str,
+    file_type: str,
+    duration_seconds: float | None = None,
+    transcription_text: str | None = None,
+    analysis_text: str | None = None,
+    cost_rubles: float | None = None,
 ) -> Transcription:
-    """Save a new transcription record."""
+    """Save a new transcription record and return it as a mapped instance.
+
+    For callers that go on to use the entity (e.g. its ``user`` relationship)
+    within the same session; otherwise prefer :func:`save_transcription`.
+    """
     transcription = Transcription(
         user_id=user_id,
         file_name=file_name,
@@ -91,30 +284,187 @@ async def save_transcription(
     return transcription
 
 
+async def save_transcriptions_bulk(session: AsyncSession, rows: list[dict]) -> list[int]:
+    """Save many transcription records in one batched INSERT.
+
+    Each dict takes the keyword arguments of :func:`save_transcription`.
+    SQLAlchemy's "insertmanyvalues" mode sends the rows as multi-row
+    ``INSERT ... VALUES ... RETURNING`` statements rather than one per row.
+
+    Returns:
+        The new transcription IDs, in the order of ``rows``.
+    """
+    if not rows:
+        return []
+    stmt = insert(Transcription).returning(Transcription.id, sort_by_parameter_order=True)
+    result = await session.execute(stmt, rows)
+    return list(result.scalars().all())
+
+
+def _user_id_subquery(chat_id: int):
+    """Scalar subquery resolving a Telegram chat ID to ``users.id``."""
+    return select(User.id).where(User.chat_id == chat_id).scalar_subquery()
+
+
+async def get_user_with_transcriptions(session: AsyncSession, chat_id: int) -> User | None:
+    """Get a user together with all of their transcriptions.
+
+    This is the canonical way to read a user's full history as entities:
+    ``selectinload`` fetches the related rows in one batched
+    ``WHERE user_id IN (...)`` query instead of a lazy load per user.
+    """
+    stmt = (
+        select(User)
+        .where(User.chat_id == chat_id)
+        .options(selectinload(User.transcriptions))
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+def _history_stmt(chat_id: int, cursor: tuple[datetime, int] | None = None):
+    """Select a user's transcriptions newest first, after ``cursor`` if given.
+
+    Filters on ``user_id`` through a scalar subquery rather than a join.
+    """
+    stmt = select(Transcription).where(Transcription.user_id == _user_id_subquery(chat_id))
+    if cursor is not None:
+        stmt = stmt.where(tuple_(Transcription.created_at, Transcription.id) < cursor)
+    return stmt.order_by(Transcription.created_at.desc(), Transcription.id.desc())
+
+
+async def _fetch_history_page(
+    session: AsyncSession, stmt, limit: int
+) -> tuple[list[Transcription], tuple[datetime, int] | None]:
+    """Run a history statement for one page and compute the next cursor."""
+    result = await session.execute(stmt.limit(limit))
+    items = list(result.scalars().all())
+    next_cursor = (items[-1].created_at, items[-1].id) if items else None
+    return items, next_cursor
+
+
 async def get_user_transcriptions(
     session: AsyncSession,
     chat_id: int,
     limit: int = 10,
+    cursor: tuple[datetime, int] | None = None,
+) -> tuple[list[Transcription], tuple[datetime, int] | None]:
+    """Get one page of a user's transcription history (newest first).
+
+    Uses keyset pagination: pass the cursor returned for the previous page
+    to get the next one. Each page is an index range scan on
+    ``(user_id, created_at)`` no matter how deep it is, unlike OFFSET.
+
+    Returns:
+        Tuple of (transcriptions, cursor for the next page or None if empty).
+    """
+    return await _fetch_history_page(session, _history_stmt(chat_id, cursor), limit)
+
+
+async def get_user_transcriptions_meta(
+    session: AsyncSession,
+    chat_id: int,
+    limit: int = 10,
+    cursor: tuple[datetime, int] | None = None,
+) -> tuple[list[Transcription], tuple[datetime, int] | None]:
+    """Like :func:`get_user_transcriptions`, without the large text columns.
+
+    ``transcription_text`` and ``analysis_text`` are deferred with
+    ``raiseload``, so reading them raises instead of issuing a hidden query.
+    """
+    stmt = _history_stmt(chat_id, cursor).options(
+        defer(Transcription.transcription_text, raiseload=True),
+        defer(Transcription.analysis_text, raiseload=True),
+    )
+    return await _fetch_history_page(session, stmt, limit)
+
+
+async def iter_user_transcriptions(
+    session: AsyncSession, chat_id: int
+) -> AsyncIterator[Transcription]:
+    """Yield all of a user's transcriptions (newest first) from a streamed result.
+
+    Rows come from a server-side cursor, so memory stays bounded by the
+    driver's fetch size rather than the full history — use this for bulk
+    processing such as exports.
+    """
+    result = await session.stream_scalars(_history_stmt(chat_id))
+    async for transcription in result:
+        yield transcription
+
+
+async def get_history_page_projection(
+    session: AsyncSession,
+    chat_id: int,
     offset: int = 0,
-) -> list[Transcription]:
-    """Get transcription history for a user (newest first)."""
+    limit: int = 5,
+) -> tuple[list[tuple[int, str, datetime]], bool]:
+    """Get one page of history as ``(id, file_name, created_at)`` rows (newest first).
+
+    Only the columns needed to render the history keyboard are selected.
+    One extra row is fetched to tell whether a next page exists.
+
+    Returns:
+        Tuple of (page rows, has_next).
+    """
     stmt = (
-        select(Transcription)
-        .join(User)
-        .where(User.chat_id == chat_id)
-        .order_by(Transcription.created_at.desc())
-        .limit(limit)
+        select(Transcription.id, Transcription.file_name, Transcription.created_at)
+        .where(Transcription.user_id == _user_id_subquery(chat_id))
+        .order_by(Transcription.created_at.desc(), Transcription.id.desc())
         .offset(offset)
+        .limit(limit + 1)
     )
     result = await session.execute(stmt)
-    return list(result.scalars().all())
+    rows = list(result.all())
+    return rows[:limit], len(rows) > limit
+
+
+async def get_latest_transcription_summary(
+    session: AsyncSession, chat_id: int
+) -> tuple[str, float | None] | None:
+    """Get ``(file_name, duration_seconds)`` of the user's latest transcription.
+
+    Skips the transcription and analysis text columns, which /cost never reads.
+    """
+    stmt = (
+        select(Transcription.file_name, Transcription.duration_seconds)
+        .where(Transcription.user_id == _user_id_subquery(chat_id))
+        .order_by(Transcription.created_at.desc())
+        .limit(1)
+    )
+    result = await session.execute(stmt)
+    return result.first()
+
+
+async def count_user_transcriptions(session: AsyncSession, chat_id: int) -> int:
+    """Get the total number of transcriptions for a user."""
+    stmt = (
+        select(func.count())
+        .select_from(Transcription)
+        .where(Transcription.user_id == _user_id_subquery(chat_id))
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one()
 
 
 async def get_transcription_by_id(
     session: AsyncSession,
     transcription_id: int,
-) -> Transcription | None:
-    """Get a single transcription by its ID."""
-    stmt = select(Transcription).where(Transcription.id == transcription_id)
+) -> Row | None:
+    """Get a single transcription by its ID.
+
+    Returns a row with ``id``, ``file_name``, ``transcription_text``,
+    ``analysis_text`` and ``created_at`` attributes — the columns the
+    history and PDF callbacks read. Projecting columns rather than loading
+    the entity means no relationship can trigger a lazy load, so each
+    lookup is exactly one SELECT.
+    """
+    stmt = select(
+        Transcription.id,
+        Transcription.file_name,
+        Transcription.transcription_text,
+        Transcription.analysis_text,
+        Transcription.created_at,
+    ).where(Transcription.id == transcription_id)
     result = await session.execute(stmt)
-    return result.scalar_one_or_none()
+    return result.one_or_none()
@@ -1,28 +1,16 @@
 """Unit tests for database models."""
 
 import pytest
+from unittest.mock import patch
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import Base, Transcription, User
-
-
-@pytest.fixture
-async def async_session():
-    """Create an in-memory SQLite async session for testing."""
-    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-    session_factory = async_sessionmaker(engine, expire_on_commit=False)
-    async with session_factory() as session:
-        yield session
-
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-    await engine.dispose()
+from src.db.models import Transcription, User, create_db_engine
 
 
+@pytest.mark.asyncio(loop_scope="session")
 class TestUserModel:
     """Tests for the User model."""
 
@@ -57,6 +45,7 @@ class TestUserModel:
             await async_session.flush()
 
 
+@pytest.mark.asyncio(loop_scope="session")
 class TestTranscriptionModel:
     """Tests for the Transcription model."""
 
@@ -115,3 +104,54 @@ class TestTranscriptionModel:
         assert t.transcription_text is None
         assert t.analysis_text is None
         assert t.cost_rubles is None
+
+
+class TestIndexes:
+    """Tests for query-supporting indexes."""
+
+    @staticmethod
+    def _ddl(table, name: str) -> str:
+        index = next(i for i in table.indexes if i.name == name)
+        return str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+    def test_history_index(self):
+        ddl = self._ddl(Transcription.__table__, "ix_tx_user_created")
+        assert "(user_id, created_at DESC)" in ddl
+
+    def test_authorized_partial_index(self):
+        ddl = self._ddl(User.__table__, "ix_users_authorized_true")
+        assert "WHERE is_authorized IS true" in ddl
+
+
+class TestCreateDbEngine:
+    """Tests for engine pool configuration."""
+
+    async def test_postgres_uses_lifo_queue_pool(self):
+        engine = create_db_engine(
+            "postgresql+asyncpg://u:p@localhost/db", pool_size=7, max_overflow=3
+        )
+        try:
+            assert type(engine.pool).__name__ == "AsyncAdaptedQueuePool"
+            assert engine.pool.size() == 7
+            assert engine.pool._max_overflow == 3
+            assert engine.pool._pre_ping is True
+            assert engine.sync_engine._compiled_cache.capacity == 1200
+        finally:
+            await engine.dispose()
+
+    async def test_asyncpg_connect_args(self):
+        with patch("src.db.models.create_async_engine") as mock_create:
+            create_db_engine("postgresql+asyncpg://u:p@localhost/db", disable_jit=True)
+
+        connect_args = mock_create.call_args.kwargs["connect_args"]
+        assert connect_args["statement_cache_size"] == 1024
+        assert connect_args["prepared_statement_cache_size"] == 256
+        assert connect_args["server_settings"] == {"jit": "off"}
+
+    async def test_sqlite_keeps_default_pool(self):
+        engine = create_db_engine("sqlite+aiosqlite:///:memory:")
+        try:
+            async with engine.connect() as conn:
+                assert (await conn.execute(select(1))).scalar() == 1
+        finally:
+            await engine.dispose()
@@ -1,26 +1,17 @@
 """Unit tests for database repository."""
 
+import asyncio
+from datetime import datetime, timedelta, timezone
+
 import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from src.db.models import Base, User
+from src.db.models import Base, Transcription, User
 from src.db import repository as repo
 
-
-@pytest.fixture
-async def async_session():
-    """Create an in-memory SQLite async session for testing."""
-    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-    session_factory = async_sessionmaker(engine, expire_on_commit=False)
-    async with session_factory() as session:
-        yield session
-
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-    await engine.dispose()
+pytestmark = pytest.mark.asyncio(loop_scope="session")
 
 
 class TestGetOrCreateUser:
@@ -69,6 +60,118 @@ class TestAuthorizeUser:
         assert success is False
         assert msg == "user_limit_reached"
 
+    async def test_rejected_user_stays_unauthorized(self, async_session: AsyncSession):
+        await repo.authorize_user(async_session, chat_id=1, max_users=1)
+
+        success, _ = await repo.authorize_user(async_session, chat_id=2, max_users=1)
+        assert success is False
+        assert await repo.is_user_authorized(async_session, 2) is False
+        assert await repo.get_authorized_user_count(async_session) == 1
+
+    async def test_refreshes_loaded_user(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        assert user.is_authorized is False
+
+        await repo.authorize_user(async_session, chat_id=100, max_users=20)
+        assert user.is_authorized is True
+
+    async def test_unsupported_dialect_raises(self, async_session: AsyncSession):
+        with patch.dict(repo._UPSERT_INSERTS, clear=True):
+            with pytest.raises(NotImplementedError, match="sqlite"):
+                await repo.authorize_user(async_session, chat_id=100, max_users=1)
+
+    async def test_unauthorized_users_do_not_take_slots(self, async_session: AsyncSession):
+        await repo.get_or_create_user(async_session, chat_id=1)
+        await repo.get_or_create_user(async_session, chat_id=2)
+
+        success, msg = await repo.authorize_user(async_session, chat_id=3, max_users=1)
+        assert success is True
+        assert msg == "authorized"
+
+    async def test_concurrent_authorizations_respect_limit(self, tmp_path):
+        """Two sessions racing for the last slot: exactly one wins."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'race.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def attempt(chat_id: int) -> bool:
+            async with session_factory.begin() as session:
+                success, _ = await repo.authorize_user(session, chat_id=chat_id, max_users=1)
+                return success
+
+        try:
+            results = await asyncio.gather(attempt(1), attempt(2))
+            async with session_factory() as session:
+                count = await repo.get_authorized_user_count(session)
+        finally:
+            await engine.dispose()
+
+        assert sorted(results) == [False, True]
+        assert count == 1
+
+    async def test_postgresql_takes_advisory_lock(self):
+        session = MagicMock()
+        session.get_bind.return_value.dialect.name = "postgresql"
+        session.execute = AsyncMock()
+
+        await repo._lock_user_limit(session)
+
+        stmt = session.execute.call_args.args[0]
+        assert "pg_advisory_xact_lock" in str(stmt)
+
+
+class TestAuthorizeUsersBulk:
+    async def test_grants_up_to_limit(self, async_session: AsyncSession):
+        await repo.authorize_user(async_session, chat_id=1, max_users=3)
+        await repo.get_or_create_user(async_session, chat_id=2)
+
+        authorized, skipped = await repo.authorize_users_bulk(
+            async_session, [1, 2, 3, 4, 2], max_users=3
+        )
+
+        assert authorized == [1, 2, 3]
+        assert skipped == [4]
+        assert await repo.get_authorized_user_count(async_session) == 3
+        assert await repo.is_user_authorized(async_session, 4) is False
+
+    async def test_empty(self, async_session: AsyncSession):
+        assert await repo.authorize_users_bulk(async_session, []) == ([], [])
+
+    async def test_unsupported_dialect_raises(self, async_session: AsyncSession):
+        with patch.dict(repo._UPSERT_INSERTS, clear=True):
+            with pytest.raises(NotImplementedError):
+                await repo.authorize_users_bulk(async_session, [10, 11], max_users=1)
+
+
+class TestVerifyPasswordAndAuthorize:
+    async def test_wrong_password(self, async_session: AsyncSession):
+        result = await repo.verify_password_and_authorize(
+            async_session, chat_id=100, password="bad", expected="good"
+        )
+        assert result is repo.AuthResult.WRONG_PASSWORD
+        assert await repo.is_user_authorized(async_session, 100) is False
+
+    async def test_correct_password(self, async_session: AsyncSession):
+        result = await repo.verify_password_and_authorize(
+            async_session, chat_id=100, password="good", expected="good"
+        )
+        assert result is repo.AuthResult.AUTHORIZED
+        assert await repo.is_user_authorized(async_session, 100) is True
+
+    async def test_limit_reached(self, async_session: AsyncSession):
+        await repo.authorize_user(async_session, chat_id=1, max_users=1)
+        result = await repo.verify_password_and_authorize(
+            async_session, chat_id=2, password="good", expected="good", max_users=1
+        )
+        assert result is repo.AuthResult.LIMIT_REACHED
+
+    async def test_bytes_expected(self, async_session: AsyncSession):
+        result = await repo.verify_password_and_authorize(
+            async_session, chat_id=100, password="пароль", expected="пароль".encode()
+        )
+        assert result is repo.AuthResult.AUTHORIZED
+
 
 class TestDeauthorizeUser:
     async def test_deauthorize_existing(self, async_session: AsyncSession):
@@ -139,8 +242,10 @@ class TestSaveTranscription:
             cost_rubles=0.31,
         )
         assert t.id is not None
-        assert t.file_name == "test.mp3"
-        assert t.transcription_text == "Hello world"
+        assert t.created_at is not None
+        saved = await repo.get_transcription_by_id(async_session, t.id)
+        assert saved.file_name == "test.mp3"
+        assert saved.transcription_text == "Hello world"
 
     async def test_save_minimal(self, async_session: AsyncSession):
         user = await repo.get_or_create_user(async_session, chat_id=100)
@@ -151,9 +256,58 @@ class TestSaveTranscription:
             file_type="video",
         )
         assert t.id is not None
+        latest = await repo.get_latest_transcription_summary(async_session, chat_id=100)
+        assert tuple(latest) == ("video.mp4", None)
+
+    async def test_save_orm(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        t = await repo.save_transcription_orm(
+            async_session, user_id=user.id, file_name="a.ogg", file_type="audio"
+        )
+        assert isinstance(t, Transcription)
+        assert t.id is not None
         assert t.duration_seconds is None
 
 
+class TestSaveTranscriptionsBulk:
+    async def test_inserts_all_rows_in_order(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        rows = [
+            {"user_id": user.id, "file_name": f"f{i}.ogg", "file_type": "audio",
+             "duration_seconds": float(i)}
+            for i in range(30)
+        ]
+
+        ids = await repo.save_transcriptions_bulk(async_session, rows)
+
+        assert len(ids) == 30
+        first = await repo.get_transcription_by_id(async_session, ids[0])
+        last = await repo.get_transcription_by_id(async_session, ids[-1])
+        assert first.file_name == "f0.ogg"
+        assert last.file_name == "f29.ogg"
+        assert await repo.count_user_transcriptions(async_session, chat_id=100) == 30
+
+    async def test_empty(self, async_session: AsyncSession):
+        assert await repo.save_transcriptions_bulk(async_session, []) == []
+
+
+class TestGetUserWithTranscriptions:
+    async def test_loads_transcriptions_eagerly(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        for i in range(3):
+            await repo.save_transcription(
+                async_session, user_id=user.id, file_name=f"f{i}.ogg", file_type="audio"
+            )
+        async_session.expunge_all()
+
+        fetched = await repo.get_user_with_transcriptions(async_session, chat_id=100)
+        # Plain attribute access would raise MissingGreenlet if it lazy-loaded
+        assert len(fetched.transcriptions) == 3
+
+    async def test_missing_user(self, async_session: AsyncSession):
+        assert await repo.get_user_with_transcriptions(async_session, chat_id=999) is None
+
+
 class TestGetUserTranscriptions:
     async def test_get_history(self, async_session: AsyncSession):
         await repo.authorize_user(async_session, chat_id=100, max_users=20)
@@ -167,25 +321,163 @@ class TestGetUserTranscriptions:
                 file_type="audio",
             )
 
-        items = await repo.get_user_transcriptions(async_session, chat_id=100, limit=3)
+        items, _ = await repo.get_user_transcriptions(async_session, chat_id=100, limit=3)
         assert len(items) == 3
 
     async def test_get_empty_history(self, async_session: AsyncSession):
-        items = await repo.get_user_transcriptions(async_session, chat_id=999)
+        items, cursor = await repo.get_user_transcriptions(async_session, chat_id=999)
         assert items == []
+        assert cursor is None
 
     async def test_pagination(self, async_session: AsyncSession):
         user = await repo.get_or_create_user(async_session, chat_id=100)
-        for i in range(5):
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        # Explicit timestamps: SQLite's CURRENT_TIMESTAMP text would not
+        # compare correctly with a bound datetime; two rows share one to
+        # exercise the id tie-breaker
+        await repo.save_transcriptions_bulk(async_session, [
+            {"user_id": user.id, "file_name": f"f{i}.ogg", "file_type": "audio",
+             "created_at": base + timedelta(minutes=min(i, 3))}
+            for i in range(5)
+        ])
+
+        page1, cursor = await repo.get_user_transcriptions(async_session, chat_id=100, limit=2)
+        page2, cursor = await repo.get_user_transcriptions(
+            async_session, chat_id=100, limit=2, cursor=cursor
+        )
+        page3, cursor = await repo.get_user_transcriptions(
+            async_session, chat_id=100, limit=2, cursor=cursor
+        )
+
+        names = [t.file_name for t in page1 + page2 + page3]
+        assert names == ["f4.ogg", "f3.ogg", "f2.ogg", "f1.ogg", "f0.ogg"]
+
+    async def test_excludes_other_users(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        other = await repo.get_or_create_user(async_session, chat_id=200)
+        await repo.save_transcription(
+            async_session, user_id=user.id, file_name="mine.ogg", file_type="audio"
+        )
+        await repo.save_transcription(
+            async_session, user_id=other.id, file_name="theirs.ogg", file_type="audio"
+        )
+
+        items, _ = await repo.get_user_transcriptions(async_session, chat_id=100)
+        assert [t.file_name for t in items] == ["mine.ogg"]
+
+
+class TestGetUserTranscriptionsMeta:
+    async def test_defers_text_columns(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        await repo.save_transcriptions_bulk(async_session, [
+            {"user_id": user.id, "file_name": "a.ogg", "file_type": "audio",
+             "transcription_text": "long text"},
+        ])
+        async_session.expunge_all()
+
+        items, cursor = await repo.get_user_transcriptions_meta(async_session, chat_id=100)
+
+        assert [t.file_name for t in items] == ["a.ogg"]
+        assert cursor == (items[0].created_at, items[0].id)
+        with pytest.raises(InvalidRequestError):
+            _ = items[0].transcription_text
+
+
+class TestIterUserTranscriptions:
+    async def test_streams_all_rows(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        await repo.save_transcriptions_bulk(async_session, [
+            {"user_id": user.id, "file_name": f"f{i}.ogg", "file_type": "audio"}
+            for i in range(4)
+        ])
+
+        names = [t.file_name async for t in repo.iter_user_transcriptions(async_session, 100)]
+
+        assert sorted(names) == ["f0.ogg", "f1.ogg", "f2.ogg", "f3.ogg"]
+
+
+class TestGetHistoryPageProjection:
+    async def test_returns_page_and_has_next(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        for i in range(7):
             await repo.save_transcription(
                 async_session, user_id=user.id, file_name=f"f{i}.ogg", file_type="audio"
             )
 
-        page1 = await repo.get_user_transcriptions(async_session, chat_id=100, limit=2, offset=0)
-        page2 = await repo.get_user_transcriptions(async_session, chat_id=100, limit=2, offset=2)
-        assert len(page1) == 2
-        assert len(page2) == 2
-        assert page1[0].id != page2[0].id
+        rows, has_next = await repo.get_history_page_projection(
+            async_session, chat_id=100, offset=0, limit=5
+        )
+        assert len(rows) == 5
+        assert has_next is True
+        assert set(rows[0]._fields) == {"id", "file_name", "created_at"}
+
+        rows, has_next = await repo.get_history_page_projection(
+            async_session, chat_id=100, offset=5, limit=5
+        )
+        assert len(rows) == 2
+        assert has_next is False
+
+    async def test_equal_timestamps_paged_by_id(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        await repo.save_transcriptions_bulk(async_session, [
+            {"user_id": user.id, "file_name": f"f{i}.ogg", "file_type": "audio",
+             "created_at": created_at}
+            for i in range(5)
+        ])
+
+        page1, _ = await repo.get_history_page_projection(async_session, chat_id=100, limit=2)
+        page2, _ = await repo.get_history_page_projection(
+            async_session, chat_id=100, offset=2, limit=2
+        )
+        page3, _ = await repo.get_history_page_projection(
+            async_session, chat_id=100, offset=4, limit=2
+        )
+
+        names = [row.file_name for row in page1 + page2 + page3]
+        assert names == ["f4.ogg", "f3.ogg", "f2.ogg", "f1.ogg", "f0.ogg"]
+
+    async def test_empty(self, async_session: AsyncSession):
+        rows, has_next = await repo.get_history_page_projection(async_session, chat_id=999)
+        assert rows == []
+        assert has_next is False
+
+
+class TestGetLatestTranscriptionSummary:
+    async def test_returns_name_and_duration(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        other = await repo.get_or_create_user(async_session, chat_id=200)
+        await repo.save_transcription(
+            async_session, user_id=user.id, file_name="a.ogg", file_type="audio",
+            duration_seconds=90.0, transcription_text="long text",
+        )
+        await repo.save_transcription(
+            async_session, user_id=other.id, file_name="x.ogg", file_type="audio"
+        )
+
+        latest = await repo.get_latest_transcription_summary(async_session, chat_id=100)
+        assert tuple(latest) == ("a.ogg", 90.0)
+
+    async def test_none_when_empty(self, async_session: AsyncSession):
+        assert await repo.get_latest_transcription_summary(async_session, chat_id=999) is None
+
+
+class TestCountUserTranscriptions:
+    async def test_count(self, async_session: AsyncSession):
+        user = await repo.get_or_create_user(async_session, chat_id=100)
+        other = await repo.get_or_create_user(async_session, chat_id=200)
+        for i in range(3):
+            await repo.save_transcription(
+                async_session, user_id=user.id, file_name=f"f{i}.ogg", file_type="audio"
+            )
+        await repo.save_transcription(
+            async_session, user_id=other.id, file_name="x.ogg", file_type="audio"
+        )
+
+        assert await repo.count_user_transcriptions(async_session, chat_id=100) == 3
+
+    async def test_count_empty(self, async_session: AsyncSession):
+        assert await repo.count_user_transcriptions(async_session, chat_id=999) == 0
 
 
 class TestGetTranscriptionById:
@@ -197,6 +489,9 @@ class TestGetTranscriptionById:
         found = await repo.get_transcription_by_id(async_session, t.id)
         assert found is not None
         assert found.file_name == "a.ogg"
+        assert set(found._fields) == {
+            "id", "file_name", "transcription_text", "analysis_text", "created_at"
+        }
 
     async def test_not_found(self, async_session: AsyncSession):
         found = await repo.get_transcription_by_id(async_session, 99999)
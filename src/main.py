@@ -1,16 +1,16 @@
 """Application entry point — initializes bot, DB, queue, and starts polling."""
 
-import asyncio
 import logging
 import os
 import sys
 
 from telegram.ext import ApplicationBuilder
 
-from src.bot.handlers import register_handlers
+from src.bot.handlers import publish_help_message, register_handlers
 from src.config import get_settings
 from src.db.models import Base, create_db_engine, create_session_factory
 from src.services.audio import AudioProcessor
+from src.services.downloads import DownloadQueue, gc_tmp_dir
 from src.services.iam import IAMTokenManager
 from src.services.pdf import PDFGenerator
 from src.services.queue import TaskQueue
@@ -38,15 +38,28 @@ def main() -> None:
     settings = get_settings()
     logger.info("Starting Transcribe Bot...")
 
+    # Handlers write downloads here; create it once instead of per update
+    os.makedirs(settings.tmp_dir, exist_ok=True)
+    gc_tmp_dir(settings.tmp_dir)
+
     # ── Database ──────────────────────────────────────────
-    engine = create_db_engine(settings.database_url)
+    engine = create_db_engine(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        statement_cache_size=settings.db_statement_cache_size,
+        prepared_statement_cache_size=settings.db_prepared_statement_cache_size,
+        disable_jit=settings.db_disable_jit,
+    )
     session_factory = create_session_factory(engine)
 
-    # Run DB init in event loop
-    asyncio.get_event_loop().run_until_complete(init_db(engine))
-
     # ── Yandex Cloud services ─────────────────────────────
-    iam_manager = IAMTokenManager(settings.yc_service_account_key_file)
+    iam_manager = IAMTokenManager(
+        settings.yc_service_account_key_file,
+        token_cache_path=settings.yc_iam_token_cache_file,
+    )
 
     storage_client = ObjectStorageClient(
         access_key=settings.yc_s3_access_key,
@@ -97,16 +110,37 @@ def main() -> None:
     )
     application.bot_data["task_queue"] = task_queue
 
+    download_queue = DownloadQueue(
+        task_queue=task_queue,
+        tmp_dir=settings.tmp_dir,
+        num_workers=settings.download_workers,
+        max_pending=settings.download_queue_max,
+    )
+    application.bot_data["download_queue"] = download_queue
+
     # Register handlers
     register_handlers(application)
 
-    # Start queue workers after bot starts
+    # Init DB and start queue workers on the polling loop, so pooled
+    # connections belong to the loop that serves updates
     async def post_init(app):
+        await init_db(engine)
+        await iam_manager.start()
         await task_queue.start()
+        await download_queue.start()
         logger.info("Task queue started with %d workers", settings.queue_workers)
+        if settings.help_source_chat_id is not None:
+            app.bot_data["help_message"] = await publish_help_message(
+                app.bot, settings.help_source_chat_id
+            )
 
     async def pre_shutdown(app):
+        await download_queue.stop()
         await task_queue.stop()
+        await speechkit_client.aclose()
+        await yandexgpt_client.aclose()
+        await storage_client.aclose()
+        await iam_manager.aclose()
         await engine.dispose()
         logger.info("Shutdown complete")
 
@@ -6,15 +6,48 @@ import logging
 import os
 from pathlib import Path
 
+from cachetools import LRUCache
+
 logger = logging.getLogger(__name__)
 
-SUPPORTED_AUDIO_EXTENSIONS = {".ogg", ".mp3", ".wav", ".flac", ".m4a"}
-SUPPORTED_VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+SUPPORTED_AUDIO_EXTENSIONS = frozenset({".ogg", ".mp3", ".wav", ".flac", ".m4a"})
+SUPPORTED_VIDEO_EXTENSIONS = frozenset({".mp4", ".avi", ".mov", ".mkv", ".webm"})
 SUPPORTED_EXTENSIONS = SUPPORTED_AUDIO_EXTENSIONS | SUPPORTED_VIDEO_EXTENSIONS
 
 DEFAULT_MAX_DURATION = 14400  # 4 hours in seconds
 DEFAULT_MAX_SIZE = 1_073_741_824  # 1 GB in bytes
 
+# Target encoding for SpeechKit: OGG OPUS 48kHz mono 64 kbit/s.
+# Complexity 5 and the speech-tuned "voip" mode roughly halve encode time
+# versus libopus defaults (complexity 10, "audio") with no audible loss.
+OPUS_ENCODE_ARGS = (
+    "-acodec", "libopus",
+    "-ar", "48000",
+    "-ac", "1",
+    "-b:a", "64k",
+    "-compression_level", "5",
+    "-application", "voip",
+)
+OPUS_BYTES_PER_SEC = 64_000 // 8
+# Inputs that already match the target are remuxed without re-encoding
+OPUS_COPY_ARGS = ("-c:a", "copy")
+
+# Quiet, non-interactive FFmpeg invocation: no banner or progress output is
+# written into the stderr pipe, and FFmpeg never polls stdin
+FFMPEG_CMD = ("ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y")
+
+# Cap stream detection at ~1 MB / 1 s of input; format and stream headers
+# are all that -show_format/-show_streams need
+FAST_PROBE_ARGS = (
+    "-analyzeduration", "1000000",
+    "-probesize", "1000000",
+)
+
+
+def split_parts_dir(output_dir: str, base_name: str) -> str:
+    """Return the directory ``process_and_split`` writes segments into."""
+    return os.path.join(output_dir, f"{base_name}_parts")
+
 
 class AudioProcessingError(Exception):
     """Raised when audio/video processing fails."""
@@ -25,45 +58,46 @@ class AudioProcessor:
     """Handles audio/video file processing using FFmpeg.
 
     Provides methods for:
-    - Extracting audio tracks from video files
-    - Converting audio to OGG OPUS format
-    - Getting file duration and size
-    - Splitting large files into parts
+    - Probing duration and audio stream parameters
+    - Converting audio/video to OGG OPUS parts in a single FFmpeg pass
     """
 
+    def __init__(self, probe_cache_size: int = 256) -> None:
+        # (path, size, mtime_ns) -> parsed ffprobe JSON
+        self._probe_cache: LRUCache[tuple, dict] = LRUCache(maxsize=probe_cache_size)
+
     @staticmethod
     def is_video(file_path: str) -> bool:
         """Check if the file is a video based on extension."""
-        return Path(file_path).suffix.lower() in SUPPORTED_VIDEO_EXTENSIONS
+        return os.path.splitext(file_path)[1].lower() in SUPPORTED_VIDEO_EXTENSIONS
 
     @staticmethod
     def is_audio(file_path: str) -> bool:
         """Check if the file is an audio based on extension."""
-        return Path(file_path).suffix.lower() in SUPPORTED_AUDIO_EXTENSIONS
+        return os.path.splitext(file_path)[1].lower() in SUPPORTED_AUDIO_EXTENSIONS
 
     @staticmethod
     def is_supported(file_path: str) -> bool:
         """Check if the file format is supported."""
-        return Path(file_path).suffix.lower() in SUPPORTED_EXTENSIONS
+        return os.path.splitext(file_path)[1].lower() in SUPPORTED_EXTENSIONS
 
     @staticmethod
-    def get_file_size(file_path: str) -> int:
-        """Return the file size in bytes."""
-        return os.path.getsize(file_path)
-
-    @staticmethod
-    async def _run_ffmpeg(*args: str) -> str:
+    async def _run_ffmpeg(*args: str, capture_stdout: bool = False) -> str:
         """Run an FFmpeg/FFprobe command asynchronously.
 
+        FFmpeg writes its output to files, so stdout goes straight to
+        ``/dev/null`` unless ``capture_stdout`` is set (FFprobe's JSON);
+        only the short error log is read through a pipe.
+
         Returns:
-            stdout content as string.
+            stdout content as string, or an empty string if not captured.
 
         Raises:
             AudioProcessingError: If the command fails.
         """
         process = await asyncio.create_subprocess_exec(
             *args,
-            stdout=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE if capture_stdout else asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.PIPE,
         )
         stdout, stderr = await process.communicate()
@@ -74,101 +108,164 @@ class AudioProcessor:
             raise AudioProcessingError(
                 f"FFmpeg command failed (exit {process.returncode}): {cmd_str}\n{err}"
             )
-        return stdout.decode(errors="replace").strip()
+        return stdout.decode(errors="replace").strip() if stdout else ""
+
+    async def _probe(self, file_path: str) -> dict:
+        """Run FFprobe once and return its parsed format/streams JSON.
+
+        Results are cached by ``(path, size, mtime_ns)``, so a file that has
+        not changed is never probed twice; a rewritten file gets a new key.
+        """
+        try:
+            st = os.stat(file_path)
+            key = (file_path, st.st_size, st.st_mtime_ns)
+        except OSError:
+            key = None
+
+        if key is not None and key in self._probe_cache:
+            return self._probe_cache[key]
 
-    async def get_duration(self, file_path: str) -> float:
-        """Get the duration of an audio/video file in seconds using FFprobe."""
+        data = await self._run_ffprobe(file_path, *FAST_PROBE_ARGS)
+        if "duration" not in data.get("format", {}):
+            # No duration in the header (e.g. raw MP3): fall back to a full scan
+            data = await self._run_ffprobe(file_path)
+
+        if key is not None:
+            self._probe_cache[key] = data
+        return data
+
+    async def _run_ffprobe(self, file_path: str, *extra_args: str) -> dict:
+        """Run FFprobe for format and streams and return the parsed JSON."""
         output = await self._run_ffmpeg(
             "ffprobe",
             "-v", "quiet",
+            *extra_args,
             "-print_format", "json",
             "-show_format",
+            "-show_streams",
             file_path,
+            capture_stdout=True,
         )
         try:
-            data = json.loads(output)
-            duration = float(data["format"]["duration"])
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
-            raise AudioProcessingError(f"Could not determine duration: {e}") from e
-        return duration
+            return json.loads(output)
+        except json.JSONDecodeError as e:
+            raise AudioProcessingError(f"Could not determine media info: {e}") from e
 
-    async def extract_audio(self, input_path: str, output_path: str) -> str:
-        """Extract audio track from a video file and save as OGG OPUS.
+    @staticmethod
+    def _parse_duration(data: dict) -> float:
+        """Read the container duration from FFprobe output."""
+        try:
+            return float(data["format"]["duration"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise AudioProcessingError(f"Could not determine duration: {e}") from e
 
-        Args:
-            input_path: Path to the input video file.
-            output_path: Path for the output OGG file.
+    async def get_metadata(self, file_path: str) -> dict:
+        """Get duration and first audio stream parameters from one (cached) probe.
 
         Returns:
-            Path to the extracted audio file.
+            Dict with ``duration``, ``codec_name``, ``sample_rate``,
+            ``channels`` and ``bit_rate``; stream fields are None if the
+            file has no audio stream.
         """
-        logger.info("Extracting audio from %s", input_path)
-        await self._run_ffmpeg(
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-vn",  # no video
-            "-acodec", "libopus",
-            "-ar", "48000",
-            "-ac", "1",  # mono
-            "-b:a", "64k",
-            output_path,
+        data = await self._probe(file_path)
+        stream = next(
+            (s for s in data.get("streams", []) if s.get("codec_type") == "audio"),
+            {},
         )
-        logger.info("Audio extracted to %s", output_path)
-        return output_path
+        sample_rate = stream.get("sample_rate")
+        bit_rate = stream.get("bit_rate") or data.get("format", {}).get("bit_rate")
+        return {
+            "duration": self._parse_duration(data),
+            "codec_name": stream.get("codec_name"),
+            "sample_rate": int(sample_rate) if sample_rate else None,
+            "channels": stream.get("channels"),
+            "bit_rate": int(bit_rate) if bit_rate else None,
+        }
 
-    async def convert_to_ogg(self, input_path: str, output_path: str) -> str:
-        """Convert any audio format to OGG OPUS 48kHz mono.
-
-        Args:
-            input_path: Path to the input audio file.
-            output_path: Path for the output OGG file.
-
-        Returns:
-            Path to the converted file.
-        """
-        logger.info("Converting %s to OGG OPUS", input_path)
-        await self._run_ffmpeg(
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-acodec", "libopus",
-            "-ar", "48000",
-            "-ac", "1",
-            "-b:a", "64k",
-            output_path,
+    @staticmethod
+    def _can_stream_copy(meta: dict) -> bool:
+        """Check whether the audio stream already is 48 kHz mono Opus."""
+        return (
+            meta["codec_name"] == "opus"
+            and meta["sample_rate"] == 48000
+            and meta["channels"] == 1
         )
-        logger.info("Converted to %s", output_path)
-        return output_path
 
-    async def split_file(
+    async def process_and_split(
         self,
         input_path: str,
         output_dir: str,
         max_duration: int = DEFAULT_MAX_DURATION,
         max_size: int = DEFAULT_MAX_SIZE,
-    ) -> list[str]:
-        """Split an audio file into parts if it exceeds limits.
-
-        Parts are created with 2-second overlap to avoid cutting words.
+        base_name: str | None = None,
+        force_reencode: bool = False,
+    ) -> tuple[float, list[str]]:
+        """Convert any audio/video file to OGG OPUS parts in one FFmpeg pass.
+
+        The input is probed once, the encoded size is estimated from the
+        fixed output bitrate, and a single FFmpeg run either writes one OGG
+        file into ``output_dir`` or segments directly while encoding into a
+        ``{base_name}_parts`` subdirectory, created only when splitting.
+        Audio that already is 48 kHz mono Opus is stream-copied instead of
+        re-encoded.
 
         Args:
-            input_path: Path to the input audio file.
-            output_dir: Directory for output parts.
+            input_path: Path to the original audio or video file.
+            output_dir: Existing directory for the output file(s).
             max_duration: Maximum duration per part in seconds.
             max_size: Maximum size per part in bytes.
+            base_name: Output file name stem; defaults to the input's stem.
+            force_reencode: Always encode through libopus.
 
         Returns:
-            List of paths to the output parts. If no split is needed,
-            returns a list with the original file path.
+            Tuple of (duration in seconds, list of output OGG paths).
         """
-        duration = await self.get_duration(input_path)
-        file_size = self.get_file_size(input_path)
+        meta = await self.get_metadata(input_path)
+        duration = meta["duration"]
+        codec_args = OPUS_ENCODE_ARGS
+        bytes_per_sec = OPUS_BYTES_PER_SEC
+        if not force_reencode and self._can_stream_copy(meta):
+            codec_args = OPUS_COPY_ARGS
+            if meta["bit_rate"]:
+                bytes_per_sec = meta["bit_rate"] // 8
+
+        estimated_size = int(duration * bytes_per_sec)
+        segment_duration = self._segment_duration(duration, estimated_size, max_duration, max_size)
+
+        base_name = base_name or Path(input_path).stem
+        args = [*FFMPEG_CMD, "-i", input_path, "-vn", *codec_args]
+
+        if segment_duration is None:
+            output_path = os.path.join(output_dir, f"{base_name}.ogg")
+            logger.info("Converting %s to OGG OPUS", input_path)
+            try:
+                await self._run_ffmpeg(*args, output_path)
+            except AudioProcessingError:
+                # The caller never learns this path, so drop the partial output here
+                Path(output_path).unlink(missing_ok=True)
+                raise
+            return duration, [output_path]
 
-        needs_split = duration > max_duration or file_size > max_size
+        logger.info(
+            "Converting and splitting %s (%.1fs) into %d-second segments",
+            input_path, duration, segment_duration,
+        )
+        parts_dir = split_parts_dir(output_dir, base_name)
+        os.makedirs(parts_dir, exist_ok=True)
+        output_pattern = os.path.join(parts_dir, f"{base_name}_part_%03d.ogg")
+        await self._run_ffmpeg(
+            *args, "-f", "segment", "-segment_time", str(segment_duration), output_pattern
+        )
+        return duration, self._collect_parts(parts_dir, base_name)
 
-        if not needs_split:
-            return [input_path]
+    @staticmethod
+    def _segment_duration(
+        duration: float, file_size: int, max_duration: int, max_size: int
+    ) -> int | None:
+        """Return the segment length in seconds, or None if no split is needed."""
+        if duration <= max_duration and file_size <= max_size:
+            return None
 
-        # Calculate segment duration
         segment_duration = max_duration
         if file_size > max_size:
             # Scale segment duration proportionally to size limit
@@ -177,33 +274,25 @@ class AudioProcessor:
             segment_duration = min(segment_duration, size_based_duration)
 
         # Ensure minimum segment duration of 60 seconds
-        segment_duration = max(segment_duration, 60)
-
-        logger.info(
-            "Splitting %s (%.1fs, %d bytes) into %d-second segments",
-            input_path, duration, file_size, segment_duration,
-        )
-
-        os.makedirs(output_dir, exist_ok=True)
-        base_name = Path(input_path).stem
-        output_pattern = os.path.join(output_dir, f"{base_name}_part_%03d.ogg")
+        return max(segment_duration, 60)
 
-        await self._run_ffmpeg(
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-f", "segment",
-            "-segment_time", str(segment_duration),
-            "-acodec", "libopus",
-            "-ar", "48000",
-            "-ac", "1",
-            "-b:a", "64k",
-            output_pattern,
-        )
+    @staticmethod
+    def _collect_parts(output_dir: str, base_name: str) -> list[str]:
+        """Return the segment files written for ``base_name``, in order.
 
-        # Collect output files
-        parts = sorted(
-            str(p) for p in Path(output_dir).glob(f"{base_name}_part_*.ogg")
-        )
+        Sorted by the numeric part index, so ``_part_1000`` follows
+        ``_part_999`` once the ``%03d`` counter outgrows three digits.
+        """
+        prefix = f"{base_name}_part_"
+        with os.scandir(output_dir) as entries:
+            indexed = [
+                (int(entry.name[len(prefix):-4]), entry.path)
+                for entry in entries
+                if entry.name.startswith(prefix)
+                and entry.name.endswith(".ogg")
+                and entry.name[len(prefix):-4].isdigit()
+            ]
+        parts = [path for _, path in sorted(indexed)]
 
         if not parts:
             raise AudioProcessingError("File splitting produced no output parts")
@@ -0,0 +1,201 @@
+"""Download queue service — fetches Telegram files off the update handler path."""
+
+import asyncio
+import contextlib
+import logging
+import shutil
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+from telegram import Message
+
+from src.services.queue import ProcessingTask, TaskQueue
+from src.services.tls import LazyAsyncClient
+
+logger = logging.getLogger(__name__)
+
+# Chunk size for streaming file downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+DOWNLOAD_TIMEOUT = 60.0  # seconds
+
+# Leftovers older than this are swept from tmp_dir at startup
+TMP_MAX_AGE_SECONDS = 3600
+
+
+def gc_tmp_dir(tmp_dir: str | Path, max_age: float = TMP_MAX_AGE_SECONDS) -> int:
+    """Remove files and part directories in ``tmp_dir`` older than ``max_age``.
+
+    Queues are in-memory, so anything left over from a previous run is
+    orphaned; sweeping it keeps the directory small.
+
+    Returns:
+        Number of entries removed.
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in Path(tmp_dir).iterdir():
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+            removed += 1
+        except OSError as e:
+            logger.warning("Could not remove stale temp entry %s: %s", entry, e)
+    if removed:
+        logger.info("Removed %d stale entries from %s", removed, tmp_dir)
+    return removed
+
+
+async def stream_download(
+    tg_file, local_path: str | Path, client: httpx.AsyncClient
+) -> None:
+    """Stream a Telegram file to disk chunk by chunk.
+
+    ``File.download_to_drive`` buffers the whole body in memory and writes it
+    synchronously; streaming keeps memory flat and yields the event loop
+    between chunks. Local Bot API server paths are delegated to PTB.
+    """
+    url = tg_file.file_path
+    if not url or not url.startswith(("http://", "https://")):
+        await tg_file.download_to_drive(local_path)
+        return
+
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        with open(local_path, "wb") as f:
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+
+
+@dataclass
+class DownloadJob:
+    """A received file waiting to be downloaded and enqueued for processing."""
+    chat_id: int
+    message: Message
+    file_obj: object
+    file_name: str
+
+
+class DownloadQueue:
+    """Bounded worker pool that downloads user files in the background.
+
+    Handlers return right after submitting a job, so a large upload from one
+    chat never delays command handling for others. Jobs from the same chat
+    are serialized by a per-chat lock to keep their processing order.
+    """
+
+    def __init__(
+        self,
+        task_queue: TaskQueue,
+        tmp_dir: str,
+        num_workers: int = 3,
+        max_pending: int = 50,
+    ) -> None:
+        self._task_queue = task_queue
+        self._tmp_dir = Path(tmp_dir)
+        self._queue: asyncio.Queue[DownloadJob] = asyncio.Queue(maxsize=max_pending)
+        self._num_workers = num_workers
+        self._workers: list[asyncio.Task] = []
+        self._http = LazyAsyncClient(timeout=DOWNLOAD_TIMEOUT)
+        # Only chats with a job downloading or waiting hold a lock entry
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._chat_lock_users: dict[int, int] = {}
+
+    async def start(self) -> None:
+        """Start worker coroutines."""
+        for i in range(self._num_workers):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+        logger.info("Started %d download workers", self._num_workers)
+
+    async def stop(self) -> None:
+        """Gracefully stop all workers."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        await self._http.aclose()
+        logger.info("Stopped all download workers")
+
+    def submit(self, job: DownloadJob) -> None:
+        """Queue a download job without waiting.
+
+        Raises:
+            asyncio.QueueFull: If too many downloads are already pending.
+        """
+        self._queue.put_nowait(job)
+        logger.info("Queued download for chat %d: %s", job.chat_id, job.file_name)
+
+    async def _worker(self, worker_id: int) -> None:
+        """Worker coroutine that downloads files from the queue."""
+        while True:
+            try:
+                job = await self._queue.get()
+                try:
+                    async with self._chat_lock(job.chat_id):
+                        await self._download(job)
+                except Exception as e:
+                    logger.exception("Download worker %d failed: %s", worker_id, e)
+                finally:
+                    self._queue.task_done()
+            except asyncio.CancelledError:
+                break
+
+    @contextlib.asynccontextmanager
+    async def _chat_lock(self, chat_id: int) -> AsyncIterator[None]:
+        """Hold the chat's lock; drop it once no job uses or awaits it."""
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        self._chat_lock_users[chat_id] = self._chat_lock_users.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._chat_lock_users[chat_id] -= 1
+            if not self._chat_lock_users[chat_id]:
+                del self._chat_lock_users[chat_id]
+                del self._chat_locks[chat_id]
+
+    async def _download(self, job: DownloadJob) -> None:
+        """Download one file and hand it over to the processing queue."""
+        local_path = self._tmp_dir / f"{job.chat_id}_{job.file_name}"
+
+        try:
+            tg_file = await job.file_obj.get_file()
+            await stream_download(tg_file, local_path, self._http.get())
+        except httpx.HTTPStatusError as e:
+            # The error message carries the file URL, which embeds the bot token
+            logger.error("Failed to download %s: HTTP %d", job.file_name, e.response.status_code)
+            await self._download_failed(job, local_path)
+            return
+        except Exception as e:
+            logger.error("Failed to download %s: %s", job.file_name, e)
+            await self._download_failed(job, local_path)
+            return
+
+        task = ProcessingTask(
+            chat_id=job.chat_id,
+            file_path=str(local_path),
+            file_name=job.file_name,
+            message_id=job.message.message_id,
+        )
+        try:
+            position = await self._task_queue.enqueue(task)
+        except BaseException:
+            # Cancelled or failed before the task queue took ownership
+            local_path.unlink(missing_ok=True)
+            raise
+        if position > 1:
+            await job.message.reply_text(
+                f"📋 Ваш файл добавлен в очередь. Позиция: {position}"
+            )
+
+    @staticmethod
+    async def _download_failed(job: DownloadJob, local_path: Path) -> None:
+        """Remove the partial file and tell the user the download failed."""
+        local_path.unlink(missing_ok=True)
+        await job.message.reply_text("❌ Не удалось скачать файл. Попробуйте ещё раз.")
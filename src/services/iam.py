@@ -2,15 +2,30 @@
 
 import asyncio
 import json
+import logging
+import os
 import time
 from pathlib import Path
 
-import httpx
+try:
+    import fcntl
+except ImportError:  # Windows: the on-disk cache works without cross-process locking
+    fcntl = None
+
 import jwt
+from cryptography.hazmat.primitives import serialization
+
+from src.services.tls import LazyAsyncClient
 
 IAM_TOKEN_URL = "https://iam.api.cloud.yandex.net/iam/v1/tokens"
 TOKEN_LIFETIME_SECONDS = 3600  # Request 1-hour tokens
 TOKEN_REFRESH_MARGIN = 300  # Refresh 5 minutes before expiry
+REQUEST_TIMEOUT = 30.0
+# Background refresher: wake at least this often, retry sooner after a failure
+BACKGROUND_REFRESH_INTERVAL = 1800  # 30 minutes
+BACKGROUND_RETRY_DELAY = 60
+
+logger = logging.getLogger(__name__)
 
 
 class IAMTokenError(Exception):
@@ -23,13 +38,28 @@ class IAMTokenManager:
 
     Reads a service account key JSON file, creates a JWT, exchanges it
     for an IAM token, and caches the token with automatic refresh.
+
+    If ``token_cache_path`` is set, the token is also persisted there so a
+    restarted process reuses it instead of doing a fresh exchange. Refreshes
+    are serialized across processes with a lock file next to the cache.
     """
 
-    def __init__(self, key_file_path: str) -> None:
+    def __init__(self, key_file_path: str, token_cache_path: str | None = None) -> None:
         self._key_data = self._load_key(key_file_path)
+        # Static JWT header and the parsed signing key are built once
+        self._jwt_headers = {"kid": self._key_data["id"]}
+        self._private_key = None
         self._token: str | None = None
         self._expires_at: float = 0
         self._lock = asyncio.Lock()
+        self._http = LazyAsyncClient(timeout=REQUEST_TIMEOUT)
+        self._refresher: asyncio.Task | None = None
+        self._token_cache_path = Path(token_cache_path).expanduser() if token_cache_path else None
+        # Token rejected by the API; never reloaded from the on-disk cache
+        self._invalidated_token: str | None = None
+        cached = self._read_token_cache()
+        if cached:
+            self._token, self._expires_at = cached
 
     @staticmethod
     def _load_key(path: str) -> dict:
@@ -45,6 +75,17 @@ class IAMTokenManager:
                 raise IAMTokenError(f"Missing field '{field}' in service account key file")
         return data
 
+    def _get_private_key(self):
+        """Parse the PEM private key on first use and keep the key object."""
+        if self._private_key is None:
+            try:
+                self._private_key = serialization.load_pem_private_key(
+                    self._key_data["private_key"].encode(), password=None
+                )
+            except (ValueError, TypeError) as e:
+                raise IAMTokenError(f"Invalid private key in service account key file: {e}") from e
+        return self._private_key
+
     def _create_jwt(self) -> str:
         """Create a signed JWT for IAM token exchange."""
         now = int(time.time())
@@ -54,24 +95,49 @@ class IAMTokenManager:
             "iat": now,
             "exp": now + TOKEN_LIFETIME_SECONDS,
         }
-        headers = {
-            "kid": self._key_data["id"],
-        }
         return jwt.encode(
             payload,
-            self._key_data["private_key"],
+            self._get_private_key(),
             algorithm="PS256",
-            headers=headers,
+            headers=self._jwt_headers,
         )
 
+    async def start(self) -> None:
+        """Fetch the first token in the background and keep it fresh.
+
+        Refreshing ahead of expiry keeps the JWT exchange off the path of
+        the first (and every later) SpeechKit or GPT request.
+        """
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        """Refresh the token whenever it reaches its refresh margin."""
+        while True:
+            try:
+                await self.get_token()
+                delay = min(
+                    max(self._expires_at - time.time(), 0), BACKGROUND_REFRESH_INTERVAL
+                )
+            except Exception as e:
+                logger.warning("Background IAM token refresh failed: %s", e)
+                delay = BACKGROUND_RETRY_DELAY
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        """Stop the background refresher and close the shared HTTP client."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+        await self._http.aclose()
+
     async def _exchange_jwt_for_token(self, encoded_jwt: str) -> tuple[str, float]:
         """Exchange a JWT for an IAM token via Yandex API."""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                IAM_TOKEN_URL,
-                json={"jwt": encoded_jwt},
-                timeout=30.0,
-            )
+        response = await self._http.get().post(
+            IAM_TOKEN_URL,
+            json={"jwt": encoded_jwt},
+        )
         if response.status_code != 200:
             raise IAMTokenError(
                 f"IAM token request failed: {response.status_code} — {response.text}"
@@ -93,11 +159,85 @@ class IAMTokenManager:
             if self._token and time.time() < self._expires_at:
                 return self._token
 
-            encoded_jwt = self._create_jwt()
-            self._token, self._expires_at = await self._exchange_jwt_for_token(encoded_jwt)
+            if self._token_cache_path is None:
+                await self._refresh()
+                return self._token
+
+            lock_fd = await asyncio.to_thread(self._lock_token_cache)
+            try:
+                # Another process may have refreshed while we waited for the lock
+                cached = await asyncio.to_thread(self._read_token_cache)
+                if cached:
+                    self._token, self._expires_at = cached
+                else:
+                    await self._refresh()
+                    await asyncio.to_thread(self._write_token_cache)
+            finally:
+                if lock_fd is not None:
+                    os.close(lock_fd)  # releases the flock
             return self._token
 
+    async def _refresh(self) -> None:
+        """Exchange a fresh JWT for a new IAM token."""
+        encoded_jwt = self._create_jwt()
+        self._token, self._expires_at = await self._exchange_jwt_for_token(encoded_jwt)
+
     def invalidate(self) -> None:
         """Force token refresh on next get_token() call."""
+        self._invalidated_token = self._token
         self._token = None
         self._expires_at = 0
+
+    # ── On-disk token cache ───────────────────────────────────
+
+    def _read_token_cache(self) -> tuple[str, float] | None:
+        """Return ``(token, expires_at)`` from the cache file if still valid."""
+        if self._token_cache_path is None:
+            return None
+        try:
+            data = json.loads(self._token_cache_path.read_text())
+            token, expires_at = data["token"], float(data["expires_at"])
+            key_id = data.get("key_id")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable IAM token cache %s: %s", self._token_cache_path, e)
+            return None
+        if (
+            key_id != self._key_data["id"]
+            or token == self._invalidated_token
+            or time.time() >= expires_at
+        ):
+            return None
+        return token, expires_at
+
+    def _write_token_cache(self) -> None:
+        """Atomically write the current token to the cache file (mode 0600)."""
+        path = self._token_cache_path
+        tmp_path = path.with_name(path.name + ".tmp")
+        payload = json.dumps({
+            "key_id": self._key_data["id"],
+            "token": self._token,
+            "expires_at": self._expires_at,
+        })
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write IAM token cache %s: %s", path, e)
+
+    def _lock_token_cache(self) -> int | None:
+        """Take an exclusive lock guarding refreshes; returns the lock fd."""
+        lock_path = self._token_cache_path.with_name(self._token_cache_path.name + ".lock")
+        try:
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as e:
+            logger.warning("Could not open IAM token cache lock %s: %s", lock_path, e)
+            return None
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
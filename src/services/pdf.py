@@ -21,18 +21,21 @@ from reportlab.platypus import (
 
 logger = logging.getLogger(__name__)
 
-# Try to register a Cyrillic-capable font
-_FONT_REGISTERED = False
-_FONT_NAME = "Helvetica"  # fallback
+# One-pass escaping of XML special chars for ReportLab paragraph markup
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
 
 
-def _register_cyrillic_font() -> str:
-    """Try to register DejaVu Sans for Cyrillic support."""
-    global _FONT_REGISTERED, _FONT_NAME
+def _escape(text: str) -> str:
+    """Escape ``&``, ``<`` and ``>`` for ReportLab paragraph markup."""
+    return text.translate(_XML_ESCAPE)
+
 
-    if _FONT_REGISTERED:
-        return _FONT_NAME
+def _register_cyrillic_font() -> str:
+    """Try to register DejaVu Sans for Cyrillic support.
 
+    Returns:
+        Name of the registered font, or "Helvetica" as a fallback.
+    """
     # Common paths for DejaVu Sans
     font_paths = [
         "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
@@ -45,16 +48,59 @@ def _register_cyrillic_font() -> str:
         if os.path.exists(path):
             try:
                 pdfmetrics.registerFont(TTFont("DejaVuSans", path))
-                _FONT_NAME = "DejaVuSans"
-                _FONT_REGISTERED = True
                 logger.info("Registered Cyrillic font from %s", path)
-                return _FONT_NAME
+                return "DejaVuSans"
             except Exception as e:
                 logger.warning("Failed to register font %s: %s", path, e)
 
     logger.warning("No Cyrillic font found, using Helvetica (may not render correctly)")
-    _FONT_REGISTERED = True
-    return _FONT_NAME
+    return "Helvetica"
+
+
+# Font and paragraph styles are resolved once at import, not per PDF
+_FONT_NAME = _register_cyrillic_font()
+
+_SAMPLE_STYLES = getSampleStyleSheet()
+_TITLE_STYLE = ParagraphStyle(
+    "CustomTitle",
+    parent=_SAMPLE_STYLES["Title"],
+    fontName=_FONT_NAME,
+    fontSize=18,
+    spaceAfter=12,
+)
+_HEADING_STYLE = ParagraphStyle(
+    "CustomHeading",
+    parent=_SAMPLE_STYLES["Heading2"],
+    fontName=_FONT_NAME,
+    fontSize=14,
+    spaceBefore=16,
+    spaceAfter=8,
+    textColor=colors.HexColor("#333333"),
+)
+_BODY_STYLE = ParagraphStyle(
+    "CustomBody",
+    parent=_SAMPLE_STYLES["Normal"],
+    fontName=_FONT_NAME,
+    fontSize=10,
+    leading=14,
+    spaceAfter=6,
+)
+_META_TABLE_STYLE = TableStyle([
+    ("FONTNAME", (0, 0), (-1, -1), _FONT_NAME),
+    ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ("TEXTCOLOR", (0, 0), (0, -1), colors.grey),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("TOPPADDING", (0, 0), (-1, -1), 2),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+])
+_PAGE_LAYOUT = {
+    "pagesize": A4,
+    "topMargin": 2 * cm,
+    "bottomMargin": 2 * cm,
+    "leftMargin": 2 * cm,
+    "rightMargin": 2 * cm,
+}
+_META_COL_WIDTHS = [3 * cm, 12 * cm]
 
 
 class PDFGenerator:
@@ -82,7 +128,6 @@ class PDFGenerator:
         Returns:
             Path to the generated PDF file.
         """
-        font_name = _register_cyrillic_font()
         date_str = (created_at or datetime.now()).strftime("%d.%m.%Y %H:%M")
         safe_name = "".join(c for c in file_name if c.isalnum() or c in ".-_ ")[:50]
 
@@ -91,56 +136,15 @@ class PDFGenerator:
             f"transcription_{safe_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
         )
 
-        doc = SimpleDocTemplate(
-            pdf_path,
-            pagesize=A4,
-            topMargin=2 * cm,
-            bottomMargin=2 * cm,
-            leftMargin=2 * cm,
-            rightMargin=2 * cm,
-        )
-
-        styles = getSampleStyleSheet()
-
-        # Custom styles
-        title_style = ParagraphStyle(
-            "CustomTitle",
-            parent=styles["Title"],
-            fontName=font_name,
-            fontSize=18,
-            spaceAfter=12,
-        )
-        heading_style = ParagraphStyle(
-            "CustomHeading",
-            parent=styles["Heading2"],
-            fontName=font_name,
-            fontSize=14,
-            spaceBefore=16,
-            spaceAfter=8,
-            textColor=colors.HexColor("#333333"),
-        )
-        body_style = ParagraphStyle(
-            "CustomBody",
-            parent=styles["Normal"],
-            fontName=font_name,
-            fontSize=10,
-            leading=14,
-            spaceAfter=6,
-        )
-        meta_style = ParagraphStyle(
-            "Meta",
-            parent=styles["Normal"],
-            fontName=font_name,
-            fontSize=9,
-            textColor=colors.grey,
-            spaceAfter=4,
-        )
+        # The document template is per file; its layout, like the styles,
+        # is shared module state
+        doc = SimpleDocTemplate(pdf_path, **_PAGE_LAYOUT)
 
         # Build content
         elements = []
 
         # Title
-        elements.append(Paragraph("Транскрибация", title_style))
+        elements.append(Paragraph("Транскрибация", _TITLE_STYLE))
         elements.append(Spacer(1, 6))
 
         # Metadata table
@@ -148,48 +152,32 @@ class PDFGenerator:
             ["Файл:", file_name],
             ["Дата:", date_str],
         ]
-        meta_table = Table(meta_data, colWidths=[3 * cm, 12 * cm])
-        meta_table.setStyle(TableStyle([
-            ("FONTNAME", (0, 0), (-1, -1), font_name),
-            ("FONTSIZE", (0, 0), (-1, -1), 9),
-            ("TEXTCOLOR", (0, 0), (0, -1), colors.grey),
-            ("VALIGN", (0, 0), (-1, -1), "TOP"),
-            ("TOPPADDING", (0, 0), (-1, -1), 2),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-        ]))
+        meta_table = Table(meta_data, colWidths=_META_COL_WIDTHS, style=_META_TABLE_STYLE)
         elements.append(meta_table)
         elements.append(Spacer(1, 16))
 
         # Transcription section
         if transcription_text:
-            elements.append(Paragraph("Транскрибация", heading_style))
+            elements.append(Paragraph("Транскрибация", _HEADING_STYLE))
             # Split long text into paragraphs
-            for paragraph in transcription_text.split("\n"):
-                if paragraph.strip():
-                    # Escape XML special chars
-                    safe_text = (
-                        paragraph.replace("&", "&amp;")
-                        .replace("<", "&lt;")
-                        .replace(">", "&gt;")
-                    )
-                    elements.append(Paragraph(safe_text, body_style))
+            elements.extend(
+                Paragraph(_escape(paragraph), _BODY_STYLE)
+                for paragraph in transcription_text.split("\n")
+                if paragraph.strip()
+            )
             elements.append(Spacer(1, 12))
 
         # Analysis section
         if analysis_text:
-            elements.append(Paragraph("Анализ и план развития", heading_style))
-            for paragraph in analysis_text.split("\n"):
-                if paragraph.strip():
-                    safe_text = (
-                        paragraph.replace("&", "&amp;")
-                        .replace("<", "&lt;")
-                        .replace(">", "&gt;")
-                    )
-                    # Basic markdown heading support
-                    if paragraph.startswith("## "):
-                        elements.append(Paragraph(safe_text[3:], heading_style))
-                    else:
-                        elements.append(Paragraph(safe_text, body_style))
+            elements.append(Paragraph("Анализ и план развития", _HEADING_STYLE))
+            # Basic markdown heading support
+            elements.extend(
+                Paragraph(_escape(paragraph[3:]), _HEADING_STYLE)
+                if paragraph.startswith("## ")
+                else Paragraph(_escape(paragraph), _BODY_STYLE)
+                for paragraph in analysis_text.split("\n")
+                if paragraph.strip()
+            )
 
         # Build PDF
         doc.build(elements)
@@ -1,17 +1,20 @@
 """Task queue service — asyncio-based queue for parallel file processing."""
 
 import asyncio
+import heapq
 import logging
 import os
+import shutil
 import time
 import uuid
 from dataclasses import dataclass, field
 
-from telegram import Bot
+from telegram import Bot, Message
+from telegram.error import BadRequest
 
 from src.bot.keyboards import get_pdf_keyboard
 from src.db import repository as repo
-from src.services.audio import AudioProcessor
+from src.services.audio import AudioProcessor, split_parts_dir
 from src.services.speechkit import SpeechKitClient
 from src.services.storage import ObjectStorageClient
 from src.services.yandexgpt import YandexGPTClient
@@ -21,6 +24,14 @@ logger = logging.getLogger(__name__)
 # Cost per second for deferred mode
 SPEECHKIT_COST_PER_SEC = 0.002542
 
+# Parts recognized at once across all workers (SpeechKit rate limits)
+MAX_PARALLEL_PARTS = 4
+# Blocking S3 calls (upload/delete) run in threads at once across all workers
+MAX_PARALLEL_S3_CALLS = 4
+
+# Longest the deadline sweeper sleeps before re-checking, in seconds
+DEADLINE_SWEEP_MAX_SLEEP = 10
+
 
 @dataclass
 class ProcessingTask:
@@ -31,6 +42,11 @@ class ProcessingTask:
     message_id: int
     task_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
     enqueued_at: float = field(default_factory=time.time)
+    # Set by the worker; the deadline sweeper reports overruns
+    started_at: float | None = None
+    expected_seconds: float | None = None
+    # Progress message edited in place as the pipeline advances
+    status_message_id: int | None = None
 
 
 class TaskQueue:
@@ -51,6 +67,7 @@ class TaskQueue:
         pdf_generator,
         settings,
         num_workers: int = 3,
+        part_concurrency: int = MAX_PARALLEL_PARTS,
     ) -> None:
         self._bot = bot
         self._session_factory = session_factory
@@ -63,21 +80,31 @@ class TaskQueue:
         self._queue: asyncio.Queue[ProcessingTask] = asyncio.Queue()
         self._num_workers = num_workers
         self._workers: list[asyncio.Task] = []
+        self._sweeper: asyncio.Task | None = None
+        # Min-heap of (deadline timestamp, task_id) for slow-task notices
+        self._deadlines: list[tuple[float, str]] = []
         self._active_tasks: dict[str, ProcessingTask] = {}
+        self._part_semaphore = asyncio.Semaphore(part_concurrency)
+        self._s3_semaphore = asyncio.BoundedSemaphore(MAX_PARALLEL_S3_CALLS)
 
     async def start(self) -> None:
         """Start worker coroutines."""
         for i in range(self._num_workers):
             worker = asyncio.create_task(self._worker(i))
             self._workers.append(worker)
+        self._sweeper = asyncio.create_task(self._deadline_sweeper())
         logger.info("Started %d queue workers", self._num_workers)
 
     async def stop(self) -> None:
         """Gracefully stop all workers."""
-        for worker in self._workers:
-            worker.cancel()
-        await asyncio.gather(*self._workers, return_exceptions=True)
+        tasks = list(self._workers)
+        if self._sweeper is not None:
+            tasks.append(self._sweeper)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         self._workers.clear()
+        self._sweeper = None
         logger.info("Stopped all queue workers")
 
     async def enqueue(self, task: ProcessingTask) -> int:
@@ -109,12 +136,50 @@ class TaskQueue:
             except asyncio.CancelledError:
                 break
 
-    async def _send_message(self, chat_id: int, text: str, **kwargs) -> None:
-        """Send a message to the user."""
+    async def _send_message(self, chat_id: int, text: str, **kwargs) -> Message | None:
+        """Send a message to the user.
+
+        Returns:
+            The sent message, or None if sending failed.
+        """
         try:
-            await self._bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            return await self._bot.send_message(chat_id=chat_id, text=text, **kwargs)
         except Exception as e:
             logger.error("Failed to send message to %d: %s", chat_id, e)
+            return None
+
+    async def _set_status(self, task: ProcessingTask, text: str) -> None:
+        """Show pipeline progress in one message, edited in place.
+
+        The first call sends the status message; later calls edit it. If the
+        edit fails (e.g. the user deleted the message), a new one is sent.
+        """
+        if task.status_message_id is not None:
+            try:
+                await self._bot.edit_message_text(
+                    text, chat_id=task.chat_id, message_id=task.status_message_id
+                )
+                return
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    return
+                logger.info("Could not edit status message for %d: %s", task.chat_id, e)
+            except Exception as e:
+                logger.info("Could not edit status message for %d: %s", task.chat_id, e)
+        message = await self._send_message(task.chat_id, text)
+        if message is not None:
+            task.status_message_id = message.message_id
+
+    def _chain_status(
+        self, task: ProcessingTask, text: str, previous: asyncio.Task | None
+    ) -> asyncio.Task:
+        """Schedule a status update to run once ``previous`` has finished."""
+        async def update() -> None:
+            if previous is not None:
+                await previous
+            await self._set_status(task, text)
+
+        return asyncio.create_task(update())
 
     async def _process_file(self, task: ProcessingTask) -> None:
         """Execute the full processing pipeline for a file."""
@@ -122,81 +187,84 @@ class TaskQueue:
         file_path = task.file_path
         file_name = task.file_name
         start_time = time.time()
+        task.started_at = start_time
         tmp_dir = self._settings.tmp_dir
-        os.makedirs(tmp_dir, exist_ok=True)
+        await asyncio.to_thread(os.makedirs, tmp_dir, exist_ok=True)
 
-        ogg_path = None
-        remote_keys: list[str] = []
-        part_files: list[str] = []
+        # Every key we started uploading; removed in one batch at the end
+        uploaded_keys: list[str] = []
+        parts: list[str] = []
 
         try:
-            # Step 1: Extract audio from video if needed
-            if self._audio.is_video(file_path):
-                await self._send_message(chat_id, "🔊 Извлекаю аудиодорожку...")
-                ogg_path = os.path.join(tmp_dir, f"{task.task_id}_audio.ogg")
-                await self._audio.extract_audio(file_path, ogg_path)
-            else:
-                # Convert to OGG OPUS
-                ogg_path = os.path.join(tmp_dir, f"{task.task_id}_converted.ogg")
-                await self._audio.convert_to_ogg(file_path, ogg_path)
-
-            # Step 2: Get duration for cost estimation
-            duration = await self._audio.get_duration(ogg_path)
-
-            # Step 3: Split if necessary
-            parts_dir = os.path.join(tmp_dir, f"{task.task_id}_parts")
-            parts = await self._audio.split_file(
-                ogg_path,
-                parts_dir,
+            # Steps 1-3: Extract/convert to OGG OPUS and split, in one FFmpeg pass
+            is_video = self._audio.is_video(file_path)
+            if is_video:
+                await self._set_status(task, "🔊 Извлекаю аудиодорожку...")
+            duration, parts = await self._audio.process_and_split(
+                file_path,
+                tmp_dir,
                 max_duration=self._settings.max_file_duration_seconds,
                 max_size=self._settings.max_file_size_bytes,
+                base_name=task.task_id,
             )
 
-            if len(parts) > 1:
-                await self._send_message(chat_id, f"✂️ Файл разделён на {len(parts)} частей")
-                part_files = parts
-
-            # Step 4: Upload to Object Storage
-            await self._send_message(chat_id, "☁️ Загружаю в облако...")
-            for part in parts:
-                remote_key = f"audio/{task.task_id}/{os.path.basename(part)}"
-                self._storage.upload_file(part, remote_key)
-                remote_keys.append(remote_key)
-
-            # Step 5: Recognize each part
-            all_texts = []
-            for i, key in enumerate(remote_keys, 1):
-                if len(remote_keys) > 1:
-                    await self._send_message(
-                        chat_id, f"🎙 Распознаю речь... (часть {i} из {len(remote_keys)})"
-                    )
-                else:
-                    await self._send_message(chat_id, "🎙 Распознаю речь...")
-
-                audio_uri = self._storage.get_storage_uri(key)
-
-                # Start timeout monitor
-                timeout_task = asyncio.create_task(
-                    self._timeout_monitor(chat_id, duration, start_time)
-                )
+            self._set_deadline(task, duration)
 
-                try:
-                    text = await self._speechkit.recognize(audio_uri)
-                    all_texts.append(text)
-                finally:
-                    timeout_task.cancel()
+            # Steps 4-5: Upload, recognize and delete, pipelined per part —
+            # each part goes to SpeechKit as soon as its own upload finishes.
+            # Status edits run in the background so their Telegram round trips
+            # overlap the uploads instead of delaying them.
+            if len(parts) > 1:
+                upload_msg = f"✂️ Файл разделён на {len(parts)} частей\n☁️ Загружаю в облако..."
+            else:
+                upload_msg = "☁️ Загружаю в облако..."
+            status_update = self._chain_status(task, upload_msg, None)
+            remote_keys = [
+                f"audio/{task.task_id}/{os.path.basename(part)}" for part in parts
+            ]
+            if len(remote_keys) > 1:
+                recognize_msg = f"🎙 Распознаю речь... (частей: {len(remote_keys)})"
+            else:
+                recognize_msg = "🎙 Распознаю речь..."
+            recognition_started = False
+            part_duration = duration / len(parts)
+
+            async def process_part(part: str, key: str) -> str:
+                nonlocal recognition_started, status_update
+                uploaded_keys.append(key)
+                await self._upload_part(part, key)
+                if not recognition_started:
+                    recognition_started = True
+                    status_update = self._chain_status(task, recognize_msg, status_update)
+                return await self._recognize_part(key, part_duration)
+
+            part_tasks = [
+                asyncio.create_task(process_part(part, key))
+                for part, key in zip(parts, remote_keys)
+            ]
+            try:
+                # gather keeps part order regardless of completion order
+                all_texts = await asyncio.gather(*part_tasks)
+            except BaseException:
+                # Stop sibling parts before cleanup deletes their objects
+                for part_task in (*part_tasks, status_update):
+                    part_task.cancel()
+                await asyncio.gather(*part_tasks, status_update, return_exceptions=True)
+                raise
+            await status_update
 
             transcription_text = " ".join(all_texts)
 
             # Step 6: Analyze with YandexGPT
-            await self._send_message(chat_id, "🤖 Анализирую текст...")
+            await self._set_status(task, "🤖 Анализирую текст...")
             analysis_text = await self._gpt.analyze(transcription_text)
 
             # Step 7: Save to DB
             cost = duration * SPEECHKIT_COST_PER_SEC
-            file_type = "video" if self._audio.is_video(task.file_path) else "audio"
+            file_type = "video" if is_video else "audio"
 
-            async with self._session_factory() as session:
+            # One transaction for the whole save; begin() commits on exit
+            async with self._session_factory.begin() as session:
                 user = await repo.get_or_create_user(session, chat_id)
                 t = await repo.save_transcription(
                     session,
@@ -208,7 +276,6 @@ class TaskQueue:
                     analysis_text=analysis_text,
                     cost_rubles=cost,
                 )
-                await session.commit()
                 transcription_id = t.id
 
             # Step 8: Send result
@@ -225,7 +292,7 @@ class TaskQueue:
 
             keyboard = get_pdf_keyboard(transcription_id)
             await self._send_message(chat_id, result_text, reply_markup=keyboard)
-            await self._send_message(chat_id, "✅ Готово!")
+            await self._set_status(task, "✅ Готово!")
 
             elapsed = time.time() - start_time
             logger.info(
@@ -234,40 +301,88 @@ class TaskQueue:
             )
 
         finally:
-            # Cleanup: delete from Object Storage
-            for key in remote_keys:
-                try:
-                    self._storage.delete_file(key)
-                except Exception as e:
-                    logger.warning("Failed to delete %s: %s", key, e)
-
-            # Cleanup: delete local temp files
-            for path in [file_path, ogg_path] + part_files:
-                if path and os.path.exists(path):
-                    try:
-                        os.remove(path)
-                    except Exception:
-                        pass
-
-            # Cleanup: parts directory
-            parts_dir = os.path.join(tmp_dir, f"{task.task_id}_parts")
-            if os.path.isdir(parts_dir):
-                try:
-                    import shutil
-                    shutil.rmtree(parts_dir, ignore_errors=True)
-                except Exception:
-                    pass
+            # Cleanup: Object Storage and local files, off the event loop
+            if uploaded_keys:
+                await self._delete_parts(uploaded_keys)
+            await asyncio.to_thread(
+                self._remove_local_files,
+                file_path,
+                parts,
+                split_parts_dir(tmp_dir, task.task_id),
+            )
 
-    async def _timeout_monitor(
-        self, chat_id: int, duration: float, start_time: float
-    ) -> None:
-        """Monitor processing time and notify user if it takes too long."""
-        # Expected processing time: ~10 sec per 1 min of audio + 5 min buffer
-        expected_time = (duration / 60) * 10 + 300  # seconds
-        await asyncio.sleep(expected_time)
-        elapsed = time.time() - start_time
-        await self._send_message(
-            chat_id,
-            f"⚠️ Обработка занимает больше времени, чем ожидалось "
-            f"({elapsed / 60:.0f} мин). Пожалуйста, подождите...",
-        )
+    async def _upload_part(self, part_path: str, remote_key: str) -> None:
+        """Upload one part to Object Storage."""
+        async with self._s3_semaphore:
+            await self._storage.upload_file_async(part_path, remote_key)
+
+    async def _delete_parts(self, remote_keys: list[str]) -> None:
+        """Delete uploaded parts in one batched request, logging failures."""
+        async with self._s3_semaphore:
+            try:
+                await self._storage.delete_files_async(remote_keys)
+            except Exception as e:
+                logger.warning("Failed to delete %s: %s", ", ".join(remote_keys), e)
+
+    @staticmethod
+    def _remove_local_files(file_path: str, outputs: list[str], parts_dir: str) -> None:
+        """Remove the original upload and the converted OGG output(s).
+
+        The parts directory only exists when the file was split (or when
+        conversion failed before its outputs were known).
+        """
+        for path in (file_path, *outputs):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if len(outputs) != 1:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    async def _recognize_part(self, remote_key: str, duration: float) -> str:
+        """Recognize one uploaded part with SpeechKit."""
+        async with self._part_semaphore:
+            audio_uri = self._storage.get_storage_uri(remote_key)
+            return await self._speechkit.recognize(audio_uri, duration_seconds=duration)
+
+    @staticmethod
+    def _expected_processing_time(duration: float) -> float:
+        """Expected processing time: ~10 sec per 1 min of audio + 5 min buffer."""
+        return (duration / 60) * 10 + 300
+
+    def _set_deadline(self, task: ProcessingTask, duration: float) -> None:
+        """Schedule a slow-processing notice for ``task``."""
+        task.expected_seconds = self._expected_processing_time(duration)
+        heapq.heappush(self._deadlines, (task.started_at + task.expected_seconds, task.task_id))
+
+    async def _deadline_sweeper(self) -> None:
+        """Notify users whose tasks overran their expected time.
+
+        One loop serves all workers instead of a sleeping monitor task
+        per file; it sleeps until the nearest deadline (at most
+        ``DEADLINE_SWEEP_MAX_SLEEP`` so newly added deadlines are seen).
+        """
+        while True:
+            try:
+                await self._notify_overdue()
+            except Exception as e:
+                logger.warning("Deadline sweep failed: %s", e)
+            delay = DEADLINE_SWEEP_MAX_SLEEP
+            if self._deadlines:
+                delay = min(max(self._deadlines[0][0] - time.time(), 0), delay)
+            await asyncio.sleep(delay)
+
+    async def _notify_overdue(self) -> None:
+        """Pop due deadlines and notify the tasks that are still running."""
+        now = time.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, task_id = heapq.heappop(self._deadlines)
+            task = self._active_tasks.get(task_id)
+            if task is None:
+                continue  # already finished
+            elapsed = now - task.started_at
+            await self._send_message(
+                task.chat_id,
+                f"⚠️ Обработка занимает больше времени, чем ожидалось "
+                f"({elapsed / 60:.0f} мин). Пожалуйста, подождите...",
+            )
@@ -2,17 +2,32 @@
 
 import asyncio
 import logging
+import random
+import time
 
 import httpx
 
 from src.services.iam import IAMTokenManager
+from src.services.tls import LazyAsyncClient
 
 logger = logging.getLogger(__name__)
 
 RECOGNIZE_URL = "https://transcribe.api.cloud.yandex.net/speech/stt/v2/longRunningRecognize"
 OPERATION_URL = "https://operation.api.cloud.yandex.net/operations"
-POLL_INTERVAL = 5  # seconds
+# Poll backoff: 1s, 2s, 4s, ... capped at 30s, each with up to 10% jitter
+INITIAL_POLL_INTERVAL = 1.0  # seconds
+MAX_POLL_INTERVAL = 30.0  # seconds
+POLL_BACKOFF_FACTOR = 2.0
+POLL_JITTER = 0.1
+
+# With a known audio duration, polls are scheduled around the expected
+# finish; deferred recognition takes roughly half the audio duration
+EXPECTED_RECOGNITION_RATIO = 0.5
+MIN_POLL_INTERVAL = 2.0  # seconds
+NEAR_FINISH_POLL_RATIO = 0.05  # poll every 5% of the expected time near the finish
 MAX_POLL_TIME = 1800  # 30 minutes
+REQUEST_TIMEOUT = 30.0
+SUBMIT_TIMEOUT = 60.0
 
 
 class SpeechKitError(Exception):
@@ -35,6 +50,14 @@ class SpeechKitClient:
         self._iam = iam_manager
         self._folder_id = folder_id
         self._recognize_url = f"{api_endpoint}/speech/stt/v2/longRunningRecognize"
+        self._http = LazyAsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=4),
+        )
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        await self._http.aclose()
 
     async def _get_headers(self) -> dict[str, str]:
         token = await self._iam.get_token()
@@ -48,6 +71,7 @@ class SpeechKitClient:
         language: str = "ru-RU",
         model: str = "general",
         sample_rate: int = 48000,
+        duration_seconds: float | None = None,
     ) -> str:
         """Submit audio for recognition and wait for the result.
 
@@ -56,6 +80,8 @@ class SpeechKitClient:
             language: Recognition language code.
             model: Recognition model name.
             sample_rate: Audio sample rate in Hz.
+            duration_seconds: Audio duration, if known; used to schedule polls
+                around the expected completion time.
 
         Returns:
             Concatenated recognized text from all chunks.
@@ -66,7 +92,7 @@ class SpeechKitClient:
         operation_id = await self._submit(audio_uri, language, model, sample_rate)
         logger.info("SpeechKit operation started: %s", operation_id)
 
-        result = await self._poll_until_done(operation_id)
+        result = await self._poll_until_done(operation_id, duration_seconds)
         text = self._extract_text(result)
         logger.info("Recognition complete: %d characters", len(text))
         return text
@@ -95,13 +121,12 @@ class SpeechKitClient:
             },
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self._recognize_url,
-                json=body,
-                headers=headers,
-                timeout=60.0,
-            )
+        response = await self._http.get().post(
+            self._recognize_url,
+            json=body,
+            headers=headers,
+            timeout=SUBMIT_TIMEOUT,
+        )
 
         if response.status_code != 200:
             raise SpeechKitError(
@@ -114,50 +139,114 @@ class SpeechKitClient:
             raise SpeechKitError("No operation ID in response")
         return operation_id
 
-    async def _poll_until_done(self, operation_id: str) -> dict:
-        """Poll the operation status until completion or timeout."""
+    async def _poll_until_done(
+        self, operation_id: str, duration_seconds: float | None = None
+    ) -> dict:
+        """Poll the operation status until completion or timeout.
+
+        The Operation API answers ``GET /operations/{id}`` immediately and
+        has no server-side wait or completion push, so the waiting is
+        scheduled on the client. Without a known audio duration, polls
+        back off exponentially; with one, they follow the tiered schedule
+        of ``_get_poll_interval``. A ``Retry-After`` header on a pending or
+        throttled (429) response overrides the schedule for the next sleep.
+        """
         url = f"{OPERATION_URL}/{operation_id}"
-        elapsed = 0
-
-        while elapsed < MAX_POLL_TIME:
-            headers = await self._get_headers()
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers, timeout=30.0)
+        started = time.monotonic()
+        deadline = started + MAX_POLL_TIME
+        interval = INITIAL_POLL_INTERVAL
+        expected = (
+            duration_seconds * EXPECTED_RECOGNITION_RATIO if duration_seconds else None
+        )
 
-            if response.status_code != 200:
+        # Headers are fetched once and refreshed only when the token is rejected
+        headers = await self._get_headers()
+        refreshed = False
+        # Pending responses repeat byte for byte until the state flips
+        last_pending: bytes | None = None
+
+        while time.monotonic() < deadline:
+            response = await self._http.get().get(url, headers=headers)
+
+            if response.status_code == 401 and not refreshed:
+                self._iam.invalidate()
+                headers = await self._get_headers()
+                refreshed = True
+                continue
+            refreshed = False
+
+            if response.status_code == 429:
+                pass  # throttled: wait and poll again
+            elif response.status_code != 200:
                 raise SpeechKitError(
                     f"Operation poll failed: {response.status_code} — {response.text}"
                 )
-
-            data = response.json()
-
-            if data.get("error"):
-                error = data["error"]
-                raise SpeechKitError(
-                    f"Recognition error: [{error.get('code')}] {error.get('message')}"
-                )
-
-            if data.get("done"):
-                return data
-
-            await asyncio.sleep(POLL_INTERVAL)
-            elapsed += POLL_INTERVAL
+            elif response.content != last_pending:
+                # json.loads straight from the raw bytes, once per distinct body
+                data = response.json()
+
+                if data.get("error"):
+                    error = data["error"]
+                    raise SpeechKitError(
+                        f"Recognition error: [{error.get('code')}] {error.get('message')}"
+                    )
+
+                if data.get("done"):
+                    return data
+                last_pending = response.content
+
+            retry_after = self._parse_retry_after(response)
+            if retry_after is not None:
+                await asyncio.sleep(retry_after)
+                continue
+            if expected is not None:
+                interval = self._get_poll_interval(time.monotonic() - started, expected)
+            await asyncio.sleep(interval + random.uniform(0, interval * POLL_JITTER))
+            if expected is None:
+                interval = min(interval * POLL_BACKOFF_FACTOR, MAX_POLL_INTERVAL)
 
         raise SpeechKitError(
             f"Recognition timed out after {MAX_POLL_TIME} seconds for operation {operation_id}"
         )
 
     @staticmethod
-    def _extract_text(operation_result: dict) -> str:
-        """Extract and concatenate text from all recognition chunks."""
-        response = operation_result.get("response", {})
-        chunks = response.get("chunks", [])
+    def _parse_retry_after(response: httpx.Response) -> float | None:
+        """Return the ``Retry-After`` delay in seconds, if given as a number."""
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return None  # HTTP-date form is not used by the Operation API
 
-        texts = []
-        for chunk in chunks:
-            alternatives = chunk.get("alternatives", [])
-            if alternatives:
-                # Take the first (best) alternative
-                texts.append(alternatives[0].get("text", ""))
+    @staticmethod
+    def _get_poll_interval(elapsed: float, expected: float) -> float:
+        """Return the poll interval for the time elapsed since submission.
 
-        return " ".join(texts)
+        Three tiers, each clamped to [MIN_POLL_INTERVAL, MAX_POLL_INTERVAL]:
+        before half the expected time the job cannot be done, so skip ahead;
+        around the expected finish poll densely relative to the job length;
+        once the job has clearly overrun, poll at the maximum interval.
+        """
+        if elapsed < expected * 0.5:
+            interval = expected * 0.5 - elapsed
+        elif elapsed < expected * 1.5:
+            interval = expected * NEAR_FINISH_POLL_RATIO
+        else:
+            interval = MAX_POLL_INTERVAL
+        return min(max(interval, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+    @staticmethod
+    def _extract_text(operation_result: dict) -> str:
+        """Extract and concatenate text from all recognition chunks."""
+        response = operation_result.get("response")
+        if not response:
+            return ""
+        # Take the first (best) alternative of each chunk that has one;
+        # str.join sizes the result once, so this stays linear in the chunks
+        return " ".join(
+            alternatives[0].get("text", "")
+            for chunk in response.get("chunks") or ()
+            if (alternatives := chunk.get("alternatives"))
+        )
@@ -1,13 +1,34 @@
 """Yandex Object Storage client — upload and delete files via S3 API."""
 
+import asyncio
 import logging
-from pathlib import Path
+import os
 
 import boto3
+import httpx
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from src.services.tls import LazyAsyncClient
+
 logger = logging.getLogger(__name__)
 
+# Multipart uploads: parts above 8 MiB go up as 16 MiB chunks over 8 streams
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+UPLOAD_MAX_CONCURRENCY = 8
+# Enough pooled connections for several parts uploading in parallel
+MAX_POOL_CONNECTIONS = 32
+
+# Files up to MULTIPART_THRESHOLD are streamed with one presigned PUT
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+PRESIGNED_URL_EXPIRES = 3600  # seconds
+STREAM_UPLOAD_TIMEOUT = 300.0
+
+# S3 DeleteObjects accepts at most this many keys per request
+DELETE_BATCH_SIZE = 1000
+
 
 class StorageError(Exception):
     """Raised when Object Storage operations fail."""
@@ -35,7 +56,15 @@ class ObjectStorageClient:
             endpoint_url=endpoint,
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
+            config=Config(max_pool_connections=MAX_POOL_CONNECTIONS),
         )
+        self._transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=UPLOAD_MAX_CONCURRENCY,
+            use_threads=True,
+        )
+        self._http = LazyAsyncClient(timeout=STREAM_UPLOAD_TIMEOUT)
 
     def upload_file(self, local_path: str, remote_key: str) -> str:
         """Upload a local file to Object Storage.
@@ -50,12 +79,12 @@ class ObjectStorageClient:
         Raises:
             StorageError: If the upload fails.
         """
-        path = Path(local_path)
-        if not path.exists():
-            raise StorageError(f"File not found: {local_path}")
-
         try:
-            self._client.upload_file(str(path), self._bucket, remote_key)
+            self._client.upload_file(
+                local_path, self._bucket, remote_key, Config=self._transfer_config
+            )
+        except FileNotFoundError as e:
+            raise StorageError(f"File not found: {local_path}") from e
         except ClientError as e:
             raise StorageError(f"Upload failed: {e}") from e
 
@@ -78,6 +107,83 @@ class ObjectStorageClient:
             raise StorageError(f"Delete failed: {e}") from e
         logger.info("Deleted s3://%s/%s", self._bucket, remote_key)
 
+    def delete_files(self, remote_keys: list[str]) -> None:
+        """Delete several files with batched DeleteObjects requests.
+
+        Args:
+            remote_keys: Keys (paths) in the bucket.
+
+        Raises:
+            StorageError: If a request fails or any key could not be deleted.
+        """
+        for start in range(0, len(remote_keys), DELETE_BATCH_SIZE):
+            batch = remote_keys[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = self._client.delete_objects(
+                    Bucket=self._bucket,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except ClientError as e:
+                raise StorageError(f"Delete failed: {e}") from e
+            if errors := response.get("Errors"):
+                failed = ", ".join(f"{err.get('Key')} ({err.get('Code')})" for err in errors)
+                raise StorageError(f"Delete failed: {failed}")
+            logger.info("Deleted %d objects from s3://%s", len(batch), self._bucket)
+
+    async def upload_file_async(self, local_path: str, remote_key: str) -> str:
+        """Upload a file without blocking the event loop.
+
+        Files up to ``MULTIPART_THRESHOLD`` are streamed with a single
+        presigned PUT; larger ones go through boto3's parallel multipart
+        transfer in a worker thread.
+        """
+        try:
+            size = os.path.getsize(local_path)
+        except OSError as e:
+            raise StorageError(f"File not found: {local_path}") from e
+        if size <= MULTIPART_THRESHOLD:
+            return await self.upload_stream(local_path, remote_key, size)
+        return await asyncio.to_thread(self.upload_file, local_path, remote_key)
+
+    async def upload_stream(self, local_path: str, remote_key: str, size: int) -> str:
+        """Stream a file from disk to a presigned PUT URL.
+
+        Raises:
+            StorageError: If the upload fails.
+        """
+        # Presigning is a local signature computation, no request is made
+        url = self._client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self._bucket, "Key": remote_key},
+            ExpiresIn=PRESIGNED_URL_EXPIRES,
+        )
+
+        async def body():
+            with open(local_path, "rb") as f:
+                while chunk := await asyncio.to_thread(f.read, STREAM_CHUNK_SIZE):
+                    yield chunk
+
+        try:
+            response = await self._http.get().put(
+                url, content=body(), headers={"Content-Length": str(size)}
+            )
+        except httpx.HTTPError as e:
+            raise StorageError(f"Upload failed: {e}") from e
+        if response.status_code != 200:
+            raise StorageError(f"Upload failed: {response.status_code} — {response.text}")
+
+        uri = f"s3://{self._bucket}/{remote_key}"
+        logger.info("Uploaded %s → %s", local_path, uri)
+        return uri
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        await self._http.aclose()
+
+    async def delete_files_async(self, remote_keys: list[str]) -> None:
+        """Delete several files without blocking the event loop."""
+        await asyncio.to_thread(self.delete_files, remote_keys)
+
     def get_storage_uri(self, remote_key: str) -> str:
         """Build the HTTPS URI for SpeechKit to access the file.
 
@@ -1,5 +1,6 @@
 """Unit tests for audio processing service."""
 
+import asyncio
 import json
 
 import pytest
@@ -13,6 +14,19 @@ def processor():
     return AudioProcessor()
 
 
+def _meta(duration=600.0, codec_name="mp3", sample_rate=44100, channels=2, bit_rate=128000):
+    return {
+        "duration": duration,
+        "codec_name": codec_name,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bit_rate": bit_rate,
+    }
+
+
+VOICE_META = _meta(codec_name="opus", sample_rate=48000, channels=1, bit_rate=32000)
+
+
 class TestIsVideo:
     def test_mp4(self):
         assert AudioProcessor.is_video("file.mp4") is True
@@ -70,92 +84,180 @@ class TestIsSupported:
         assert AudioProcessor.is_supported("file.pdf") is False
         assert AudioProcessor.is_supported("file.doc") is False
 
+    def test_matches_final_suffix_only(self):
+        assert AudioProcessor.is_supported("file.mp3.txt") is False
+        assert AudioProcessor.is_supported("mp3") is False
+        assert AudioProcessor.is_supported("archive.tar.MP3") is True
+
+
+class TestProbeCache:
+    async def test_unchanged_file_probed_once(self, processor, tmp_path):
+        media = tmp_path / "a.ogg"
+        media.write_bytes(b"data")
+        probe_output = json.dumps({"format": {"duration": "10"}, "streams": []})
+
+        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock, return_value=probe_output) as mock_ff:
+            assert (await processor.get_metadata(str(media)))["duration"] == 10.0
+            assert (await processor.get_metadata(str(media)))["duration"] == 10.0
 
-class TestGetDuration:
-    async def test_returns_duration(self, processor):
-        probe_output = json.dumps({"format": {"duration": "120.5"}})
+        mock_ff.assert_called_once()
+
+    async def test_rewritten_file_probed_again(self, processor, tmp_path):
+        media = tmp_path / "a.ogg"
+        media.write_bytes(b"data")
+        probe_output = json.dumps({"format": {"duration": "10"}, "streams": []})
+
+        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock, return_value=probe_output) as mock_ff:
+            await processor.get_metadata(str(media))
+            media.write_bytes(b"longer data")
+            await processor.get_metadata(str(media))
+
+        assert mock_ff.call_count == 2
 
-        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
-            mock_ff.return_value = probe_output
-            duration = await processor.get_duration("file.ogg")
 
-        assert duration == 120.5
+class TestFastProbe:
+    async def test_uses_bounded_probe(self, processor):
+        probe_output = json.dumps({"format": {"duration": "1"}})
+        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock, return_value=probe_output) as mock_ff:
+            await processor.get_metadata("file.mp3")
+
+        mock_ff.assert_called_once()
+        args = mock_ff.call_args[0]
+        assert args[args.index("-probesize") + 1] == "1000000"
+        assert args[args.index("-analyzeduration") + 1] == "1000000"
+
+    async def test_falls_back_to_full_scan(self, processor):
+        outputs = [json.dumps({"format": {}}), json.dumps({"format": {"duration": "42"}})]
+        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock, side_effect=outputs) as mock_ff:
+            assert (await processor.get_metadata("file.mp3"))["duration"] == 42.0
+
+        assert mock_ff.call_count == 2
+        assert "-probesize" not in mock_ff.call_args_list[1][0]
+
+
+class TestGetMetadata:
+    async def test_audio_stream_fields(self, processor):
+        probe_output = json.dumps({
+            "format": {"duration": "5.5", "bit_rate": "64000"},
+            "streams": [
+                {"codec_type": "video", "codec_name": "h264"},
+                {"codec_type": "audio", "codec_name": "opus", "sample_rate": "48000", "channels": 1},
+            ],
+        })
+        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock, return_value=probe_output):
+            meta = await processor.get_metadata("file.mp4")
+
+        assert meta == {
+            "duration": 5.5,
+            "codec_name": "opus",
+            "sample_rate": 48000,
+            "channels": 1,
+            "bit_rate": 64000,
+        }
 
     async def test_invalid_output_raises(self, processor):
-        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
-            mock_ff.return_value = "not json"
+        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock, return_value="not json"):
             with pytest.raises(AudioProcessingError, match="Could not determine"):
-                await processor.get_duration("file.ogg")
+                await processor.get_metadata("file.ogg")
 
+    async def test_missing_duration_raises(self, processor):
+        probe_output = json.dumps({"format": {}, "streams": []})
+        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock, return_value=probe_output):
+            with pytest.raises(AudioProcessingError, match="duration"):
+                await processor.get_metadata("file.mp4")
 
-class TestExtractAudio:
-    async def test_calls_ffmpeg(self, processor):
-        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
-            mock_ff.return_value = ""
-            result = await processor.extract_audio("input.mp4", "output.ogg")
 
-        assert result == "output.ogg"
-        mock_ff.assert_called_once()
+class TestProcessAndSplit:
+    async def test_single_output_when_within_limits(self, processor, tmp_path):
+        out_dir = str(tmp_path / "out")
+        with patch.object(processor, "get_metadata", new_callable=AsyncMock, return_value=_meta()), \
+             patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
+            duration, parts = await processor.process_and_split("/in/file.mp4", out_dir)
+
+        assert duration == 600.0
+        assert parts == [str(tmp_path / "out" / "file.ogg")]
+        assert not (tmp_path / "out").exists()
         args = mock_ff.call_args[0]
-        assert "ffmpeg" in args
         assert "-vn" in args
+        assert "segment" not in args
         assert "libopus" in args
+        assert args[args.index("-compression_level") + 1] == "5"
+        assert args[args.index("-application") + 1] == "voip"
+
+    async def test_segments_in_same_pass(self, processor, tmp_path):
+        out_dir = tmp_path / "out"
+        (out_dir / "file_parts").mkdir(parents=True)
+        for i in range(4):
+            (out_dir / "file_parts" / f"file_part_{i:03d}.ogg").write_bytes(b"fake")
+
+        meta = _meta(duration=50000.0)
+        with patch.object(processor, "get_metadata", new_callable=AsyncMock, return_value=meta), \
+             patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
+            duration, parts = await processor.process_and_split("/in/file.mp3", str(out_dir))
+
+        assert duration == 50000.0
+        assert len(parts) == 4
+        mock_ff.assert_called_once()
+        args = mock_ff.call_args[0]
+        assert args[args.index("-segment_time") + 1] == "14400"
 
+    async def test_split_by_estimated_size(self, processor, tmp_path):
+        (tmp_path / "file_parts").mkdir()
+        (tmp_path / "file_parts" / "file_part_000.ogg").write_bytes(b"fake")
 
-class TestConvertToOgg:
-    async def test_calls_ffmpeg(self, processor):
-        with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
-            mock_ff.return_value = ""
-            result = await processor.convert_to_ogg("input.mp3", "output.ogg")
+        # 1 hour of 64 kbit/s output is ~28.8 MB, over a 10 MB limit
+        with patch.object(processor, "get_metadata", new_callable=AsyncMock, return_value=_meta(duration=3600.0)), \
+             patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
+            await processor.process_and_split("/in/file.mp3", str(tmp_path), max_size=10_000_000)
 
-        assert result == "output.ogg"
-        mock_ff.assert_called_once()
         args = mock_ff.call_args[0]
-        assert "libopus" in args
-        assert "48000" in args
+        assert int(args[args.index("-segment_time") + 1]) < 3600
+
+    async def test_force_reencode(self, processor, tmp_path):
+        with patch.object(processor, "get_metadata", new_callable=AsyncMock, return_value=VOICE_META), \
+             patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
+            await processor.process_and_split("/in/voice.ogg", str(tmp_path), force_reencode=True)
 
+        assert "libopus" in mock_ff.call_args[0]
 
-class TestSplitFile:
-    async def test_no_split_needed(self, processor):
-        with patch.object(processor, "get_duration", new_callable=AsyncMock) as mock_dur:
-            mock_dur.return_value = 600.0  # 10 minutes
-            with patch.object(processor, "get_file_size", return_value=50_000_000):
-                result = await processor.split_file("file.ogg", "/tmp/parts")
+    async def test_voice_message_is_stream_copied(self, processor, tmp_path):
+        with patch.object(processor, "get_metadata", new_callable=AsyncMock, return_value=VOICE_META), \
+             patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock) as mock_ff:
+            _, parts = await processor.process_and_split("/in/voice.ogg", str(tmp_path))
 
-        assert result == ["file.ogg"]
+        assert parts == [str(tmp_path / "voice.ogg")]
+        args = mock_ff.call_args[0]
+        assert args[args.index("-c:a") + 1] == "copy"
+        assert "libopus" not in args
 
-    async def test_split_by_duration(self, processor, tmp_path):
-        parts_dir = str(tmp_path / "parts")
+    async def test_failed_conversion_removes_partial_output(self, processor, tmp_path):
+        async def fail_midway(*args, **kwargs):
+            with open(args[-1], "wb") as f:
+                f.write(b"partial")
+            raise AudioProcessingError("FFmpeg command failed (exit 1)")
 
-        # Create fake output files to simulate ffmpeg output
-        import os
-        os.makedirs(parts_dir, exist_ok=True)
-        for i in range(3):
-            (tmp_path / "parts" / f"file_part_{i:03d}.ogg").write_bytes(b"fake")
+        with patch.object(processor, "get_metadata", new_callable=AsyncMock, return_value=_meta()), \
+             patch.object(processor, "_run_ffmpeg", side_effect=fail_midway):
+            with pytest.raises(AudioProcessingError):
+                await processor.process_and_split("/in/file.mp3", str(tmp_path), base_name="task1")
 
-        with patch.object(processor, "get_duration", new_callable=AsyncMock) as mock_dur:
-            mock_dur.return_value = 50000.0  # > 14400
-            with patch.object(processor, "get_file_size", return_value=100_000):
-                with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock):
-                    result = await processor.split_file("file.ogg", parts_dir)
+        assert list(tmp_path.iterdir()) == []
 
-        assert len(result) == 3
 
-    async def test_split_by_size(self, processor, tmp_path):
-        parts_dir = str(tmp_path / "parts")
+class TestCollectParts:
+    def test_numeric_order_and_filtering(self, tmp_path):
+        for name in ("f_part_1000.ogg", "f_part_999.ogg", "f_part_000.ogg", "f_part_x.ogg", "g_part_001.ogg"):
+            (tmp_path / name).write_bytes(b"x")
 
-        import os
-        os.makedirs(parts_dir, exist_ok=True)
-        for i in range(2):
-            (tmp_path / "parts" / f"file_part_{i:03d}.ogg").write_bytes(b"fake")
+        parts = AudioProcessor._collect_parts(str(tmp_path), "f")
 
-        with patch.object(processor, "get_duration", new_callable=AsyncMock) as mock_dur:
-            mock_dur.return_value = 3600.0  # 1 hour, within duration limit
-            with patch.object(processor, "get_file_size", return_value=2_000_000_000):  # > 1GB
-                with patch.object(processor, "_run_ffmpeg", new_callable=AsyncMock):
-                    result = await processor.split_file("file.ogg", parts_dir)
+        assert [p.rsplit("/", 1)[-1] for p in parts] == [
+            "f_part_000.ogg", "f_part_999.ogg", "f_part_1000.ogg",
+        ]
 
-        assert len(result) == 2
+    def test_no_parts_raises(self, tmp_path):
+        with pytest.raises(AudioProcessingError, match="no output parts"):
+            AudioProcessor._collect_parts(str(tmp_path), "f")
 
 
 class TestRunFfmpeg:
@@ -173,7 +275,19 @@ class TestRunFfmpeg:
         mock_process.communicate.return_value = (b"output data", b"")
         mock_process.returncode = 0
 
-        with patch("asyncio.create_subprocess_exec", return_value=mock_process):
-            result = await processor._run_ffmpeg("ffmpeg", "-version")
+        with patch("asyncio.create_subprocess_exec", return_value=mock_process) as mock_exec:
+            result = await processor._run_ffmpeg("ffprobe", "-version", capture_stdout=True)
 
         assert result == "output data"
+        assert mock_exec.call_args.kwargs["stdout"] == asyncio.subprocess.PIPE
+
+    async def test_ffmpeg_stdout_discarded_by_default(self, processor):
+        mock_process = AsyncMock()
+        mock_process.communicate.return_value = (None, b"")
+        mock_process.returncode = 0
+
+        with patch("asyncio.create_subprocess_exec", return_value=mock_process) as mock_exec:
+            result = await processor._run_ffmpeg("ffmpeg", "-i", "a.mp3", "a.ogg")
+
+        assert result == ""
+        assert mock_exec.call_args.kwargs["stdout"] == asyncio.subprocess.DEVNULL
@@ -0,0 +1,197 @@
+"""Unit tests for download queue service."""
+
+import asyncio
+import os
+import time
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.services.downloads import DownloadJob, DownloadQueue, gc_tmp_dir, stream_download
+
+
+@pytest.fixture
+def task_queue():
+    queue = MagicMock()
+    queue.enqueue = AsyncMock(return_value=1)
+    return queue
+
+
+@pytest.fixture
+def download_queue(task_queue, tmp_path):
+    return DownloadQueue(task_queue=task_queue, tmp_dir=str(tmp_path), num_workers=2, max_pending=2)
+
+
+def _make_job(chat_id=12345, file_name="a.mp3", file_path="/local/a.mp3"):
+    tg_file = MagicMock()
+    tg_file.file_path = file_path
+    tg_file.download_to_drive = AsyncMock()
+
+    file_obj = MagicMock()
+    file_obj.get_file = AsyncMock(return_value=tg_file)
+
+    message = MagicMock()
+    message.message_id = 42
+    message.reply_text = AsyncMock()
+
+    return DownloadJob(chat_id=chat_id, message=message, file_obj=file_obj, file_name=file_name)
+
+
+class TestStreamDownload:
+    async def test_streams_remote_file_to_disk(self, tmp_path):
+        """Remote file should be written to disk from the streamed body."""
+        payload = b"x" * 3000
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=payload))
+
+        tg_file = MagicMock()
+        tg_file.file_path = "https://api.telegram.org/file/bot123/documents/a.mp3"
+        tg_file.download_to_drive = AsyncMock()
+        dest = tmp_path / "a.mp3"
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            await stream_download(tg_file, str(dest), client)
+
+        assert dest.read_bytes() == payload
+        tg_file.download_to_drive.assert_not_called()
+
+    async def test_local_file_delegates_to_ptb(self, tmp_path):
+        """Local Bot API server paths should use download_to_drive."""
+        tg_file = MagicMock()
+        tg_file.file_path = "/var/lib/telegram-bot-api/documents/a.mp3"
+        tg_file.download_to_drive = AsyncMock()
+
+        await stream_download(tg_file, str(tmp_path / "a.mp3"), MagicMock())
+
+        tg_file.download_to_drive.assert_called_once()
+
+
+class TestDownloadQueue:
+    async def test_submit_respects_capacity(self, download_queue):
+        download_queue.submit(_make_job())
+        download_queue.submit(_make_job())
+        with pytest.raises(asyncio.QueueFull):
+            download_queue.submit(_make_job())
+
+    async def test_worker_downloads_and_enqueues(self, download_queue, task_queue, tmp_path):
+        job = _make_job()
+
+        await download_queue.start()
+        download_queue.submit(job)
+        await asyncio.wait_for(download_queue._queue.join(), timeout=1)
+        await download_queue.stop()
+
+        task_queue.enqueue.assert_called_once()
+        task = task_queue.enqueue.call_args[0][0]
+        assert task.chat_id == 12345
+        assert task.file_path == str(tmp_path / "12345_a.mp3")
+        assert task.message_id == 42
+
+    async def test_enqueue_failure_removes_file(self, download_queue, task_queue, tmp_path):
+        job = _make_job()
+        task_queue.enqueue.side_effect = RuntimeError("boom")
+        local = tmp_path / "12345_a.mp3"
+        job.file_obj.get_file.return_value.download_to_drive.side_effect = (
+            lambda path: local.write_bytes(b"data")
+        )
+
+        with pytest.raises(RuntimeError):
+            await download_queue._download(job)
+
+        assert not local.exists()
+
+    async def test_download_failure_notifies_user(self, download_queue, task_queue):
+        job = _make_job()
+        job.file_obj.get_file.side_effect = Exception("network")
+
+        await download_queue.start()
+        download_queue.submit(job)
+        await asyncio.wait_for(download_queue._queue.join(), timeout=1)
+        await download_queue.stop()
+
+        task_queue.enqueue.assert_not_called()
+        msg = job.message.reply_text.call_args[0][0]
+        assert "Не удалось скачать" in msg
+
+    async def test_http_error_log_omits_file_url(self, download_queue, task_queue, caplog):
+        job = _make_job(file_path="https://api.telegram.org/file/bot123:SECRET/documents/a.mp3")
+        download_queue._http._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        )
+
+        await download_queue._download(job)
+        await download_queue.stop()
+
+        assert "HTTP 404" in caplog.text
+        assert "SECRET" not in caplog.text
+        task_queue.enqueue.assert_not_called()
+
+    async def test_stop_closes_http_client(self, download_queue):
+        http_client = download_queue._http._client = AsyncMock()
+
+        await download_queue.stop()
+
+        http_client.aclose.assert_called_once()
+
+    async def test_same_chat_jobs_keep_order(self, download_queue, task_queue):
+        first = _make_job(file_name="first.mp3")
+        second = _make_job(file_name="second.mp3")
+        release = asyncio.Event()
+
+        async def slow_get_file():
+            await release.wait()
+            tg_file = MagicMock()
+            tg_file.file_path = "/local/first.mp3"
+            tg_file.download_to_drive = AsyncMock()
+            return tg_file
+
+        first.file_obj.get_file = slow_get_file
+
+        await download_queue.start()
+        download_queue.submit(first)
+        download_queue.submit(second)
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.wait_for(download_queue._queue.join(), timeout=1)
+        await download_queue.stop()
+
+        names = [c.args[0].file_name for c in task_queue.enqueue.call_args_list]
+        assert names == ["first.mp3", "second.mp3"]
+        assert download_queue._chat_locks == {}
+
+    async def test_chat_lock_kept_while_jobs_wait(self, download_queue):
+        release = asyncio.Event()
+        held = []
+
+        async def job():
+            async with download_queue._chat_lock(1):
+                held.append(download_queue._chat_locks[1])
+                await release.wait()
+
+        jobs = [asyncio.create_task(job()) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*jobs)
+
+        assert len(held) == 2 and held[0] is held[1]
+        assert download_queue._chat_locks == {}
+
+
+class TestGcTmpDir:
+    def test_removes_only_stale_entries(self, tmp_path):
+        stale_file = tmp_path / "old.mp3"
+        stale_file.write_bytes(b"x")
+        stale_dir = tmp_path / "old_parts"
+        stale_dir.mkdir()
+        (stale_dir / "part_000.ogg").write_bytes(b"x")
+        fresh = tmp_path / "new.mp3"
+        fresh.write_bytes(b"x")
+
+        old = time.time() - 7200
+        os.utime(stale_file, (old, old))
+        os.utime(stale_dir, (old, old))
+
+        assert gc_tmp_dir(tmp_path, max_age=3600) == 2
+        assert not stale_file.exists()
+        assert not stale_dir.exists()
+        assert fresh.exists()
@@ -1,12 +1,14 @@
 """Unit tests for IAM token manager."""
 
+import asyncio
 import json
 import time
 
+import jwt
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 
-from src.services.iam import IAMTokenManager, IAMTokenError
+from src.services.iam import BACKGROUND_RETRY_DELAY, IAM_TOKEN_URL, IAMTokenManager, IAMTokenError
 
 
 @pytest.fixture
@@ -55,7 +57,7 @@ class TestIAMTokenManager:
         mock_response.json.return_value = {"iamToken": "new-token-abc"}
 
         with patch.object(manager, "_create_jwt", return_value="fake-jwt"):
-            with patch("src.services.iam.httpx.AsyncClient") as mock_client_cls:
+            with patch("src.services.tls.httpx.AsyncClient") as mock_client_cls:
                 mock_client = AsyncMock()
                 mock_client.post.return_value = mock_response
                 mock_client.__aenter__ = AsyncMock(return_value=mock_client)
@@ -74,7 +76,7 @@ class TestIAMTokenManager:
         mock_response.text = "Forbidden"
 
         with patch.object(manager, "_create_jwt", return_value="fake-jwt"):
-            with patch("src.services.iam.httpx.AsyncClient") as mock_client_cls:
+            with patch("src.services.tls.httpx.AsyncClient") as mock_client_cls:
                 mock_client = AsyncMock()
                 mock_client.post.return_value = mock_response
                 mock_client.__aenter__ = AsyncMock(return_value=mock_client)
@@ -84,6 +86,64 @@ class TestIAMTokenManager:
                 with pytest.raises(IAMTokenError, match="403"):
                     await manager.get_token()
 
+    async def test_http_client_reused_and_closed(self, sa_key_file):
+        manager = IAMTokenManager(sa_key_file)
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"iamToken": "token"}
+
+        with patch.object(manager, "_create_jwt", return_value="fake-jwt"):
+            with patch("src.services.tls.httpx.AsyncClient") as mock_client_cls:
+                mock_client = AsyncMock()
+                mock_client.post.return_value = mock_response
+                mock_client_cls.return_value = mock_client
+
+                await manager.get_token()
+                manager.invalidate()
+                await manager.get_token()
+                await manager.aclose()
+
+        mock_client_cls.assert_called_once()
+        assert mock_client.post.call_count == 2
+        mock_client.aclose.assert_called_once()
+        assert manager._http._client is None
+
+    def test_create_jwt_parses_key_once(self, tmp_path):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ).decode()
+        key_file = tmp_path / "real.json"
+        key_file.write_text(json.dumps({
+            "id": "key-id-123", "service_account_id": "sa-id-456", "private_key": pem,
+        }))
+        manager = IAMTokenManager(str(key_file))
+
+        with patch(
+            "src.services.iam.serialization.load_pem_private_key",
+            wraps=serialization.load_pem_private_key,
+        ) as mock_load:
+            first = manager._create_jwt()
+            manager._create_jwt()
+
+        mock_load.assert_called_once()
+        header = jwt.get_unverified_header(first)
+        assert header["kid"] == "key-id-123"
+        assert header["alg"] == "PS256"
+        claims = jwt.decode(first, private_key.public_key(), algorithms=["PS256"], audience=IAM_TOKEN_URL)
+        assert claims["iss"] == "sa-id-456"
+
+    def test_invalid_private_key_raises(self, sa_key_file):
+        manager = IAMTokenManager(sa_key_file)
+        with pytest.raises(IAMTokenError, match="Invalid private key"):
+            manager._create_jwt()
+
     def test_invalidate(self, sa_key_file):
         manager = IAMTokenManager(sa_key_file)
         manager._token = "some-token"
@@ -92,3 +152,91 @@ class TestIAMTokenManager:
         manager.invalidate()
         assert manager._token is None
         assert manager._expires_at == 0
+
+
+class TestBackgroundRefresh:
+    async def test_start_prewarms_token_and_aclose_stops(self, sa_key_file):
+        manager = IAMTokenManager(sa_key_file)
+        exchanged = asyncio.Event()
+
+        async def exchange(encoded_jwt):
+            exchanged.set()
+            return "warm-token", time.time() + 3600
+
+        with patch.object(manager, "_create_jwt", return_value="fake-jwt"), \
+             patch.object(manager, "_exchange_jwt_for_token", side_effect=exchange):
+            await manager.start()
+            await asyncio.wait_for(exchanged.wait(), timeout=1)
+            await manager.aclose()
+
+        assert manager._token == "warm-token"
+        assert manager._refresher is None
+
+    async def test_sleeps_until_refresh_margin(self, sa_key_file):
+        manager = IAMTokenManager(sa_key_file)
+        manager._token = "token"
+        manager._expires_at = time.time() + 600
+
+        with patch("src.services.iam.asyncio.sleep", side_effect=asyncio.CancelledError) as mock_sleep:
+            with pytest.raises(asyncio.CancelledError):
+                await manager._background_refresh()
+
+        assert 590 < mock_sleep.call_args.args[0] <= 600
+
+    async def test_failure_retries_after_delay(self, sa_key_file):
+        manager = IAMTokenManager(sa_key_file)
+
+        with patch.object(manager, "get_token", AsyncMock(side_effect=IAMTokenError("down"))), \
+             patch("src.services.iam.asyncio.sleep", side_effect=asyncio.CancelledError) as mock_sleep:
+            with pytest.raises(asyncio.CancelledError):
+                await manager._background_refresh()
+
+        mock_sleep.assert_called_once_with(BACKGROUND_RETRY_DELAY)
+
+
+class TestTokenCache:
+    @staticmethod
+    def _mock_exchange(manager, token):
+        return patch.object(
+            manager,
+            "_exchange_jwt_for_token",
+            new_callable=AsyncMock,
+            return_value=(token, time.time() + 3000),
+        )
+
+    async def test_token_persisted_and_reused_after_restart(self, sa_key_file, tmp_path):
+        cache = tmp_path / "cache" / "iam_token.json"
+        first = IAMTokenManager(sa_key_file, token_cache_path=str(cache))
+        with patch.object(first, "_create_jwt", return_value="jwt"), self._mock_exchange(first, "disk-token"):
+            assert await first.get_token() == "disk-token"
+
+        assert cache.stat().st_mode & 0o777 == 0o600
+        restarted = IAMTokenManager(sa_key_file, token_cache_path=str(cache))
+        with self._mock_exchange(restarted, "new-token") as mock_exchange:
+            assert await restarted.get_token() == "disk-token"
+        mock_exchange.assert_not_called()
+
+    async def test_invalidated_token_not_reloaded_from_disk(self, sa_key_file, tmp_path):
+        cache = tmp_path / "iam_token.json"
+        cache.write_text(json.dumps({
+            "key_id": "key-id-123", "token": "rejected", "expires_at": time.time() + 3000,
+        }))
+        manager = IAMTokenManager(sa_key_file, token_cache_path=str(cache))
+        assert manager._token == "rejected"
+
+        manager.invalidate()
+        with patch.object(manager, "_create_jwt", return_value="jwt"), self._mock_exchange(manager, "fresh"):
+            assert await manager.get_token() == "fresh"
+        assert json.loads(cache.read_text())["token"] == "fresh"
+
+    def test_ignores_expired_or_foreign_cache(self, sa_key_file, tmp_path):
+        cache = tmp_path / "iam_token.json"
+        cache.write_text(json.dumps({
+            "key_id": "key-id-123", "token": "old", "expires_at": time.time() - 1,
+        }))
+        assert IAMTokenManager(sa_key_file, token_cache_path=str(cache))._token is None
+
+        cache.write_text(json.dumps({
+            "key_id": "other-key", "token": "foreign", "expires_at": time.time() + 3000,
+        }))
+        assert IAMTokenManager(sa_key_file, token_cache_path=str(cache))._token is None
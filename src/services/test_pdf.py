@@ -4,7 +4,9 @@ import os
 from datetime import datetime
 
 import pytest
+from unittest.mock import patch
 
+from src.services import pdf
 from src.services.pdf import PDFGenerator
 
 
@@ -67,6 +69,9 @@ class TestPDFGenerator:
         )
         assert os.path.exists(path)
 
+    def test_escape_xml_special_chars(self):
+        assert pdf._escape("a & <b> > c") == "a &amp; &lt;b&gt; &gt; c"
+
     def test_no_created_at(self, pdf_gen):
         path = pdf_gen.generate(
             file_name="test.ogg",
@@ -75,3 +80,20 @@ class TestPDFGenerator:
             created_at=None,
         )
         assert os.path.exists(path)
+
+    def test_font_resolved_once_at_import(self, pdf_gen):
+        with patch("src.services.pdf._register_cyrillic_font") as mock_register:
+            pdf_gen.generate(file_name="a.ogg", transcription_text="a", analysis_text="b")
+            PDFGenerator(output_dir=pdf_gen._output_dir)
+
+        mock_register.assert_not_called()
+        assert pdf._BODY_STYLE.fontName == pdf._FONT_NAME
+
+    def test_shared_layout_reused_across_pdfs(self, pdf_gen):
+        with patch("src.services.pdf.TableStyle") as mock_table_style:
+            first = pdf_gen.generate(file_name="a.ogg", transcription_text="a", analysis_text="b")
+            second = pdf_gen.generate(file_name="b.ogg", transcription_text="c", analysis_text="d")
+
+        mock_table_style.assert_not_called()
+        assert os.path.getsize(first) > 0
+        assert os.path.getsize(second) > 0
@@ -18,18 +18,23 @@ def mock_services():
     cm.__aenter__ = AsyncMock(return_value=session)
     cm.__aexit__ = AsyncMock(return_value=False)
     session_factory = MagicMock(return_value=cm)
+    session_factory.begin.return_value = cm
 
     audio_processor = AsyncMock()
     audio_processor.is_video = MagicMock(return_value=False)
     audio_processor.is_audio = MagicMock(return_value=True)
-    audio_processor.convert_to_ogg = AsyncMock()
-    audio_processor.extract_audio = AsyncMock()
-    audio_processor.get_duration = AsyncMock(return_value=120.0)
-    audio_processor.split_file = AsyncMock(return_value=["/tmp/part1.ogg"])
+    audio_processor.process_and_split = AsyncMock(return_value=(120.0, ["/tmp/part1.ogg"]))
 
     storage_client = MagicMock()
     storage_client.upload_file = MagicMock()
     storage_client.delete_file = MagicMock()
+    storage_client.upload_file_async = AsyncMock(
+        side_effect=lambda path, key: storage_client.upload_file(path, key)
+    )
+    storage_client.delete_files = MagicMock()
+    storage_client.delete_files_async = AsyncMock(
+        side_effect=lambda keys: storage_client.delete_files(keys)
+    )
     storage_client.get_storage_uri = MagicMock(return_value="https://storage.yandexcloud.net/bucket/key")
 
     speechkit_client = AsyncMock()
@@ -170,13 +175,113 @@ class TestTaskQueueWorkers:
                 await task_queue.stop()
 
             # Verify pipeline steps were called
-            mock_services["audio_processor"].convert_to_ogg.assert_called_once()
-            mock_services["audio_processor"].get_duration.assert_called_once()
+            mock_services["audio_processor"].process_and_split.assert_called_once()
             mock_services["storage_client"].upload_file.assert_called_once()
             mock_services["speechkit_client"].recognize.assert_called_once()
             mock_services["yandexgpt_client"].analyze.assert_called_once()
 
 
+class TestProcessFileParts:
+    @pytest.mark.asyncio
+    async def test_parts_processed_concurrently_in_order(self, task_queue, sample_task, mock_services):
+        """Parts are uploaded and recognized concurrently; text keeps part order."""
+        parts = [f"/tmp/part{i}.ogg" for i in range(3)]
+        mock_services["audio_processor"].process_and_split.return_value = (360.0, parts)
+        mock_services["storage_client"].get_storage_uri.side_effect = lambda key: key
+        in_flight = 0
+        peak = 0
+
+        async def recognize(uri, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Later parts finish first
+            await asyncio.sleep(0.01 * (3 - int(uri[-5])))
+            in_flight -= 1
+            return f"text{uri[-5]}"
+
+        mock_services["speechkit_client"].recognize.side_effect = recognize
+
+        with patch("src.services.queue.os.makedirs"), \
+             patch("src.services.queue.os.path.exists", return_value=False), \
+             patch("src.services.queue.os.path.isdir", return_value=False), \
+             patch("src.services.queue.repo.get_or_create_user", new_callable=AsyncMock, return_value=MagicMock(id=1)), \
+             patch("src.services.queue.repo.save_transcription", new_callable=AsyncMock, return_value=MagicMock(id=10)) as mock_save:
+            await task_queue._process_file(sample_task)
+
+        assert mock_services["storage_client"].upload_file.call_count == 3
+        assert peak == 3
+        assert mock_save.call_args.kwargs["transcription_text"] == "text0 text1 text2"
+        assert mock_services["speechkit_client"].recognize.call_args.kwargs["duration_seconds"] == 120.0
+        mock_services["storage_client"].delete_files.assert_called_once()
+        assert len(mock_services["storage_client"].delete_files.call_args.args[0]) == 3
+
+    @pytest.mark.asyncio
+    async def test_cleanup_survives_delete_failure(self, task_queue, tmp_path, mock_services):
+        """A failed remote delete is logged and local files are still removed."""
+        upload = tmp_path / "upload.mp3"
+        upload.write_bytes(b"x")
+        parts_dir = tmp_path / "parts"
+        parts_dir.mkdir()
+        parts = [parts_dir / "p_part_000.ogg", parts_dir / "p_part_001.ogg"]
+        for part in parts:
+            part.write_bytes(b"x")
+        mock_services["storage_client"].delete_files.side_effect = Exception("boom")
+
+        await task_queue._delete_parts(["audio/key"])
+        await asyncio.to_thread(
+            task_queue._remove_local_files, str(upload), [str(p) for p in parts], str(parts_dir)
+        )
+
+        assert not upload.exists()
+        assert not parts_dir.exists()
+
+    def test_unsplit_output_removed_without_parts_dir(self, tmp_path):
+        upload = tmp_path / "upload.mp3"
+        output = tmp_path / "task.ogg"
+        upload.write_bytes(b"x")
+        output.write_bytes(b"x")
+
+        with patch("src.services.queue.shutil.rmtree") as mock_rmtree:
+            TaskQueue._remove_local_files(str(upload), [str(output)], str(tmp_path / "task_parts"))
+
+        assert not upload.exists()
+        assert not output.exists()
+        mock_rmtree.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_recognition_starts_before_all_uploads_finish(self, task_queue, sample_task, mock_services):
+        """A part is sent to SpeechKit while later parts are still uploading."""
+        parts = ["/tmp/part0.ogg", "/tmp/part1.ogg"]
+        mock_services["audio_processor"].process_and_split.return_value = (240.0, parts)
+        release_upload = asyncio.Event()
+        recognized_early = False
+
+        async def upload_file_async(path, key):
+            # Second part's upload blocks until the first part is recognized
+            if path.endswith("1.ogg"):
+                await asyncio.wait_for(release_upload.wait(), timeout=1)
+
+        async def recognize(uri, **kwargs):
+            nonlocal recognized_early
+            if not release_upload.is_set():
+                recognized_early = True
+                release_upload.set()
+            return "text"
+
+        mock_services["storage_client"].upload_file_async.side_effect = upload_file_async
+        mock_services["speechkit_client"].recognize.side_effect = recognize
+
+        with patch("src.services.queue.os.makedirs"), \
+             patch("src.services.queue.os.path.exists", return_value=False), \
+             patch("src.services.queue.os.path.isdir", return_value=False), \
+             patch("src.services.queue.repo.get_or_create_user", new_callable=AsyncMock, return_value=MagicMock(id=1)), \
+             patch("src.services.queue.repo.save_transcription", new_callable=AsyncMock, return_value=MagicMock(id=10)):
+            await task_queue._process_file(sample_task)
+
+        assert recognized_early
+
+
 class TestTaskQueueSendMessage:
     @pytest.mark.asyncio
     async def test_send_message(self, task_queue):
@@ -193,6 +298,133 @@ class TestTaskQueueSendMessage:
         await task_queue._send_message(12345, "Test")
 
 
+class TestPartCleanup:
+    @pytest.mark.asyncio
+    async def test_failed_part_still_deletes_all_keys(self, task_queue, sample_task, mock_services):
+        """All uploaded parts are removed in one batch even when a part fails."""
+        parts = ["/tmp/part0.ogg", "/tmp/part1.ogg"]
+        mock_services["audio_processor"].process_and_split.return_value = (240.0, parts)
+        mock_services["storage_client"].get_storage_uri.side_effect = lambda key: key
+
+        async def recognize(uri, **kwargs):
+            if uri.endswith("part1.ogg"):
+                raise RuntimeError("recognition failed")
+            return "text"
+
+        mock_services["speechkit_client"].recognize.side_effect = recognize
+
+        with patch("src.services.queue.os.makedirs"):
+            with pytest.raises(RuntimeError):
+                await task_queue._process_file(sample_task)
+
+        mock_services["storage_client"].delete_files.assert_called_once()
+        deleted = sorted(mock_services["storage_client"].delete_files.call_args.args[0])
+        assert deleted == [
+            f"audio/{sample_task.task_id}/part0.ogg",
+            f"audio/{sample_task.task_id}/part1.ogg",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failed_part_cancels_siblings(self, task_queue, sample_task, mock_services):
+        parts = ["/tmp/part0.ogg", "/tmp/part1.ogg"]
+        mock_services["audio_processor"].process_and_split.return_value = (240.0, parts)
+        mock_services["storage_client"].get_storage_uri.side_effect = lambda key: key
+        cancelled = asyncio.Event()
+
+        async def recognize(uri, **kwargs):
+            if uri.endswith("part1.ogg"):
+                raise RuntimeError("recognition failed")
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        mock_services["speechkit_client"].recognize.side_effect = recognize
+
+        with patch("src.services.queue.os.makedirs"):
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(task_queue._process_file(sample_task), timeout=1)
+
+        assert cancelled.is_set()
+
+
+class TestStatusMessage:
+    @pytest.mark.asyncio
+    async def test_status_updates_overlap_uploads_in_order(self, task_queue, sample_task, mock_services):
+        """Uploads start before the status message is sent; statuses keep their order."""
+        events = []
+        release = asyncio.Event()
+
+        async def send_message(chat_id, text):
+            events.append(f"send:{text}")
+            await release.wait()
+            return MagicMock(message_id=77)
+
+        async def edit_message_text(text, **kwargs):
+            events.append(f"edit:{text}")
+
+        async def upload(path, key):
+            events.append("upload")
+            release.set()
+
+        task_queue._bot.send_message.side_effect = send_message
+        task_queue._bot.edit_message_text.side_effect = edit_message_text
+        mock_services["storage_client"].upload_file_async.side_effect = upload
+
+        with patch("src.services.queue.os.makedirs"), \
+             patch("src.services.queue.repo.get_or_create_user", new_callable=AsyncMock, return_value=MagicMock(id=1)), \
+             patch("src.services.queue.repo.save_transcription", new_callable=AsyncMock, return_value=MagicMock(id=10)):
+            await asyncio.wait_for(task_queue._process_file(sample_task), timeout=1)
+
+        assert events.index("upload") < events.index("edit:🎙 Распознаю речь...")
+        assert events[:2] == ["send:☁️ Загружаю в облако...", "upload"]
+
+    @pytest.mark.asyncio
+    async def test_sends_once_then_edits(self, task_queue, sample_task):
+        task_queue._bot.send_message.return_value = MagicMock(message_id=77)
+
+        await task_queue._set_status(sample_task, "☁️ Загружаю в облако...")
+        await task_queue._set_status(sample_task, "🤖 Анализирую текст...")
+
+        task_queue._bot.send_message.assert_called_once()
+        task_queue._bot.edit_message_text.assert_called_once_with(
+            "🤖 Анализирую текст...", chat_id=12345, message_id=77
+        )
+
+    @pytest.mark.asyncio
+    async def test_not_modified_is_ignored(self, task_queue, sample_task):
+        from telegram.error import BadRequest
+
+        sample_task.status_message_id = 77
+        task_queue._bot.edit_message_text.side_effect = BadRequest("Message is not modified")
+
+        await task_queue._set_status(sample_task, "same")
+
+        task_queue._bot.send_message.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_edit_falls_back_to_new_message(self, task_queue, sample_task):
+        from telegram.error import BadRequest
+
+        sample_task.status_message_id = 77
+        task_queue._bot.edit_message_text.side_effect = BadRequest("Message to edit not found")
+        task_queue._bot.send_message.return_value = MagicMock(message_id=78)
+
+        await task_queue._set_status(sample_task, "🤖 Анализирую текст...")
+
+        task_queue._bot.send_message.assert_called_once()
+        assert sample_task.status_message_id == 78
+
+    @pytest.mark.asyncio
+    async def test_failed_send_leaves_status_unset(self, task_queue, sample_task):
+        task_queue._bot.send_message.side_effect = Exception("Network error")
+
+        await task_queue._set_status(sample_task, "☁️ Загружаю в облако...")
+
+        assert sample_task.status_message_id is None
+
+
 class TestCostConstant:
     def test_cost_per_sec(self):
         assert SPEECHKIT_COST_PER_SEC == 0.002542
@@ -202,17 +434,47 @@ class TestCostConstant:
         assert 4.5 < cost < 4.7
 
 
-class TestTimeoutMonitor:
+class TestDeadlineSweeper:
     @pytest.mark.asyncio
-    async def test_timeout_monitor_sends_notification(self, task_queue):
-        """Timeout monitor should send a message after expected time."""
+    async def test_notifies_overdue_task_once(self, task_queue, sample_task):
+        """An overdue deadline is reported once and then dropped."""
         import time
 
-        # Patch sleep to return immediately
-        with patch("src.services.queue.asyncio.sleep", new_callable=AsyncMock):
-            with patch("src.services.queue.time.time", return_value=time.time() + 600):
-                await task_queue._timeout_monitor(12345, 120.0, time.time())
+        sample_task.started_at = time.time() - 600
+        task_queue._active_tasks[sample_task.task_id] = sample_task
+        task_queue._set_deadline(sample_task, 120.0)  # 320 s budget
+
+        await task_queue._notify_overdue()
+        await task_queue._notify_overdue()
 
         task_queue._bot.send_message.assert_called_once()
         call_args = task_queue._bot.send_message.call_args
-        assert "больше времени" in call_args.kwargs.get("text", call_args[1].get("text", ""))
+        assert "больше времени" in call_args.kwargs["text"]
+        assert task_queue._deadlines == []
+
+    @pytest.mark.asyncio
+    async def test_future_and_finished_tasks_not_notified(self, task_queue, sample_task):
+        import time
+
+        finished = ProcessingTask(chat_id=1, file_path="a", file_name="a", message_id=1)
+        finished.started_at = time.time() - 600
+        task_queue._set_deadline(finished, 120.0)
+
+        sample_task.started_at = time.time()
+        task_queue._active_tasks[sample_task.task_id] = sample_task
+        task_queue._set_deadline(sample_task, 120.0)
+
+        await task_queue._notify_overdue()
+
+        task_queue._bot.send_message.assert_not_called()
+        assert [task_id for _, task_id in task_queue._deadlines] == [sample_task.task_id]
+
+    @pytest.mark.asyncio
+    async def test_start_and_stop_manage_sweeper(self, task_queue):
+        await task_queue.start()
+        assert task_queue._sweeper is not None
+        await task_queue.stop()
+        assert task_queue._sweeper is None
+
+    def test_expected_processing_time(self):
+        assert TaskQueue._expected_processing_time(120.0) == 320.0
@@ -1,126 +1,297 @@
 """Unit tests for SpeechKit client."""
 
+import json
+
+import httpx
 import pytest
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from src.services.speechkit import SpeechKitClient, SpeechKitError
+from src.services.speechkit import OPERATION_URL, RECOGNIZE_URL, SpeechKitClient, SpeechKitError
 
+_TEST_URL = "https://storage.yandexcloud.net/bucket/audio.ogg"
 
-@pytest.fixture
+
+@pytest.fixture(scope="module")
 def iam_manager():
-    """Mock IAM token manager."""
+    """Mock IAM token manager, shared by the module's tests."""
     manager = AsyncMock()
     manager.get_token.return_value = "test-iam-token"
     return manager
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client(iam_manager):
-    """Create a SpeechKit client."""
+    """Create a SpeechKit client, shared by the module's tests."""
     return SpeechKitClient(
         iam_manager=iam_manager,
         folder_id="test-folder",
     )
 
 
-def _make_response(status_code=200, json_data=None):
-    resp = MagicMock()
-    resp.status_code = status_code
-    resp.json.return_value = json_data or {}
-    resp.text = str(json_data)
-    return resp
+@pytest.fixture(autouse=True)
+def _reset_shared(iam_manager, client):
+    """Clear mock history and the cached HTTP client after each test."""
+    yield
+    iam_manager.reset_mock(side_effect=True)
+    client._http._client = None
+
+
+@pytest.fixture
+def http_client(client):
+    """Mock HTTP client installed as the SpeechKit client's shared one."""
+    client._http._client = AsyncMock()
+    return client._http._client
+
+
+def _make_response(status_code=200, json_data=None, headers=None):
+    data = json_data or {}
+    return SimpleNamespace(
+        status_code=status_code,
+        headers=headers or {},
+        json=lambda: data,
+        content=json.dumps(data).encode(),
+        text=str(json_data),
+    )
+
+
+def _use_transport(client, handler):
+    """Serve the client's requests from ``handler`` instead of the network."""
+    client._http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
 
 
 class TestRecognize:
     async def test_successful_recognition(self, client):
         """Test full flow: submit → poll (not done) → poll (done) → text."""
-        submit_resp = _make_response(200, {"id": "op-123"})
-        poll_pending = _make_response(200, {"id": "op-123", "done": False})
-        poll_done = _make_response(200, {
-            "id": "op-123",
-            "done": True,
-            "response": {
-                "chunks": [
-                    {"alternatives": [{"text": "Привет мир"}]},
-                    {"alternatives": [{"text": "Как дела"}]},
-                ]
-            },
-        })
+        polls = iter([
+            httpx.Response(200, json={"id": "op-123", "done": False}),
+            httpx.Response(200, json={
+                "id": "op-123",
+                "done": True,
+                "response": {
+                    "chunks": [
+                        {"alternatives": [{"text": "Привет мир"}]},
+                        {"alternatives": [{"text": "Как дела"}]},
+                    ]
+                },
+            }),
+        ])
 
-        with patch("src.services.speechkit.httpx.AsyncClient") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.post.return_value = submit_resp
-            mock_client.get.side_effect = [poll_pending, poll_done]
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_cls.return_value = mock_client
+        def handler(request):
+            if request.method == "POST":
+                assert request.url == RECOGNIZE_URL
+                assert request.headers["Authorization"] == "Bearer test-iam-token"
+                return httpx.Response(200, json={"id": "op-123"})
+            assert request.url == f"{OPERATION_URL}/op-123"
+            return next(polls)
 
-            with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock):
-                text = await client.recognize("https://storage.yandexcloud.net/bucket/audio.ogg")
+        _use_transport(client, handler)
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock):
+            text = await client.recognize(_TEST_URL)
+        await client.aclose()
 
         assert text == "Привет мир Как дела"
 
     async def test_submit_failure(self, client):
-        submit_resp = _make_response(400, {"error": "bad request"})
+        _use_transport(client, lambda request: httpx.Response(400, json={"error": "bad request"}))
 
-        with patch("src.services.speechkit.httpx.AsyncClient") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.post.return_value = submit_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_cls.return_value = mock_client
+        with pytest.raises(SpeechKitError, match="400"):
+            await client.recognize(_TEST_URL)
+        await client.aclose()
 
-            with pytest.raises(SpeechKitError, match="400"):
-                await client.recognize("https://storage.yandexcloud.net/bucket/audio.ogg")
-
-    async def test_operation_error(self, client):
+    async def test_operation_error(self, client, http_client):
         submit_resp = _make_response(200, {"id": "op-123"})
         error_resp = _make_response(200, {
             "id": "op-123",
             "error": {"code": 3, "message": "Invalid audio"},
         })
 
-        with patch("src.services.speechkit.httpx.AsyncClient") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.post.return_value = submit_resp
-            mock_client.get.return_value = error_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_cls.return_value = mock_client
+        http_client.post.return_value = submit_resp
+        http_client.get.return_value = error_resp
 
-            with pytest.raises(SpeechKitError, match="Invalid audio"):
-                await client.recognize("https://storage.yandexcloud.net/bucket/audio.ogg")
+        with pytest.raises(SpeechKitError, match="Invalid audio"):
+            await client.recognize(_TEST_URL)
 
-    async def test_timeout(self, client):
+    async def test_timeout(self, client, http_client):
         submit_resp = _make_response(200, {"id": "op-123"})
         pending_resp = _make_response(200, {"id": "op-123", "done": False})
 
-        with patch("src.services.speechkit.httpx.AsyncClient") as mock_cls:
+        http_client.post.return_value = submit_resp
+        http_client.get.return_value = pending_resp
+
+        with patch("src.services.speechkit.MAX_POLL_TIME", 0):
+            with pytest.raises(SpeechKitError, match="timed out"):
+                await client.recognize(_TEST_URL)
+
+
+class TestHttpClient:
+    async def test_client_reused_across_submit_and_polls(self, client):
+        submit_resp = _make_response(200, {"id": "op-123"})
+        pending = _make_response(200, {"done": False})
+        done = _make_response(200, {"done": True})
+
+        with patch("src.services.tls.httpx.AsyncClient") as mock_cls:
             mock_client = AsyncMock()
             mock_client.post.return_value = submit_resp
-            mock_client.get.return_value = pending_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
+            mock_client.get.side_effect = [pending, pending, done]
             mock_cls.return_value = mock_client
 
-            with patch("src.services.speechkit.MAX_POLL_TIME", 0):
-                with pytest.raises(SpeechKitError, match="timed out"):
-                    await client.recognize("https://storage.yandexcloud.net/bucket/audio.ogg")
+            with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock):
+                await client.recognize(_TEST_URL)
+            await client.aclose()
 
+        mock_cls.assert_called_once()
+        assert mock_client.get.call_count == 3
+        mock_client.aclose.assert_called_once()
 
-class TestExtractText:
-    def test_single_chunk(self):
-        result = {
-            "response": {
-                "chunks": [
-                    {"alternatives": [{"text": "Один текст"}]},
-                ]
-            }
-        }
-        assert SpeechKitClient._extract_text(result) == "Один текст"
 
-    def test_multiple_chunks(self):
-        result = {
+class TestPollHeaders:
+    async def test_headers_fetched_once_for_all_polls(self, client, http_client, iam_manager):
+        pending = _make_response(200, {"done": False})
+        done = _make_response(200, {"done": True})
+
+        http_client.get.side_effect = [pending, pending, done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock):
+            await client._poll_until_done("op-123")
+
+        iam_manager.get_token.assert_called_once()
+
+    async def test_401_refreshes_token_and_retries_without_sleep(self, client, http_client, iam_manager):
+        iam_manager.invalidate = MagicMock()
+        iam_manager.get_token.side_effect = ["old-token", "new-token"]
+        unauthorized = _make_response(401, {})
+        done = _make_response(200, {"done": True})
+
+        http_client.get.side_effect = [unauthorized, done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            await client._poll_until_done("op-123")
+
+        iam_manager.invalidate.assert_called_once()
+        mock_sleep.assert_not_called()
+        assert http_client.get.call_args.kwargs["headers"] == {"Authorization": "Bearer new-token"}
+
+    async def test_repeated_401_raises(self, client, http_client, iam_manager):
+        iam_manager.invalidate = MagicMock()
+        unauthorized = _make_response(401, {})
+
+        http_client.get.return_value = unauthorized
+
+        with pytest.raises(SpeechKitError, match="401"):
+            await client._poll_until_done("op-123")
+
+
+class TestPollParsing:
+    async def test_identical_pending_bodies_parsed_once(self, client, http_client):
+        pending = [_make_response(200, {"id": "op-123", "done": False}) for _ in range(3)]
+        for resp in pending:
+            resp.json = MagicMock(wraps=resp.json)
+        done = _make_response(200, {"id": "op-123", "done": True})
+
+        http_client.get.side_effect = [*pending, done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock):
+            result = await client._poll_until_done("op-123")
+
+        assert result["done"] is True
+        assert pending[0].json.call_count == 1
+        pending[1].json.assert_not_called()
+        pending[2].json.assert_not_called()
+
+
+class TestPollBackoff:
+    async def test_intervals_grow_exponentially_with_cap(self, client, http_client):
+        pending = _make_response(200, {"done": False})
+        done = _make_response(200, {"done": True})
+
+        http_client.get.side_effect = [pending] * 7 + [done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("src.services.speechkit.random.uniform", return_value=0.0):
+            await client._poll_until_done("op-123")
+
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert delays == [1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0]
+
+    async def test_jitter_bounded(self, client, http_client):
+        pending = _make_response(200, {"done": False})
+        done = _make_response(200, {"done": True})
+
+        http_client.get.side_effect = [pending, done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            await client._poll_until_done("op-123")
+
+        assert 1.0 <= mock_sleep.call_args.args[0] <= 1.1
+
+
+class TestRetryAfter:
+    async def test_throttled_poll_waits_retry_after(self, client, http_client):
+        throttled = _make_response(429, {}, headers={"Retry-After": "7"})
+        done = _make_response(200, {"done": True})
+
+        http_client.get.side_effect = [throttled, done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            result = await client._poll_until_done("op-123")
+
+        assert result["done"] is True
+        mock_sleep.assert_called_once_with(7.0)
+
+    async def test_retry_after_overrides_backoff_without_advancing_it(self, client, http_client):
+        paced = _make_response(200, {"done": False}, headers={"Retry-After": "3"})
+        pending = _make_response(200, {"done": False})
+        done = _make_response(200, {"done": True})
+
+        http_client.get.side_effect = [paced, pending, done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("src.services.speechkit.random.uniform", return_value=0.0):
+            await client._poll_until_done("op-123")
+
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [3.0, 1.0]
+
+    def test_unparseable_retry_after_ignored(self):
+        resp = _make_response(headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        assert SpeechKitClient._parse_retry_after(resp) is None
+
+
+class TestTieredPolling:
+    def test_short_job_polls_at_minimum(self):
+        # 30 s of audio -> ~15 s expected
+        assert SpeechKitClient._get_poll_interval(0.0, 15.0) == 7.5
+        assert SpeechKitClient._get_poll_interval(10.0, 15.0) == 2.0
+        assert SpeechKitClient._get_poll_interval(60.0, 15.0) == 30.0
+
+    def test_long_job_skips_ahead_then_polls_near_finish(self):
+        # 2 h of audio -> ~1 h expected
+        assert SpeechKitClient._get_poll_interval(0.0, 3600.0) == 30.0
+        assert SpeechKitClient._get_poll_interval(1795.0, 3600.0) == 5.0
+        assert SpeechKitClient._get_poll_interval(3000.0, 3600.0) == 30.0
+        assert SpeechKitClient._get_poll_interval(6000.0, 3600.0) == 30.0
+
+    async def test_duration_selects_tiered_schedule(self, client, http_client):
+        pending = _make_response(200, {"done": False})
+        done = _make_response(200, {"done": True})
+
+        http_client.get.side_effect = [pending, done]
+
+        with patch("src.services.speechkit.asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("src.services.speechkit.random.uniform", return_value=0.0):
+            await client._poll_until_done("op-123", duration_seconds=30.0)
+
+        assert mock_sleep.call_args.args[0] == pytest.approx(7.5, abs=0.1)
+
+
+_EXTRACT_CASES = [
+    pytest.param(
+        {"response": {"chunks": [{"alternatives": [{"text": "Один текст"}]}]}},
+        "Один текст",
+        id="single_chunk",
+    ),
+    pytest.param(
+        {
             "response": {
                 "chunks": [
                     {"alternatives": [{"text": "Первая часть"}]},
@@ -128,12 +299,31 @@ class TestExtractText:
                     {"alternatives": [{"text": "Третья часть"}]},
                 ]
             }
-        }
-        assert SpeechKitClient._extract_text(result) == "Первая часть Вторая часть Третья часть"
+        },
+        "Первая часть Вторая часть Третья часть",
+        id="multiple_chunks",
+    ),
+    pytest.param({"response": {"chunks": []}}, "", id="empty_chunks"),
+    pytest.param({"response": {"chunks": None}}, "", id="null_chunks"),
+    pytest.param({}, "", id="no_response"),
+    pytest.param(
+        {
+            "response": {
+                "chunks": [
+                    {"alternatives": [{"text": "Первая"}, {"text": "Хуже"}]},
+                    {"alternatives": []},
+                    {"channelTag": "1"},
+                    {"alternatives": [{"text": "Вторая"}]},
+                ]
+            }
+        },
+        "Первая Вторая",
+        id="chunks_without_alternatives_skipped",
+    ),
+]
 
-    def test_empty_chunks(self):
-        result = {"response": {"chunks": []}}
-        assert SpeechKitClient._extract_text(result) == ""
 
-    def test_no_response(self):
-        assert SpeechKitClient._extract_text({}) == ""
+class TestExtractText:
+    @pytest.mark.parametrize("result,expected", _EXTRACT_CASES)
+    def test_extract_text(self, result, expected):
+        assert SpeechKitClient._extract_text(result) == expected
@@ -1,18 +1,23 @@
 """Unit tests for Object Storage client."""
 
+import httpx
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import Mock, patch
 
 from botocore.exceptions import ClientError
 
 from src.services.storage import ObjectStorageClient, StorageError
 
 
+_S3_METHODS = ["upload_file", "delete_object", "delete_objects", "generate_presigned_url"]
+
+
 @pytest.fixture
 def storage(tmp_path):
     """Create a storage client with mocked boto3."""
     with patch("src.services.storage.boto3.client") as mock_boto:
-        mock_s3 = MagicMock()
+        # Only the S3 calls the client makes; anything else is an AttributeError
+        mock_s3 = Mock(spec=_S3_METHODS)
         mock_boto.return_value = mock_s3
         client = ObjectStorageClient(
             access_key="test-key",
@@ -33,10 +38,17 @@ class TestUploadFile:
 
         assert uri == "s3://test-bucket/uploads/audio.ogg"
         storage._mock_s3.upload_file.assert_called_once_with(
-            str(test_file), "test-bucket", "uploads/audio.ogg"
+            str(test_file), "test-bucket", "uploads/audio.ogg", Config=storage._transfer_config
         )
 
+    def test_upload_uses_multipart_config(self, storage):
+        config = storage._transfer_config
+        assert config.multipart_threshold == 8 * 1024 * 1024
+        assert config.multipart_chunksize == 16 * 1024 * 1024
+        assert config.max_request_concurrency == 8
+
     def test_upload_file_not_found(self, storage):
+        storage._mock_s3.upload_file.side_effect = FileNotFoundError("/nonexistent/file.ogg")
         with pytest.raises(StorageError, match="File not found"):
             storage.upload_file("/nonexistent/file.ogg", "key")
 
@@ -53,6 +65,71 @@ class TestUploadFile:
             storage.upload_file(str(test_file), "key")
 
 
+class TestAsyncWrappers:
+    async def test_upload_file_async_runs_in_thread(self, storage, tmp_path):
+        import threading
+
+        test_file = tmp_path / "audio.ogg"
+        test_file.write_bytes(b"fake audio")
+        upload_threads = []
+        storage._mock_s3.upload_file.side_effect = (
+            lambda *a, **kw: upload_threads.append(threading.current_thread())
+        )
+
+        with patch("src.services.storage.MULTIPART_THRESHOLD", 0):
+            uri = await storage.upload_file_async(str(test_file), "uploads/audio.ogg")
+
+        assert uri == "s3://test-bucket/uploads/audio.ogg"
+        assert upload_threads[0] is not threading.main_thread()
+
+
+class TestUploadStream:
+    @staticmethod
+    def _use_transport(storage, handler):
+        storage._http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def test_small_file_streamed_to_presigned_url(self, storage, tmp_path):
+        payload = b"x" * 3000
+        test_file = tmp_path / "audio.ogg"
+        test_file.write_bytes(payload)
+        storage._mock_s3.generate_presigned_url.return_value = (
+            "https://storage.yandexcloud.net/test-bucket/uploads/audio.ogg?X-Amz-Signature=sig"
+        )
+        received = {}
+
+        def handler(request):
+            received["method"] = request.method
+            received["length"] = request.headers["Content-Length"]
+            received["body"] = request.read()
+            return httpx.Response(200)
+
+        self._use_transport(storage, handler)
+        uri = await storage.upload_file_async(str(test_file), "uploads/audio.ogg")
+        await storage.aclose()
+
+        assert uri == "s3://test-bucket/uploads/audio.ogg"
+        assert received == {"method": "PUT", "length": "3000", "body": payload}
+        storage._mock_s3.upload_file.assert_not_called()
+        storage._mock_s3.generate_presigned_url.assert_called_once_with(
+            "put_object",
+            Params={"Bucket": "test-bucket", "Key": "uploads/audio.ogg"},
+            ExpiresIn=3600,
+        )
+
+    async def test_stream_error_status_raises(self, storage, tmp_path):
+        test_file = tmp_path / "audio.ogg"
+        test_file.write_bytes(b"data")
+        storage._mock_s3.generate_presigned_url.return_value = "https://storage.yandexcloud.net/b/k"
+        self._use_transport(storage, lambda request: httpx.Response(403, text="Forbidden"))
+
+        with pytest.raises(StorageError, match="403"):
+            await storage.upload_file_async(str(test_file), "k")
+
+    async def test_missing_file_raises(self, storage):
+        with pytest.raises(StorageError, match="File not found"):
+            await storage.upload_file_async("/nonexistent/file.ogg", "k")
+
+
 class TestDeleteFile:
     def test_delete_success(self, storage):
         storage.delete_file("uploads/audio.ogg")
@@ -70,6 +147,33 @@ class TestDeleteFile:
             storage.delete_file("nonexistent")
 
 
+class TestDeleteFiles:
+    def test_deletes_in_one_request(self, storage):
+        storage._mock_s3.delete_objects.return_value = {}
+
+        storage.delete_files(["a.ogg", "b.ogg"])
+
+        storage._mock_s3.delete_objects.assert_called_once_with(
+            Bucket="test-bucket",
+            Delete={"Objects": [{"Key": "a.ogg"}, {"Key": "b.ogg"}], "Quiet": True},
+        )
+
+    def test_splits_into_batches(self, storage):
+        storage._mock_s3.delete_objects.return_value = {}
+
+        with patch("src.services.storage.DELETE_BATCH_SIZE", 2):
+            storage.delete_files(["a", "b", "c"])
+
+        assert storage._mock_s3.delete_objects.call_count == 2
+
+    def test_per_key_errors_raise(self, storage):
+        storage._mock_s3.delete_objects.return_value = {
+            "Errors": [{"Key": "a.ogg", "Code": "AccessDenied"}]
+        }
+        with pytest.raises(StorageError, match="a.ogg"):
+            storage.delete_files(["a.ogg"])
+
+
 class TestGetStorageUri:
     def test_builds_correct_uri(self, storage):
         uri = storage.get_storage_uri("uploads/audio.ogg")
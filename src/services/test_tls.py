@@ -0,0 +1,39 @@
+"""Unit tests for the shared TLS context and lazy HTTP client."""
+
+import ssl
+from unittest.mock import AsyncMock, patch
+
+from src.services.tls import LazyAsyncClient, get_ssl_context
+
+
+class TestGetSslContext:
+    def test_returns_verifying_context(self):
+        ctx = get_ssl_context()
+        assert isinstance(ctx, ssl.SSLContext)
+        assert ctx.verify_mode == ssl.CERT_REQUIRED
+
+    def test_context_is_shared(self):
+        assert get_ssl_context() is get_ssl_context()
+
+
+class TestLazyAsyncClient:
+    def test_created_once_with_shared_context(self):
+        http = LazyAsyncClient(timeout=5.0)
+        with patch("src.services.tls.httpx.AsyncClient") as mock_cls:
+            assert http.get() is http.get()
+
+        mock_cls.assert_called_once_with(verify=get_ssl_context(), timeout=5.0)
+
+    async def test_aclose_resets_client(self):
+        http = LazyAsyncClient()
+        with patch("src.services.tls.httpx.AsyncClient") as mock_cls:
+            mock_cls.side_effect = lambda **kw: AsyncMock()
+            first = http.get()
+            await http.aclose()
+            second = http.get()
+
+        first.aclose.assert_called_once()
+        assert second is not first
+
+    async def test_aclose_without_client_is_noop(self):
+        await LazyAsyncClient().aclose()
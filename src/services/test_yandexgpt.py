@@ -1,19 +1,36 @@
 """Unit tests for YandexGPT client."""
 
+import asyncio
+
+import httpx
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
-from src.services.yandexgpt import YandexGPTClient, YandexGPTError, SYSTEM_PROMPT
+from src.services.yandexgpt import MAX_INPUT_CHARS, SYSTEM_PROMPT, YandexGPTClient, YandexGPTError
 
+# Inputs just over MAX_INPUT_CHARS (two chunks), built once at import
+_LONG_TEXT = "Слово. " * (MAX_INPUT_CHARS // 7 + 100)
+_LONG_TEXT_UNBROKEN = "A" * (MAX_INPUT_CHARS + 1000)
+_LONG_TEXT_SENTENCES = "Sentence one. Sentence two. " * ((MAX_INPUT_CHARS + 1000) // 28)
 
-@pytest.fixture
+
+class _FakeIAM:
+    """IAM manager stand-in that hands out a fixed token."""
+
+    def __init__(self, token: str = "test-iam-token") -> None:
+        self.token = token
+
+    async def get_token(self) -> str:
+        return self.token
+
+
+@pytest.fixture(scope="module")
 def iam_manager():
-    manager = AsyncMock()
-    manager.get_token.return_value = "test-iam-token"
-    return manager
+    return _FakeIAM()
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client(iam_manager):
     return YandexGPTClient(
         iam_manager=iam_manager,
@@ -22,18 +39,34 @@ def client(iam_manager):
     )
 
 
+@pytest.fixture(autouse=True)
+def _reset_shared(client):
+    """Drop the cached HTTP client after each test."""
+    yield
+    client._http._client = None
+
+
+@pytest.fixture
+def http_client(client):
+    """Mock HTTP client installed as the GPT client's shared one."""
+    client._http._client = AsyncMock()
+    return client._http._client
+
+
 def _make_response(status_code=200, text="Analysis result"):
-    resp = MagicMock()
-    resp.status_code = status_code
-    resp.json.return_value = {
+    data = {
         "result": {
             "alternatives": [
                 {"message": {"role": "assistant", "text": text}}
             ]
         }
     }
-    resp.text = f"status={status_code}"
-    return resp
+    return SimpleNamespace(status_code=status_code, json=lambda: data, text=f"status={status_code}")
+
+
+def _use_transport(client, handler):
+    """Serve the client's requests from ``handler`` instead of the network."""
+    client._http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
 
 
 class TestAnalyze:
@@ -45,66 +78,106 @@ class TestAnalyze:
         result = await client.analyze("   \n  ")
         assert "пуст" in result
 
-    async def test_short_text_single_request(self, client):
+    async def test_short_text_single_request(self, client, http_client):
         mock_resp = _make_response(200, "## Резюме\nТестовый анализ")
 
-        with patch("src.services.yandexgpt.httpx.AsyncClient") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.post.return_value = mock_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_cls.return_value = mock_client
+        http_client.post.return_value = mock_resp
 
-            result = await client.analyze("Короткий текст для анализа")
+        result = await client.analyze("Короткий текст для анализа")
 
         assert result == "## Резюме\nТестовый анализ"
-        mock_client.post.assert_called_once()
+        http_client.post.assert_called_once()
 
-    async def test_long_text_chunked(self, client):
-        long_text = "Слово. " * 10000  # >24000 chars
+    async def test_long_text_chunked(self, client, http_client):
         mock_resp = _make_response(200, "Частичный анализ")
 
-        with patch("src.services.yandexgpt.httpx.AsyncClient") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.post.return_value = mock_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_cls.return_value = mock_client
+        http_client.post.return_value = mock_resp
 
-            result = await client.analyze(long_text)
+        result = await client.analyze(_LONG_TEXT)
 
         # At least 2 chunk requests + 1 summarization request
-        assert mock_client.post.call_count >= 3
+        assert http_client.post.call_count >= 3
+
+    async def test_chunks_analyzed_concurrently_in_order(self, iam_manager):
+        client = YandexGPTClient(
+            iam_manager=iam_manager,
+            folder_id="test-folder",
+            model_uri="gpt://test-folder/yandexgpt/latest",
+            max_concurrent=2,
+        )
+        http_client = client._http._client = AsyncMock()
+        long_text = "Слово. " * (MAX_INPUT_CHARS * 3 // 7)
+        in_flight = 0
+        peak = 0
+
+        async def post(url, json, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            user_text = json["messages"][1]["text"]
+            return _make_response(200, user_text.split("]")[0] + "]")
+
+        http_client.post.side_effect = post
+
+        await client.analyze(long_text)
+
+        assert peak == 2
+        combined = http_client.post.call_args.kwargs["json"]["messages"][1]["text"]
+        assert combined.index("[Часть 1 из") < combined.index("[Часть 2 из") < combined.index("[Часть 3 из")
 
     async def test_api_error(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 500
-        mock_resp.text = "Internal Server Error"
+        _use_transport(client, lambda request: httpx.Response(500, text="Internal Server Error"))
 
-        with patch("src.services.yandexgpt.httpx.AsyncClient") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.post.return_value = mock_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_cls.return_value = mock_client
-
-            with pytest.raises(YandexGPTError, match="500"):
-                await client.analyze("Some text")
+        with pytest.raises(YandexGPTError, match="500"):
+            await client.analyze("Some text")
+        await client.aclose()
 
     async def test_no_alternatives_in_response(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.json.return_value = {"result": {"alternatives": []}}
+        def handler(request):
+            assert request.url == "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+            assert request.headers["x-folder-id"] == "test-folder"
+            return httpx.Response(200, json={"result": {"alternatives": []}})
+
+        _use_transport(client, handler)
 
-        with patch("src.services.yandexgpt.httpx.AsyncClient") as mock_cls:
+        with pytest.raises(YandexGPTError, match="No alternatives"):
+            await client.analyze("Some text")
+        await client.aclose()
+
+
+class TestHttpClient:
+    async def test_client_reused_across_chunk_requests(self, client):
+
+        with patch("src.services.tls.httpx.AsyncClient") as mock_cls:
             mock_client = AsyncMock()
-            mock_client.post.return_value = mock_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
+            mock_client.post.return_value = _make_response(200, "OK")
             mock_cls.return_value = mock_client
 
-            with pytest.raises(YandexGPTError, match="No alternatives"):
-                await client.analyze("Some text")
+            await client.analyze(_LONG_TEXT)
+            await client.aclose()
+
+        mock_cls.assert_called_once()
+        assert mock_client.post.call_count == 3
+        mock_client.aclose.assert_called_once()
+
+
+class TestHeaders:
+    async def test_headers_rebuilt_only_on_token_change(self):
+        iam_manager = _FakeIAM("token-a")
+        client = YandexGPTClient(
+            iam_manager=iam_manager,
+            folder_id="test-folder",
+            model_uri="gpt://test-folder/yandexgpt/latest",
+        )
+        first = await client._get_headers()
+        second = await client._get_headers()
+        iam_manager.token = "token-b"
+        third = await client._get_headers()
+
+        assert second is first
+        assert third == {"Authorization": "Bearer token-b", "x-folder-id": "test-folder"}
 
 
 class TestPromptStructure:
@@ -113,24 +186,19 @@ class TestPromptStructure:
         assert "Ключевые тезисы" in SYSTEM_PROMPT
         assert "План развития" in SYSTEM_PROMPT
 
-    async def test_request_body_structure(self, client):
+    async def test_request_body_structure(self, client, http_client):
         mock_resp = _make_response(200, "OK")
 
-        with patch("src.services.yandexgpt.httpx.AsyncClient") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.post.return_value = mock_resp
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_cls.return_value = mock_client
+        http_client.post.return_value = mock_resp
 
-            await client.analyze("Test text")
+        await client.analyze("Test text")
 
-            call_args = mock_client.post.call_args
-            body = call_args.kwargs.get("json") or call_args[1].get("json")
-            assert body["modelUri"] == "gpt://test-folder/yandexgpt/latest"
-            assert len(body["messages"]) == 2
-            assert body["messages"][0]["role"] == "system"
-            assert body["messages"][1]["role"] == "user"
+        call_args = http_client.post.call_args
+        body = call_args.kwargs.get("json") or call_args[1].get("json")
+        assert body["modelUri"] == "gpt://test-folder/yandexgpt/latest"
+        assert len(body["messages"]) == 2
+        assert body["messages"][0]["role"] == "system"
+        assert body["messages"][1]["role"] == "user"
 
 
 class TestSplitText:
@@ -139,14 +207,18 @@ class TestSplitText:
         assert len(chunks) == 1
 
     def test_long_text_split(self):
-        text = "A" * 50000
-        chunks = YandexGPTClient._split_text(text)
+        chunks = YandexGPTClient._split_text(_LONG_TEXT_UNBROKEN)
         assert len(chunks) >= 2
 
     def test_split_preserves_all_content(self):
         # Each chunk overlaps, so total chars > original, but all content present
-        text = "Sentence one. Sentence two. " * 1500
-        chunks = YandexGPTClient._split_text(text)
+        chunks = YandexGPTClient._split_text(_LONG_TEXT_SENTENCES)
         assert len(chunks) >= 2
         # First chunk starts from beginning
         assert chunks[0].startswith("Sentence one")
+
+    def test_splits_at_last_sentence_boundary_in_window(self):
+        head = "a. " + "x" * (MAX_INPUT_CHARS - 100)
+        text = head + ". " + "y" * 200 + ". " + "z" * 200
+        chunks = YandexGPTClient._split_text(text)
+        assert chunks[0] == head + "."
@@ -0,0 +1,42 @@
+"""Shared TLS context and lazily created HTTP clients for outgoing HTTPS."""
+
+import functools
+import ssl
+
+import certifi
+import httpx
+
+
+@functools.cache
+def get_ssl_context() -> ssl.SSLContext:
+    """Return the process-wide SSL context, built on first use.
+
+    Loading the CA bundle dominates ``httpx.AsyncClient`` construction
+    (tens of milliseconds); sharing one context makes new clients cheap.
+    """
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+class LazyAsyncClient:
+    """One pooled ``httpx.AsyncClient``, created on first use.
+
+    Creation is deferred so the pool binds to the running event loop. The
+    client verifies with the shared SSL context; other keyword arguments
+    are passed to ``httpx.AsyncClient``.
+    """
+
+    def __init__(self, **client_kwargs) -> None:
+        self._client_kwargs = client_kwargs
+        self._client: httpx.AsyncClient | None = None
+
+    def get(self) -> httpx.AsyncClient:
+        """Return the client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(verify=get_ssl_context(), **self._client_kwargs)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the client; the next ``get()`` creates a new one."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,16 +1,31 @@
 """YandexGPT API client — text analysis and plan generation."""
 
+import asyncio
+import bisect
 import logging
+import re
 
 import httpx
 
 from src.services.iam import IAMTokenManager
+from src.services.tls import LazyAsyncClient
 
 logger = logging.getLogger(__name__)
 
 # Approximate token limit for a single request (conservative)
 MAX_INPUT_CHARS = 24000  # ~6000 tokens for Russian text
 CHUNK_OVERLAP_CHARS = 500
+# Preferred split point: the end of a sentence
+_SENTENCE_END = re.compile(r"\. ")
+# Completion requests in flight at once per client (API rate limits)
+MAX_CONCURRENT_REQUESTS = 4
+REQUEST_TIMEOUT = 120.0
+
+COMPLETION_OPTIONS = {
+    "stream": False,
+    "temperature": 0.3,
+    "maxTokens": 2000,
+}
 
 SYSTEM_PROMPT = """Ты — профессиональный аналитик. Тебе дана текстовая расшифровка аудио/видеозаписи.
 
@@ -56,18 +71,34 @@ class YandexGPTClient:
         folder_id: str,
         model_uri: str,
         api_endpoint: str = "https://llm.api.cloud.yandex.net",
+        max_concurrent: int = MAX_CONCURRENT_REQUESTS,
     ) -> None:
         self._iam = iam_manager
         self._folder_id = folder_id
         self._model_uri = model_uri
-        self._api_endpoint = api_endpoint
+        self._completion_url = f"{api_endpoint}/foundationModels/v1/completion"
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._http = LazyAsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=MAX_CONCURRENT_REQUESTS),
+        )
+        self._headers_token: str | None = None
+        self._headers: dict[str, str] = {}
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        await self._http.aclose()
 
     async def _get_headers(self) -> dict[str, str]:
         token = await self._iam.get_token()
-        return {
-            "Authorization": f"Bearer {token}",
-            "x-folder-id": self._folder_id,
-        }
+        # Rebuilt only when the token rotates; callers must not mutate it
+        if token != self._headers_token:
+            self._headers = {
+                "Authorization": f"Bearer {token}",
+                "x-folder-id": self._folder_id,
+            }
+            self._headers_token = token
+        return self._headers
 
     async def analyze(self, transcription_text: str) -> str:
         """Analyze transcription text and generate a structured report.
@@ -101,46 +132,47 @@ class YandexGPTClient:
         chunks = self._split_text(text)
         logger.info("Text split into %d chunks for analysis", len(chunks))
 
-        partial_results = []
-        for i, chunk in enumerate(chunks, 1):
-            logger.info("Analyzing chunk %d/%d", i, len(chunks))
-            result = await self._complete(
-                SYSTEM_PROMPT,
-                f"[Часть {i} из {len(chunks)}]\n\n{chunk}",
+        # Chunks are independent; the request semaphore bounds concurrency
+        chunk_tasks = [
+            asyncio.create_task(
+                self._complete(SYSTEM_PROMPT, f"[Часть {i} из {len(chunks)}]\n\n{chunk}")
             )
-            partial_results.append(result)
-
-        # Final summarization
-        combined = "\n\n---\n\n".join(
+            for i, chunk in enumerate(chunks, 1)
+        ]
+        try:
+            partial_results = await asyncio.gather(*chunk_tasks)
+        except BaseException:
+            # One failed chunk fails the analysis; don't pay for the rest
+            for chunk_task in chunk_tasks:
+                chunk_task.cancel()
+            await asyncio.gather(*chunk_tasks, return_exceptions=True)
+            raise
+
+        # Final summarization; join gets a list, so it needn't buffer a generator
+        combined = "\n\n---\n\n".join([
             f"### Результат анализа части {i}\n{r}"
             for i, r in enumerate(partial_results, 1)
-        )
+        ])
         return await self._complete(SUMMARIZE_PROMPT, combined)
 
     async def _complete(self, system_prompt: str, user_text: str) -> str:
         """Send a completion request to YandexGPT API."""
         headers = await self._get_headers()
-        url = f"{self._api_endpoint}/foundationModels/v1/completion"
 
+        # httpx serializes compactly with ensure_ascii=False, so Cyrillic
+        # text goes out as plain UTF-8 rather than \uXXXX escapes
         body = {
             "modelUri": self._model_uri,
-            "completionOptions": {
-                "stream": False,
-                "temperature": 0.3,
-                "maxTokens": 2000,
-            },
+            "completionOptions": COMPLETION_OPTIONS,
             "messages": [
                 {"role": "system", "text": system_prompt},
                 {"role": "user", "text": user_text},
             ],
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json=body,
-                headers=headers,
-                timeout=120.0,
+        async with self._semaphore:
+            response = await self._http.get().post(
+                self._completion_url, json=body, headers=headers
             )
 
         if response.status_code != 200:
@@ -160,6 +192,9 @@ class YandexGPTClient:
     @staticmethod
     def _split_text(text: str) -> list[str]:
         """Split text into chunks respecting sentence boundaries."""
+        # Sentence boundaries are found in one regex pass and bisected per chunk
+        boundaries = [m.start() for m in _SENTENCE_END.finditer(text)]
+
         chunks = []
         start = 0
         while start < len(text):
@@ -168,10 +203,13 @@ class YandexGPTClient:
                 chunks.append(text[start:])
                 break
 
-            # Try to split at sentence boundary
-            split_pos = text.rfind(". ", start + MAX_INPUT_CHARS // 2, end)
-            if split_pos == -1:
-                split_pos = text.rfind(" ", start + MAX_INPUT_CHARS // 2, end)
+            # Try to split at the last sentence boundary in the second half
+            min_split = start + MAX_INPUT_CHARS // 2
+            idx = bisect.bisect_right(boundaries, end - 2) - 1
+            if idx >= 0 and boundaries[idx] >= min_split:
+                split_pos = boundaries[idx]
+            else:
+                split_pos = text.rfind(" ", min_split, end)
             if split_pos == -1:
                 split_pos = end
 